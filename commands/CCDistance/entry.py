@@ -1,10 +1,15 @@
 import adsk.core
 import adsk.fusion
 import os
+import csv
+import json
 import math
+import time
 from ...lib import fusionAddInUtils as futil
 from ... import config
 from ...lib.CCLine import *
+from ...lib.beltStock import getBeltStock
+from ...lib import ccSearch
 
 app = adsk.core.Application.get()
 ui = app.userInterface
@@ -22,6 +27,18 @@ EDIT_CMD_Description = 'Edit existing C-C Distance Object'
 DELETE_CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCDistanceDelete'
 DELETE_CMD_NAME = 'Delete C-C Distance'
 
+BULK_EDIT_CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCDistanceBulkEdit'
+BULK_EDIT_CMD_NAME = 'Bulk Edit C-C Distances'
+BULK_EDIT_CMD_Description = 'Change the motion type, extra center or belt length of many C-C Distances at once'
+
+IMPORT_CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCDistanceImport'
+IMPORT_CMD_NAME = 'Import C-C Layout'
+IMPORT_CMD_Description = 'Create C-C Distances in the active sketch from a JSON or CSV layout file'
+
+DELETE_ALL_CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCDistanceDeleteAll'
+DELETE_ALL_CMD_NAME = 'Delete All C-C Distances'
+DELETE_ALL_CMD_Description = 'Delete every C-C Distance in the active sketch'
+
 # Specify that the command will be promoted to the panel.
 IS_PROMOTED = False
 
@@ -36,16 +53,42 @@ local_handlers = []
 # they are not released and garbage collected.
 ui_handlers = []
 
+# The ui event handlers that are only connected while a sketch with CCLines
+# is being edited.  Kept as (event, handler) so they can be removed.
+ui_hook_handlers = []
+
 # Global variable to hold the selected CCLine in the UI and the command target CCLine
 selected_CCLine = None
 target_CCLine = None
 
-motionTypes = ( 
-    'Gears 20DP',
-    'HTD 5mm Belt',
-    'GT2 3mm Belt',
+# All of the CCLines in the UI selection and the ones the delete command acts on
+selected_CCLines = []
+target_CCLines = []
+
+motionTypesDefault = motionCatalog.named( 'Gears 20DP' ).id
+
+# Hole grids the ratio explorer can land C-C distances on, as (name, pitch in inches).
+# Tubify punches its holes on the 16mm grid.
+gridPitches = (
+    ( 'Any C-C', 0 ),
+    ( '16mm Tube Holes', 16 / 25.4 ),
+    ( '0.5in Grid', 0.5 )
 )
-motionTypesDefault = motionTypes.index( 'Gears 20DP' )
+
+# Fusion ships without NumPy, where a grid search over every cog pair and a
+# long C-C window takes seconds.  Without NumPy grid searches are kept to this
+# many cog sizes and this wide a C-C window, from the low end of each.
+pythonGridCogs = 48
+pythonGridSpanIN = 16
+
+# The belt teeth before the last change, so stepping with Stocked Belts Only
+# moves to the next stocked belt in the same direction
+last_belt_teeth = 0
+
+# The matches shown in the ratio explorer table and a count of the searches
+# so every table cell gets a unique input id
+ratio_matches = []
+ratio_search_count = 0
 
 # Executed when add-in is run.
 def start():
@@ -54,11 +97,17 @@ def start():
     create_cmd_def = ui.commandDefinitions.addButtonDefinition(CREATE_CMD_ID, CREATE_CMD_NAME, CREATE_CMD_Description, ICON_FOLDER)
     edit_cmd_def = ui.commandDefinitions.addButtonDefinition(EDIT_CMD_ID, EDIT_CMD_NAME, EDIT_CMD_Description, ICON_FOLDER)
     delete_cmd_def = ui.commandDefinitions.addButtonDefinition(DELETE_CMD_ID, DELETE_CMD_NAME, "Delete CCLine", ICON_FOLDER)
+    delete_all_cmd_def = ui.commandDefinitions.addButtonDefinition(DELETE_ALL_CMD_ID, DELETE_ALL_CMD_NAME, DELETE_ALL_CMD_Description, ICON_FOLDER)
+    bulk_edit_cmd_def = ui.commandDefinitions.addButtonDefinition(BULK_EDIT_CMD_ID, BULK_EDIT_CMD_NAME, BULK_EDIT_CMD_Description, ICON_FOLDER)
+    import_cmd_def = ui.commandDefinitions.addButtonDefinition(IMPORT_CMD_ID, IMPORT_CMD_NAME, IMPORT_CMD_Description, ICON_FOLDER)
 
     # Define an event handler for the command created event. It will be called when the button is clicked.
     futil.add_handler(create_cmd_def.commandCreated, command_created)
     futil.add_handler(edit_cmd_def.commandCreated, edit_command_created)
     futil.add_handler(delete_cmd_def.commandCreated, delete_command_created)
+    futil.add_handler(delete_all_cmd_def.commandCreated, delete_all_command_created)
+    futil.add_handler(bulk_edit_cmd_def.commandCreated, bulk_edit_command_created)
+    futil.add_handler(import_cmd_def.commandCreated, import_command_created)
 
     # ******** Add a button into the UI so the user can run the command. ********
     # Get the target workspace the button will be created in.
@@ -76,10 +125,18 @@ def start():
     # Specify if the command is promoted to the main toolbar. 
     control.isPromoted = IS_PROMOTED
 
-    # Listen for activeSelectionChanged events
+    submenu.controls.addCommand(bulk_edit_cmd_def)
+    submenu.controls.addCommand(import_cmd_def)
+    submenu.controls.addCommand(delete_all_cmd_def)
+
+    # Deleting or editing part of a CCLine is caught everywhere.  The handler
+    # checks the command before anything else so it costs next to nothing.
     futil.add_handler( ui.commandStarting, ui_command_starting, local_handlers=ui_handlers )
-    futil.add_handler( ui.activeSelectionChanged, ui_selection_changed, local_handlers=ui_handlers )
-    futil.add_handler( ui.markingMenuDisplaying, ui_marking_menu, local_handlers=ui_handlers )
+
+    # Watch for a sketch with CCLines being edited.  The selection and marking
+    # menu hooks are only connected while that is true.
+    futil.add_handler( ui.commandTerminated, ui_command_terminated, local_handlers=ui_handlers )
+    futil.add_handler( app.documentActivated, ui_document_activated, local_handlers=ui_handlers )
 
 # Executed when add-in is stopped.
 def stop():
@@ -92,12 +149,26 @@ def stop():
     command_definition = ui.commandDefinitions.itemById(CREATE_CMD_ID)
     edit_cmd_def = ui.commandDefinitions.itemById(EDIT_CMD_ID)
     delete_cmd_def = ui.commandDefinitions.itemById(DELETE_CMD_ID)
+    delete_all_control = submenu.controls.itemById(DELETE_ALL_CMD_ID)
+    delete_all_cmd_def = ui.commandDefinitions.itemById(DELETE_ALL_CMD_ID)
+    bulk_edit_control = submenu.controls.itemById(BULK_EDIT_CMD_ID)
+    bulk_edit_cmd_def = ui.commandDefinitions.itemById(BULK_EDIT_CMD_ID)
+    import_control = submenu.controls.itemById(IMPORT_CMD_ID)
+    import_cmd_def = ui.commandDefinitions.itemById(IMPORT_CMD_ID)
 
     # Delete the button command control
     if command_control:
         command_control.isPromoted = False
         command_control.deleteMe()
 
+    # Delete the delete all, bulk edit and import button command controls
+    if delete_all_control:
+        delete_all_control.deleteMe()
+    if bulk_edit_control:
+        bulk_edit_control.deleteMe()
+    if import_control:
+        import_control.deleteMe()
+
     # Delete the command definition
     if command_definition:
         command_definition.deleteMe()
@@ -110,15 +181,81 @@ def stop():
     if delete_cmd_def:
         delete_cmd_def.deleteMe()
 
+    # Delete the delete all, bulk edit and import command definitions
+    if delete_all_cmd_def:
+        delete_all_cmd_def.deleteMe()
+    if bulk_edit_cmd_def:
+        bulk_edit_cmd_def.deleteMe()
+    if import_cmd_def:
+        import_cmd_def.deleteMe()
+
     global ui_handlers
+    detach_ui_hooks()
     ui_handlers = []
 
-# Function that is called when a active selection is changed in the UI.
+# Connect the ui hooks that track CCLine selections
+def attach_ui_hooks():
+    if ui_hook_handlers:
+        return
+
+    for event, callback in ( (ui.activeSelectionChanged, ui_selection_changed),
+                             (ui.markingMenuDisplaying, ui_marking_menu) ):
+        handler = futil.add_handler( event, callback, local_handlers=ui_handlers )
+        ui_hook_handlers.append( (event, handler) )
+
+# Disconnect the ui hooks that track CCLine selections
+def detach_ui_hooks():
+    global ui_hook_handlers, selected_CCLine, selected_CCLines
+
+    for event, handler in ui_hook_handlers:
+        event.remove( handler )
+        if handler in ui_handlers:
+            ui_handlers.remove( handler )
+    ui_hook_handlers = []
+    selected_CCLine = None
+    selected_CCLines = []
+
+# Connect the ui hooks only while a sketch that has CCLines is being edited
+def update_ui_hooks():
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    editObject = design.activeEditObject if design else None
+
+    if editObject and editObject.objectType == adsk.fusion.Sketch.classType() and sketchHasCCLines( editObject ):
+        attach_ui_hooks()
+    else:
+        detach_ui_hooks()
+
+# Function that is called when any command finishes.  Entering and leaving a sketch
+# and creating or deleting CCLines are all done with commands.
+def ui_command_terminated(args: adsk.core.ApplicationCommandEventArgs):
+
+    # Undo and Redo can add, remove or change CCLines so the cached ones can't be trusted
+    if args.commandId in ('UndoCommand', 'RedoCommand') :
+        invalidateRegistries()
+
+    update_ui_hooks()
+
+# Function that is called when a different document is activated.
+def ui_document_activated(args: adsk.core.DocumentEventArgs):
+    update_ui_hooks()
+
+# Fusion commands that would take a CCLine apart
+GUARDED_COMMANDS = ( 'Delete', 'Edit Sketch Dimension' )
+
+# Function that is called when any command starts.
 def ui_command_starting(args: adsk.core.ApplicationCommandEventArgs):
 
-    global selected_CCLine, target_CCLine
+    global selected_CCLine, selected_CCLines, target_CCLine, target_CCLines
     # futil.log(f' Command Starting={args.commandDefinition.name}, selected_CCLine ={selected_CCLine}')
 
+    # Outside a sketch with CCLines the selection isn't tracked, so it is only
+    # looked at for the commands that matter
+    if not ui_hook_handlers:
+        if args.commandDefinition.name not in GUARDED_COMMANDS :
+            return
+        selected_CCLines = selectedCCLines( ui.activeSelections )
+        selected_CCLine = selected_CCLines[0] if selected_CCLines else None
+
     # If a CCLine is not selected then just return
     if not selected_CCLine :
         return
@@ -128,6 +265,7 @@ def ui_command_starting(args: adsk.core.ApplicationCommandEventArgs):
     # must be kept or it will be set to None in ui_selection_changed()
     # This variable is set to None in the destroy() callback of the commands
     target_CCLine = selected_CCLine
+    target_CCLines = selected_CCLines
 
     # Kill the editing of the dimensions within the CCLine
     if args.commandDefinition.name == 'Edit Sketch Dimension' :
@@ -142,16 +280,23 @@ def ui_command_starting(args: adsk.core.ApplicationCommandEventArgs):
 # Function that is called when a active selection is changed in the UI.
 def ui_selection_changed(args: adsk.core.ActiveSelectionEventArgs):
 
-    global selected_CCLine
+    global selected_CCLine, selected_CCLines
 
     # futil.log(f' Selection Changed: at start ccLine={selected_CCLine}')
-    args.firingEvent.name
-    selected_CCLine = None
-    if len( args.currentSelection ) > 0:
-        selected_CCLine = getCCLineFromEntity( args.currentSelection[0].entity )
+    selected_CCLines = selectedCCLines( args.currentSelection )
+    selected_CCLine = selected_CCLines[0] if selected_CCLines else None
     
     # futil.log(f'                    at end ccLine={selected_CCLine}')
 
+# The CCLines of a list of selections, each once
+def selectedCCLines( selections ) -> list[CCLine] :
+    ccLines = []
+    for selection in selections:
+        ccLine = findCCLine( selection.entity )
+        if ccLine and all( ccLine.line != other.line for other in ccLines ):
+            ccLines.append( ccLine )
+    return ccLines
+
 # Function that is called when the marking menu is going to be displayed.
 def ui_marking_menu(args: adsk.core.MarkingMenuEventArgs):
 
@@ -187,7 +332,7 @@ def ui_marking_menu(args: adsk.core.MarkingMenuEventArgs):
     editCCLineSep = controls.itemById( "EditCCLineSeparator" )
 
     if len(args.selectedEntities) > 0 :
-        ccLine = getCCLineFromEntity( args.selectedEntities[0] )
+        ccLine = findCCLine( args.selectedEntities[0] )
         # for control in controls:
         #     if control.objectType == adsk.core.SeparatorControl.classType():
         #         sep: adsk.core.SeparatorControl = control
@@ -224,9 +369,9 @@ def edit_command_created(args: adsk.core.CommandCreatedEventArgs):
 
     # Motion Component Type
     motionType = inputs.addDropDownCommandInput('motion_type', 'Motion Type', adsk.core.DropDownStyles.TextListDropDownStyle)
-    for mtype in motionTypes:
-        motionType.listItems.add( mtype, True, '')
-    motionType.listItems.item( motionTypesDefault ).isSelected = True
+    for mtype in motionCatalog:
+        motionType.listItems.add( mtype.name, True, '')
+    motionType.listItems.item( motionCatalog.position( motionTypesDefault ) ).isSelected = True
 
     # Create a integer spinners for cog1 and cog2.
     cog1Teeth = inputs.addIntegerSpinnerCommandInput('cog1_teeth', 'Cog #1 Teeth', 8, 100, 1, 36)
@@ -237,6 +382,9 @@ def edit_command_created(args: adsk.core.CommandCreatedEventArgs):
     beltTeeth = inputs.addIntegerSpinnerCommandInput( "belt_teeth", "Belt Teeth", 35, 400, 1, 70 )
     beltTeeth.isVisible = False
 
+    stockOnly = inputs.addBoolValueInput( "stock_only", "Stocked Belts Only", True, "", False )
+    stockOnly.isVisible = False
+
     # Create a value input field and set the default using 1 unit of the default length unit.
     defaultLengthUnits = "in"
     default_value = adsk.core.ValueInput.createByString('0.003')
@@ -246,11 +394,18 @@ def edit_command_created(args: adsk.core.CommandCreatedEventArgs):
     lineData = target_CCLine.data
     cog1Teeth.value = lineData.N1
     cog2Teeth.value = lineData.N2
-    if lineData.motion != 0 :
+    motion = motionCatalog[lineData.motion]
+    if motion.wrapped :
         beltTeeth.value = lineData.Teeth
         beltTeeth.isVisible = True
+        stockOnly.isVisible = getBeltStock( config.BELT_STOCK_FILE ).hasStock( motion.name )
     extraCenter.value = lineData.ExtraCenterIN * 2.54
-    motionType.listItems.item( lineData.motion ).isSelected = True
+    motionType.listItems.item( motionCatalog.position( lineData.motion ) ).isSelected = True
+
+    inputs.addTextBoxCommandInput('cc_result', 'Result', '', 3, True)
+    updateResultText( inputs )
+
+    addRatioExplorer( inputs )
 
     # Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
@@ -267,16 +422,319 @@ def delete_command_created(args: adsk.core.CommandCreatedEventArgs):
     futil.add_handler(args.command.destroy, delete_command_destroy, local_handlers=local_handlers)
 
 def delete_command_execute(args: adsk.core.CommandEventArgs):
-    global target_CCLine
+    global target_CCLines
 
-    futil.log(f'Delete Command Executed Event ccLine={target_CCLine}')
-    deleteCCLine( target_CCLine )
+    futil.log(f'Delete Command Executed Event for {len(target_CCLines)} CCLines')
+    deleteCCLines( target_CCLines )
 
 def delete_command_destroy(args: adsk.core.CommandEventArgs):
-    global target_CCLine
+    global target_CCLine, target_CCLines
 
     target_CCLine = None
+    target_CCLines = []
+
+def delete_all_command_created(args: adsk.core.CommandCreatedEventArgs):
+
+    futil.add_handler(args.command.execute, delete_all_command_execute, local_handlers=local_handlers)
+
+def delete_all_command_execute(args: adsk.core.CommandEventArgs):
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    sketch = design.activeEditObject if design else None
+    if not sketch or sketch.objectType != adsk.fusion.Sketch.classType():
+        futil.popup_error( 'A sketch must be active to delete its C-C Distances.' )
+        return
+
+    ccLines = getSketchCCLines( sketch )
+    if not ccLines:
+        return
+
+    answer = ui.messageBox( f'Delete all {len(ccLines)} C-C Distances in {sketch.name}?', DELETE_ALL_CMD_NAME,
+                            adsk.core.MessageBoxButtonTypes.YesNoButtonType )
+    if answer != adsk.core.DialogResults.DialogYes:
+        return
+
+    deleteCCLines( ccLines )
+
+def bulk_edit_command_created(args: adsk.core.CommandCreatedEventArgs):
+    global target_CCLines
+
+    inputs = args.command.commandInputs
+
+    # The CCLines to change.  Starts with the CCLines selected when the command was started.
+    lineSelection = inputs.addSelectionInput('ccline_selection', 'C-C Distances', 'Select the C-C Distances to change')
+    lineSelection.addSelectionFilter( "SketchLines" )
+    lineSelection.setSelectionLimits( 0, 0 )
+    for ccLine in target_CCLines:
+        lineSelection.addSelection( ccLine.line )
+
+    inputs.addBoolValueInput( "all_in_sketch", "All in Active Sketch", True, "", False )
+
+    # Only change the CCLines of this motion type
+    matchMotion = inputs.addDropDownCommandInput('match_motion', 'Only Motion Type', adsk.core.DropDownStyles.TextListDropDownStyle)
+    matchMotion.listItems.add( 'Any', True, '')
+    for mtype in motionCatalog:
+        matchMotion.listItems.add( mtype.name, False, '')
+
+    # The field changes
+    setMotion = inputs.addDropDownCommandInput('set_motion', 'Set Motion Type', adsk.core.DropDownStyles.TextListDropDownStyle)
+    setMotion.listItems.add( 'Unchanged', True, '')
+    for mtype in motionCatalog:
+        setMotion.listItems.add( mtype.name, False, '')
+
+    inputs.addBoolValueInput( "set_extra_center", "Set Extra Center", True, "", False )
+    extraCenter = inputs.addValueInput('extra_center', 'Extra Center', "in", adsk.core.ValueInput.createByString('0.003'))
+    extraCenter.isVisible = False
+
+    inputs.addIntegerSpinnerCommandInput( "belt_teeth_offset", "Belt Teeth Offset", -100, 100, 1, 0 )
+
+    futil.add_handler(args.command.execute, bulk_edit_command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, bulk_edit_command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+def bulk_edit_command_input_changed(args: adsk.core.InputChangedEventArgs):
+    inputs = args.inputs
+
+    if args.input.id == 'set_extra_center':
+        inputs.itemById( 'extra_center' ).isVisible = args.input.value
 
+    if args.input.id == 'all_in_sketch':
+        inputs.itemById( 'ccline_selection' ).isVisible = not args.input.value
+
+    # Drop selected lines that are not CCLines
+    if args.input.id == 'ccline_selection':
+        lineSelection: adsk.core.SelectionCommandInput = args.input
+        lines = [ lineSelection.selection(i).entity for i in range( lineSelection.selectionCount ) ]
+        ccLines = [ line for line in lines if findCCLine( line ) ]
+        if len( ccLines ) != len( lines ):
+            lineSelection.clearSelection()
+            for line in ccLines:
+                lineSelection.addSelection( line )
+
+def bulk_edit_command_execute(args: adsk.core.CommandEventArgs):
+    inputs = args.command.commandInputs
+    lineSelection: adsk.core.SelectionCommandInput = inputs.itemById('ccline_selection')
+    allInSketch = inputs.itemById( 'all_in_sketch' ).value
+    matchMotion: adsk.core.DropDownCommandInput = inputs.itemById('match_motion')
+    setMotion: adsk.core.DropDownCommandInput = inputs.itemById('set_motion')
+    setExtraCenter = inputs.itemById( 'set_extra_center' ).value
+    extraCenterInp: adsk.core.ValueCommandInput = inputs.itemById('extra_center')
+    beltTeethOffset = inputs.itemById( 'belt_teeth_offset' ).value
+
+    if allInSketch:
+        design = adsk.fusion.Design.cast(app.activeProduct)
+        sketch = design.activeEditObject
+        if sketch.objectType != adsk.fusion.Sketch.classType():
+            futil.popup_error( 'A sketch must be active to edit all of its C-C Distances.' )
+            return
+        ccLines = getSketchCCLines( sketch )
+    else:
+        ccLines = [ findCCLine( lineSelection.selection(i).entity ) for i in range( lineSelection.selectionCount ) ]
+
+    # Index 0 of the motion type lists is Any/Unchanged
+    matchIdx = matchMotion.selectedItem.index - 1
+    matchId = motionCatalog.atPosition( matchIdx ).id if matchIdx >= 0 else None
+    newMotion = setMotion.selectedItem.index - 1
+    newId = motionCatalog.atPosition( newMotion ).id if newMotion >= 0 else None
+
+    # Compute all of the new data in memory first
+    changes = []
+    failed = 0
+    for ccLine in ccLines:
+        if not ccLine or (matchId is not None and ccLine.data.motion != matchId):
+            continue
+        if ccLine.line.isFullyConstrained:
+            futil.log(f'Skipping fully constrained CCLine {createLabelString( ccLine.data )}')
+            continue
+
+        ld = ccLine.data.copy()
+        if newId is not None:
+            ld.motion = newId
+        if setExtraCenter:
+            ld.ExtraCenterIN = extraCenterInp.value / 2.54
+        if motionCatalog[ld.motion].wrapped:
+            if ld.Teeth == 0:
+                ld.Teeth = 70
+            ld.Teeth = min( max( ld.Teeth + beltTeethOffset, 35 ), 400 )
+        try:
+            calcCCLineData( ld )
+        except ValueError as error:
+            # A chain too short for its sprockets
+            futil.log(f'Skipping CCLine {createLabelString( ccLine.data )}: {error}')
+            failed += 1
+            continue
+        changes.append( (ccLine, ld) )
+
+    # Push all of the dimension changes with a single recompute of each sketch.
+    # modifyCCLine works from ccLine.data, so the old data is kept to put back.
+    sketches = { ccLine.line.parentSketch.entityToken: ccLine.line.parentSketch for ccLine, ld in changes }
+    oldData = {}
+    with futil.computeDeferred( *sketches.values() ):
+        for ccLine, ld in changes:
+            oldData[id( ccLine )] = ccLine.data
+            ccLine.data = ld
+            if not modifyCCLine( ccLine, False ):
+                ccLine.data = oldData[id( ccLine )]
+
+    # A line that can't take its length only shows once the sketches are
+    # solved.  Those get their old data and dimensions back, the rest are saved.
+    for ccLine, ld in changes:
+        if ccLine.data is ld and not solvedToLength( ccLine ):
+            ccLine.data = oldData[id( ccLine )]
+            modifyCCLine( ccLine, False )
+        if ccLine.data is ld:
+            setCCLineAttributes( ccLine )
+            registerCCLine( ccLine )
+        else:
+            futil.log(f'Could not change CCLine {createLabelString( ccLine.data )}')
+            failed += 1
+
+    changed = sum( 1 for ccLine, ld in changes if ccLine.data is ld )
+    futil.log(f'{BULK_EDIT_CMD_NAME}: changed {changed} C-C Distances, {failed} failed.')
+    if failed > 0:
+        futil.popup_error( f'{failed} C-C Distances could not be changed.  Are both ends of each C-C Distance constrained '
+                           'and is each chain long enough for its sprockets?' )
+
+
+def import_command_created(args: adsk.core.CommandCreatedEventArgs):
+
+    futil.add_handler(args.command.execute, import_command_execute, local_handlers=local_handlers)
+
+# Create every CCLine of a layout file in the active sketch.
+#
+# JSON layout files look like this, with the coordinates and extra center in "units":
+#   { "units": "mm",
+#     "shafts": { "motor": [0, 0], "out": [60, 0] },
+#     "stages": [ { "from": "motor", "to": "out", "motion": "HTD 5mm Belt",
+#                   "N1": 18, "N2": 36, "teeth": 90, "EC": 0 } ] }
+#
+# CSV layout files have one stage per row with these columns (mm):
+#   from,from_x,from_y,to,to_x,to_y,motion,N1,N2,teeth,EC
+# Stages that share a shaft name (or the same coordinates) share a sketch point.
+# The shaft coordinates only set the direction of each stage, the C-C
+# distance comes from the stage itself.
+def import_command_execute(args: adsk.core.CommandEventArgs):
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    sketch = design.activeEditObject if design else None
+    if not sketch or sketch.objectType != adsk.fusion.Sketch.classType():
+        futil.popup_error( 'A sketch must be active to import a C-C layout.' )
+        return
+
+    fileDlg = ui.createFileDialog()
+    fileDlg.title = IMPORT_CMD_NAME
+    fileDlg.filter = 'Layout Files (*.json;*.csv);;All Files (*.*)'
+    if fileDlg.showOpen() != adsk.core.DialogResults.DialogOK:
+        return
+
+    try:
+        shafts, stages = readLayoutFile( fileDlg.filename )
+    except (OSError, ValueError, KeyError) as err:
+        futil.popup_error( f'Could not read the C-C layout {fileDlg.filename}:\n{err}' )
+        return
+
+    startTime = time.perf_counter()
+    ccLines = importLayout( sketch, shafts, stages )
+    elapsed = time.perf_counter() - startTime
+
+    perHundred = elapsed / len(ccLines) * 100 if ccLines else 0
+    futil.log(f'{IMPORT_CMD_NAME}: {len(ccLines)} C-C Distances in {elapsed:.2f}s ({perHundred:.2f}s per 100)')
+    ui.messageBox( f'Created {len(ccLines)} C-C Distances in {elapsed:.2f}s ({perHundred:.2f}s per 100).' )
+
+# Read a layout file into a dictionary of shaft name -> (x, y) in cm and a
+# list of stages (from, to, CCLineData)
+def readLayoutFile( filename: str ) :
+    shafts = {}
+    stages = []
+
+    if filename.lower().endswith( '.csv' ):
+        with open( filename, newline='' ) as f:
+            for row in csv.DictReader( f ):
+                ends = []
+                for end in ( 'from', 'to' ):
+                    pt = ( float(row[f'{end}_x']) / 10, float(row[f'{end}_y']) / 10 )
+                    name = row.get( end ) or f'{pt[0]:.4f},{pt[1]:.4f}'
+                    shafts.setdefault( name, pt )
+                    ends.append( name )
+                stages.append( (ends[0], ends[1], layoutStageData( row, 1 / 25.4 )) )
+    else:
+        with open( filename ) as f:
+            layout = json.load( f )
+        scale = { 'mm': 0.1, 'cm': 1.0, 'in': 2.54 }[ layout.get( 'units', 'mm' ) ]
+        for name, pt in layout['shafts'].items():
+            shafts[name] = ( pt[0] * scale, pt[1] * scale )
+        for stage in layout['stages']:
+            stages.append( (stage['from'], stage['to'], layoutStageData( stage, scale / 2.54 )) )
+
+    for fromShaft, toShaft, ld in stages:
+        if fromShaft not in shafts or toShaft not in shafts:
+            raise KeyError( f'Unknown shaft in stage {fromShaft} -> {toShaft}' )
+
+    return shafts, stages
+
+# The CCLineData of a layout stage.  ecScale converts the EC value to inches.
+def layoutStageData( stage: dict, ecScale: float ) -> CCLineData :
+    motion = str( stage.get( 'motion', 0 ) ).strip()
+    try:
+        if motion.isdigit():
+            motionId = motionCatalog[int( motion )].id
+        else:
+            motionId = motionCatalog.named( motion ).id
+    except KeyError:
+        raise ValueError( f'Unknown motion type "{motion}"' ) from None
+
+    ld = CCLineData()
+    ld.motion = motionId
+    ld.N1 = int( stage['N1'] )
+    ld.N2 = int( stage['N2'] )
+    ld.Teeth = int( stage.get( 'teeth' ) or 0 )
+    ld.ExtraCenterIN = float( stage.get( 'EC' ) or 0 ) * ecScale
+    try:
+        calcCCLineData( ld )
+    except ValueError as err:
+        # A chain too short for its sprockets
+        raise ValueError( f'Stage {createLabelString( ld )}: {err}' ) from None
+    return ld
+
+# Create the sketch points and CCLines of a layout as one batch with a single
+# solve of the sketch and a single write of the sketch index.
+def importLayout( sketch: adsk.fusion.Sketch, shafts: dict, stages: list ) -> list[CCLine] :
+    points = {}
+    ccLines = []
+
+    with futil.computeDeferred( sketch ):
+        for fromShaft, toShaft, ld in stages:
+            if fromShaft not in points:
+                x, y = shafts[fromShaft]
+                points[fromShaft] = sketch.sketchPoints.add( adsk.core.Point3D.create( x, y, 0 ) )
+            startPt = points[fromShaft]
+
+            if toShaft not in points:
+                # Put the new end point at its final distance in the direction of the layout
+                x, y = shafts[toShaft]
+                start = startPt.geometry
+                dist = math.hypot( x - start.x, y - start.y )
+                if dist < 1e-6:
+                    dirX, dirY = 1.0, 0.0
+                else:
+                    dirX, dirY = (x - start.x) / dist, (y - start.y) / dist
+                length = (ld.ccDistIN + ld.ExtraCenterIN) * 2.54
+                endPt3D = futil.offsetPoint3D( start, dirX * length, dirY * length, 0 )
+                points[toShaft] = sketch.sketchPoints.add( endPt3D )
+            endPt = points[toShaft]
+
+            ccLine = CCLine()
+            ccLine.line = createCCLine( startPt, endPt )
+            ccLine.data = ld
+            buildCCLine( ccLine )
+            ccLines.append( ccLine )
+
+        index = getSketchIndex( sketch )
+        for ccLine in ccLines:
+            setCCLineAttributes( ccLine, index )
+        setSketchIndex( sketch, index )
+        for ccLine in ccLines:
+            registerCCLine( ccLine, index )
+
+    return ccLines
 
 # Function that is called when a user clicks the corresponding button in the UI.
 # This defines the contents of the command dialog and connects to the command related events.
@@ -290,9 +748,9 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 
     # Motion Component Type
     motionType = inputs.addDropDownCommandInput('motion_type', 'Motion Type', adsk.core.DropDownStyles.TextListDropDownStyle)
-    for mtype in motionTypes:
-        motionType.listItems.add( mtype, True, '')
-    motionType.listItems.item( motionTypesDefault ).isSelected = True
+    for mtype in motionCatalog:
+        motionType.listItems.add( mtype.name, True, '')
+    motionType.listItems.item( motionCatalog.position( motionTypesDefault ) ).isSelected = True
 
     # Create a selection input.
     curveSelection = inputs.addSelectionInput('curve_selection', 'Selection', 'Select a circle, or a center point')
@@ -312,11 +770,19 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     beltTeeth = inputs.addIntegerSpinnerCommandInput( "belt_teeth", "Belt Teeth", 35, 400, 1, 70 )
     beltTeeth.isVisible = False
 
+    stockOnly = inputs.addBoolValueInput( "stock_only", "Stocked Belts Only", True, "", False )
+    stockOnly.isVisible = False
+
     # Create a value input field and set the default using 1 unit of the default length unit.
     defaultLengthUnits = "in"
     default_value = adsk.core.ValueInput.createByString('0.003')
     inputs.addValueInput('extra_center', 'Extra Center', defaultLengthUnits, default_value)
 
+    inputs.addTextBoxCommandInput('cc_result', 'Result', '', 3, True)
+    updateResultText( inputs )
+
+    addRatioExplorer( inputs )
+
     # TODO Connect to the events that are needed by this command.
     futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
     futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
@@ -337,13 +803,17 @@ def command_execute(args: adsk.core.CommandEventArgs):
 
     # Get a reference to your command's inputs.
     inputs = args.command.commandInputs
-    motionType: adsk.core.DropDownCommandInput = inputs.itemById('motion_type' )
     curveSelection: adsk.core.SelectionCommandInput = inputs.itemById('curve_selection')
-    cog1TeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('cog1_teeth')
-    cog2TeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('cog2_teeth')
-    swapCogs = inputs.itemById( "swap_cogs" ).value
-    beltTeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById( "belt_teeth" )
-    extraCenterInp: adsk.core.ValueInput = inputs.itemById('extra_center')
+
+    # Calculate the CCLine data from the inputs before touching the sketch.
+    # validateInputs keeps OK disabled when this fails.
+    ld = readCCLineInputs( inputs )
+    try:
+        calcCCLineData( ld )
+    except ValueError as err:
+        if args.firingEvent.name != "OnExecutePreview" :
+            futil.popup_error( f'{err}.' )
+        return
 
     startSketchPt = None
     endSketchPt = None
@@ -363,35 +833,197 @@ def command_execute(args: adsk.core.CommandEventArgs):
             startSketchPt = selEntity
 
     if ccLine.line == None:
-        ccLine.line = createCCLine( startSketchPt, endSketchPt )
+        ccLine.line = createCCLine( startSketchPt, endSketchPt, ld.ccDistIN + ld.ExtraCenterIN )
     elif isCCLine( ccLine.line ):
         ccLine = getCCLineFromEntity( ccLine.line )
 
-    ccLine.data.ExtraCenterIN = extraCenterInp.value / 2.54
-    ccLine.data.Teeth = int(beltTeethInp.value)
-    ccLine.data.N1 = int(cog1TeethInp.value)
-    ccLine.data.N2 = int(cog2TeethInp.value)
-    ccLine.data.motion = motionType.selectedItem.index
-
-    if swapCogs :
-        ccLine.data.N2 = int(cog1TeethInp.value)
-        ccLine.data.N1 = int(cog2TeethInp.value)
+    ccLine.data = ld
 
     preview = False
     if args.firingEvent.name == "OnExecutePreview" :
         preview = True
 
     if not isCCLine( ccLine.line ):
-        calcCCLineData( ccLine.data )
-        dimAndLabelCCLine( ccLine )
-        createEndCircles( ccLine )
-    else:
-        calcCCLineData( ccLine.data )
-        modifyCCLine( ccLine )
+        if preview :
+            # Fusion rolls back everything made during a preview before the next
+            # input change, so only the cheap geometry is drawn for a new CCLine.
+            previewCCLine( ccLine )
+            return
+        buildCCLine( ccLine )
+    elif not modifyCCLine( ccLine ):
+        # Don't save data the centerline didn't take
+        return
 
     if not preview :
         setCCLineAttributes( ccLine )
+        registerCCLine( ccLine )
+
+
+# Read the CCLine data from the command inputs
+def readCCLineInputs( inputs: adsk.core.CommandInputs ) -> CCLineData :
+    motionType: adsk.core.DropDownCommandInput = inputs.itemById('motion_type' )
+    cog1TeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('cog1_teeth')
+    cog2TeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById('cog2_teeth')
+    swapCogs = inputs.itemById( "swap_cogs" ).value
+    beltTeethInp: adsk.core.IntegerSpinnerCommandInput = inputs.itemById( "belt_teeth" )
+    extraCenterInp: adsk.core.ValueCommandInput = inputs.itemById('extra_center')
+
+    ld = CCLineData()
+    ld.ExtraCenterIN = extraCenterInp.value / 2.54
+    ld.Teeth = int(beltTeethInp.value)
+    ld.N1 = int(cog1TeethInp.value)
+    ld.N2 = int(cog2TeethInp.value)
+    ld.motion = motionCatalog.atPosition( motionType.selectedItem.index ).id
+
+    if swapCogs :
+        ld.N2 = int(cog1TeethInp.value)
+        ld.N1 = int(cog2TeethInp.value)
+
+    return ld
+
+# Show the label and C-C distance of the current inputs in the dialog
+def updateResultText( inputs: adsk.core.CommandInputs ) :
+    resultText: adsk.core.TextBoxCommandInput = inputs.itemById('cc_result')
+    ld = readCCLineInputs( inputs )
+    try:
+        calcCCLineData( ld )
+    except ValueError as err:
+        # A chain too short for its sprockets
+        resultText.formattedText = f'{createLabelString( ld )}<br>{err}'
+        return
+    resultText.formattedText = f'{createLabelString( ld )}<br>C-C = {(ld.ccDistIN + ld.ExtraCenterIN) * 25.4:.2f}mm'
+    if motionCatalog[ld.motion].kind == 'belt':
+        resultText.formattedText += '<br>' + stockedBeltText( ld )
+
+# The nearest stocked belts below and above the belt of ld, with their C-C
+# distance and the extra center that keeps the current C-C distance.
+def stockedBeltText( ld: CCLineData ) -> str :
+    stock = getBeltStock( config.BELT_STOCK_FILE )
+    motionName = motionCatalog[ld.motion].name
+    if not stock.hasStock( motionName ):
+        return 'No stocked belts'
+
+    currentCC = ld.ccDistIN + ld.ExtraCenterIN
+    stockLD = ld.copy()
+    texts = []
+    for teeth in ( stock.step( motionName, ld.Teeth, False ), stock.step( motionName, ld.Teeth, True ) ):
+        if teeth is None:
+            continue
+        stockLD.Teeth = teeth
+        try:
+            calcCCLineData( stockLD )
+        except ValueError:
+            # Too short to go around the pulleys
+            continue
+        texts.append( f'{teeth}T {stockLD.ccDistIN * 25.4:.1f}mm EC {(currentCC - stockLD.ccDistIN) * 25.4:+.1f}mm' )
+
+    inStock = 'In stock' if stock.isStocked( motionName, ld.Teeth ) else 'Stock'
+    return f'{inStock}: ' + ', '.join( texts )
+
+# The ratio explorer searches every cog and belt combination of the current motion
+# type for a ratio and C-C window.  Picking a row of the results fills the cog
+# and belt spinners.
+def addRatioExplorer( inputs: adsk.core.CommandInputs ) :
+    group = inputs.addGroupCommandInput( 'ratio_explorer', 'Ratio Explorer' )
+    group.isExpanded = False
+    groupInputs = group.children
+
+    groupInputs.addFloatSpinnerCommandInput( 'ratio_min', 'Min Ratio (N2/N1)', '', 0.05, 20, 0.1, 2.9 )
+    groupInputs.addFloatSpinnerCommandInput( 'ratio_max', 'Max Ratio (N2/N1)', '', 0.05, 20, 0.1, 3.1 )
+    groupInputs.addValueInput( 'search_cc_min', 'Min C-C', 'in', adsk.core.ValueInput.createByString( '2 in' ) )
+    groupInputs.addValueInput( 'search_cc_max', 'Max C-C', 'in', adsk.core.ValueInput.createByString( '8 in' ) )
+    groupInputs.addIntegerSpinnerCommandInput( 'search_cog_min', 'Min Cog Teeth', 8, 100, 1, 12 )
+    groupInputs.addIntegerSpinnerCommandInput( 'search_cog_max', 'Max Cog Teeth', 8, 100, 1, 60 )
+    groupInputs.addIntegerSpinnerCommandInput( 'search_belt_min', 'Min Belt Teeth', 35, 400, 1, 35 )
+    groupInputs.addIntegerSpinnerCommandInput( 'search_belt_max', 'Max Belt Teeth', 35, 400, 1, 400 )
+
+    gridInp = groupInputs.addDropDownCommandInput( 'search_grid', 'Land C-C On', adsk.core.DropDownStyles.TextListDropDownStyle )
+    for name, pitch in gridPitches:
+        gridInp.listItems.add( name, False, '' )
+    gridInp.listItems.item( 0 ).isSelected = True
+    extraMin = groupInputs.addValueInput( 'search_extra_min', 'Min Extra Center', 'in', adsk.core.ValueInput.createByString( '0 in' ) )
+    extraMax = groupInputs.addValueInput( 'search_extra_max', 'Max Extra Center', 'in', adsk.core.ValueInput.createByString( '0.02 in' ) )
+    extraMin.isVisible = False
+    extraMax.isVisible = False
+
+    groupInputs.addBoolValueInput( 'ratio_search', 'Search', False, '', False )
+    groupInputs.addTextBoxCommandInput( 'ratio_status', '', '', 1, True )
+
+    table = groupInputs.addTableCommandInput( 'ratio_table', 'Results', 5, '1:1:1:2:2' )
+    table.maximumVisibleRows = 8
+    table.isVisible = False
+
+# Run the ratio explorer search and fill the results table
+def runRatioSearch( inputs: adsk.core.CommandInputs ) :
+    global ratio_matches, ratio_search_count
+
+    motion = motionCatalog.atPosition( inputs.itemById( 'motion_type' ).selectedItem.index )
+    ratioMin = inputs.itemById( 'ratio_min' ).value
+    ratioMax = inputs.itemById( 'ratio_max' ).value
+    ccMinIN = inputs.itemById( 'search_cc_min' ).value / 2.54
+    ccMaxIN = inputs.itemById( 'search_cc_max' ).value / 2.54
+    cogRange = ( inputs.itemById( 'search_cog_min' ).value, inputs.itemById( 'search_cog_max' ).value )
+    beltRange = ( inputs.itemById( 'search_belt_min' ).value, inputs.itemById( 'search_belt_max' ).value )
+
+    gridIN = gridPitches[ inputs.itemById( 'search_grid' ).selectedItem.index ][1]
+    extraMinIN = inputs.itemById( 'search_extra_min' ).value / 2.54
+    extraMaxIN = inputs.itemById( 'search_extra_max' ).value / 2.54
+
+    capped = False
+    if ccSearch.np is None and gridIN:
+        if cogRange[1] - cogRange[0] + 1 > pythonGridCogs:
+            cogRange = ( cogRange[0], cogRange[0] + pythonGridCogs - 1 )
+            capped = True
+        if ccMaxIN - ccMinIN > pythonGridSpanIN:
+            ccMaxIN = ccMinIN + pythonGridSpanIN
+            capped = True
+
+    startTime = time.perf_counter()
+    ratio_matches = motion.search( ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, beltRange, gridIN, extraMinIN, extraMaxIN )
+    elapsed = time.perf_counter() - startTime
+
+    status = f'{len(ratio_matches)} best matches in {elapsed*1000:.0f}ms'
+    if capped:
+        status += f', up to {cogRange[1]}T and {ccMaxIN * 25.4:.0f}mm C-C without NumPy'
+    inputs.itemById( 'ratio_status' ).text = status
+    futil.log( f'Ratio explorer: {len(ratio_matches)} matches in {elapsed*1000:.1f}ms' )
+
+    table: adsk.core.TableCommandInput = inputs.itemById( 'ratio_table' )
+    table.clear()
+    ratio_search_count += 1
+
+    def addRow( row: int, cells: tuple ) :
+        for col, text in enumerate( cells ):
+            cell = table.commandInputs.addTextBoxCommandInput( f'ratio_{ratio_search_count}_{row}_{col}', '', text, 1, True )
+            table.addCommandInput( cell, row, col )
+
+    addRow( 0, ( 'N1', 'N2', 'Belt', 'Ratio', 'C-C' ) )
+    for row, match in enumerate( ratio_matches, 1 ):
+        belt = str( match.teeth ) if match.teeth else '-'
+        if gridIN:
+            ccText = f'{match.holes}x ({match.extraCenterIN * 25.4:+.2f}mm)'
+        else:
+            ccText = f'{match.ccIN * 25.4:.2f}mm'
+        addRow( row, ( str( match.N1 ), str( match.N2 ), belt, f'{match.ratio:.3f}', ccText ) )
+
+    table.isVisible = len( ratio_matches ) > 0
+
+# Fill the cog and belt spinners from the selected row of the ratio explorer
+def pickRatioMatch( inputs: adsk.core.CommandInputs ) :
+    table: adsk.core.TableCommandInput = inputs.itemById( 'ratio_table' )
+    row = table.selectedRow
+    if row < 1 or row > len( ratio_matches ):
+        return
 
+    match = ratio_matches[row - 1]
+    inputs.itemById( 'swap_cogs' ).value = False
+    inputs.itemById( 'cog1_teeth' ).value = match.N1
+    inputs.itemById( 'cog2_teeth' ).value = match.N2
+    if match.teeth:
+        inputs.itemById( 'belt_teeth' ).value = match.teeth
+    if hasattr( match, 'extraCenterIN' ):
+        # Grid matches need their extra center to land on the grid
+        inputs.itemById( 'extra_center' ).value = match.extraCenterIN * 2.54
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
 def command_preview(args: adsk.core.CommandEventArgs):
@@ -418,11 +1050,27 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
     swapCogsInp = inputs.itemById( "swap_cogs" )
     requireSelectionInp = inputs.itemById( "require_selection" )
 
+    motion = motionCatalog.atPosition( motionType.selectedItem.index )
     if changed_input.id == 'motion_type':
-        if motionType.selectedItem.index == 0:
-            extraCenter.value = 0.003 * 2.54
-        else:
-            extraCenter.value = 0
+        extraCenter.value = motion.defaultExtraCenterIN * 2.54
+
+        # The ratio explorer results are for the old motion type
+        ratioTable: adsk.core.TableCommandInput = inputs.itemById( 'ratio_table' )
+        ratioTable.clear()
+        ratioTable.isVisible = False
+        inputs.itemById( 'ratio_status' ).text = ''
+
+    if changed_input.id == 'ratio_search':
+        runRatioSearch( inputs )
+
+    if changed_input.id == 'search_grid':
+        onGrid = inputs.itemById( 'search_grid' ).selectedItem.index != 0
+        inputs.itemById( 'search_extra_min' ).isVisible = onGrid
+        inputs.itemById( 'search_extra_max' ).isVisible = onGrid
+
+    parentInput = changed_input.parentCommandInput
+    if changed_input.id == 'ratio_table' or ( parentInput and parentInput.id == 'ratio_table' ):
+        pickRatioMatch( inputs )
 
     if changed_input.id == 'require_selection':
         if requireSelectionInp.value:
@@ -458,22 +1106,42 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
             lineData = getLineData( ccLine )
             cog1Teeth.value = lineData.N1
             cog2Teeth.value = lineData.N2
-            if lineData.motion != 0 :
+            motion = motionCatalog[lineData.motion]
+            if motion.wrapped :
                 beltTeeth.value = lineData.Teeth
             extraCenter.value = lineData.ExtraCenterIN * 2.54
-            motionType.listItems.item( lineData.motion ).isSelected = True
+            motionType.listItems.item( motionCatalog.position( lineData.motion ) ).isSelected = True
             # if motionType.selectedItem.index == 0 :
             #     beltTeeth.isVisible = False
             # else:
             #     beltTeeth.isVisible = True
 
-    if motionType.selectedItem.index == 0 :
+    if not motion.wrapped :
         beltTeeth.isVisible = False
     else:
         if beltTeeth.value == 0 :
             beltTeeth.value = 70
         beltTeeth.isVisible = True
 
+    # Keep the belt on a stocked length
+    global last_belt_teeth
+    stock = getBeltStock( config.BELT_STOCK_FILE )
+    motionName = motion.name
+    stockOnlyInp = inputs.itemById( "stock_only" )
+    stockOnlyInp.isVisible = beltTeeth.isVisible and stock.hasStock( motionName )
+    if stockOnlyInp.isVisible and stockOnlyInp.value and not stock.isStocked( motionName, beltTeeth.value ):
+        if changed_input.id == 'belt_teeth' and abs( beltTeeth.value - last_belt_teeth ) == 1:
+            # Stepped with the spinner arrows
+            snapped = stock.step( motionName, last_belt_teeth, beltTeeth.value > last_belt_teeth )
+        else:
+            below, above = stock.nearest( motionName, beltTeeth.value )
+            snapped = below if above is None or ( below is not None and beltTeeth.value - below < above - beltTeeth.value ) else above
+        if snapped is not None:
+            beltTeeth.value = snapped
+    last_belt_teeth = beltTeeth.value
+
+    updateResultText( inputs )
+
 
 # This event handler is called when the user interacts with any of the inputs in the dialog
 # which allows you to verify that all of the inputs are valid and enables the OK button.
@@ -488,79 +1156,38 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     if not (cog1Teeth.value >= 8 and cog1Teeth.value < 100 and cog2Teeth.value >= 8 and cog1Teeth.value < 100 ):
         args.areInputsValid = False
         return
+
+    # A chain too short for its sprockets has no C-C distance
+    try:
+        calcCCLineData( readCCLineInputs( inputs ) )
+    except ValueError:
+        args.areInputsValid = False
+        return
     
     args.areInputsValid = True        
 
 # This event handler is called when the command terminates.
 def command_destroy(args: adsk.core.CommandEventArgs):
-    global local_handlers, target_CCLine
+    global local_handlers, target_CCLine, target_CCLines, ratio_matches, last_belt_teeth
 
     # General logging for debug.
     # futil.log(f'{args.command.parentCommandDefinition.name} Command Destroy Event')
 
     local_handlers = []
     target_CCLine = None
+    target_CCLines = []
+    ratio_matches = []
+    last_belt_teeth = 0
 
 
 def calcCCLineData( ld: CCLineData ):
-    if ld.motion == 0:
-        # 20DP Gears
-        ld.Teeth = 0
-        ld.ccDistIN = GearsCCDistanceIN( ld.N1, ld.N2, 20 )
-        ld.PD1 = GearsPitchDiameterIN( ld.N1, 20 )
-        ld.PD2 = GearsPitchDiameterIN( ld.N2, 20 )
-        ld.OD1 = GearsOuterDiameterIN( ld.N1, 20 )
-        ld.OD2 = GearsOuterDiameterIN( ld.N2, 20 )
-    else :
-        if ld.motion == 1:
-            # HTD 5mm Belt
-            beltPitchMM = 5
-        else :
-            # HTD 3mm Belt
-            beltPitchMM = 3
-        ld.ccDistIN = BeltCCDistanceIN( ld.N1, ld.N2, ld.Teeth, beltPitchMM )
-        ld.PD1 = BeltPitchDiameterIN( ld.N1, beltPitchMM )
-        ld.PD2 = BeltPitchDiameterIN( ld.N2, beltPitchMM )
-        ld.OD1 = BeltOuterDiameterIN( ld.N1, beltPitchMM )
-        ld.OD2 = BeltOuterDiameterIN( ld.N2, beltPitchMM )
-
-
-def GearsCCDistanceIN( N1: int, N2: int, dp: int ) -> float:
-    pitch_diameter1 = N1 / (1.0 * dp)
-    pitch_diameter2 = N2 / (1.0 * dp)
+    motionCatalog[ld.motion].calcLineData( ld )
 
-    return (pitch_diameter1 + pitch_diameter2) / 2
-
-def GearsPitchDiameterIN( NT: int, dp: int ) -> float:
-    return NT / (1.0 * dp)
-
-def GearsOuterDiameterIN( NT: int, dp: int ) -> float:
-    return NT / (1.0 * dp) + 0.1
-
-def BeltCCDistanceIN( N1: int, N2: int, beltTeeth: int, pitchMM: int ) -> float:
-    PL = beltTeeth * pitchMM / 25.4 # in inches
-    if N1 > N2:
-        PD1 = BeltPitchDiameterIN( N1, pitchMM )
-        PD2 = BeltPitchDiameterIN( N2, pitchMM )
-    else:
-        PD1 = BeltPitchDiameterIN( N2, pitchMM )
-        PD2 = BeltPitchDiameterIN( N1, pitchMM )
-
-    b = 2 * PL - math.pi * ( PD1 + PD2 )
-    fourAC = 8 * (PD1 - PD2)*(PD1 - PD2)
-
-    return ( b + math.sqrt( b*b - fourAC) ) / 8
-
-def BeltPitchDiameterIN( NT: int, pitchMM: int ) -> float:
-    return NT * pitchMM / ( 25.4 * math.pi )
-
-def BeltOuterDiameterIN( NT: int, pitchMM: int ) -> float:
-        # Approximation of the OD of the flanges on the pulleys
-    return BeltPitchDiameterIN(NT, pitchMM) + 0.15
 
 def createCCLine( 
     startpt: adsk.fusion.SketchPoint, 
-    endpt: adsk.fusion.SketchPoint ) -> adsk.fusion.SketchLine :
+    endpt: adsk.fusion.SketchPoint,
+    lengthIN: float = 2.0 ) -> adsk.fusion.SketchLine :
 
     if startpt == None:
         design = adsk.fusion.Design.cast(app.activeProduct)
@@ -570,7 +1197,7 @@ def createCCLine(
     sketch = startpt.parentSketch
 
     if endpt == None:
-        endpt3D = futil.offsetPoint3D( startpt.geometry, 2 * 2.54, 0, 0 )
+        endpt3D = futil.offsetPoint3D( startpt.geometry, lengthIN * 2.54, 0, 0 )
         endpt = sketch.sketchPoints.add( endpt3D )
 
     futil.log( f' createCCLine() points = {futil.format_Point3D(startpt.geometry)} -- {futil.format_Point3D(endpt.geometry)}')
@@ -581,6 +1208,32 @@ def createCCLine(
 
     return ccLine
 
+# Draw just the line and end circles of a new CCLine at their final size.
+# No dimensions, label or constraints are made so it is cheap to redo.
+def previewCCLine( ccLine: CCLine ) :
+    sketch = ccLine.line.parentSketch
+    line = ccLine.line
+    ld = ccLine.data
+
+    with futil.computeDeferred( sketch ):
+        circles = sketch.sketchCurves.sketchCircles
+        for centerPt, diaIN in ( (line.startSketchPoint, ld.PD1), (line.endSketchPoint, ld.PD2),
+                                 (line.startSketchPoint, ld.OD1), (line.endSketchPoint, ld.OD2) ):
+            circle = circles.addByCenterRadius( centerPt, diaIN * 2.54 / 2 )
+            circle.isConstruction = True
+
+# Dimension, label and create the end circles of a new CCLine.  Over 20
+# sketch edits are made and each one would re-solve the whole sketch, so
+# the sketch is only computed once at the end.
+def buildCCLine( ccLine: CCLine ) :
+    startTime = time.perf_counter()
+
+    with futil.computeDeferred( ccLine.line.parentSketch ):
+        dimAndLabelCCLine( ccLine )
+        createEndCircles( ccLine )
+
+    futil.log(f'buildCCLine() took {(time.perf_counter() - startTime)*1000:.1f}ms')
+
 def dimAndLabelCCLine( ccLine: CCLine ) :
 
     sketch = ccLine.line.parentSketch
@@ -644,16 +1297,8 @@ def dimAndLabelCCLine( ccLine: CCLine ) :
 
 
 def createLabelString( ld: CCLineData ) -> str:
-    if ld.motion == 0:
-        lineLabel = f'Gears 20DP ({ld.N1}T+{ld.N2}T)'
-    else :
-        if ld.motion == 1:
-    #         # HTD 5mm Belt
-            lineLabel = f'{ld.Teeth}T HTD 5mm ({ld.N1}Tx{ld.N2}T)'
-        else :
-    #         # HTD 3mm Belt
-            lineLabel = f'{ld.Teeth}T GT2 3mm ({ld.N1}Tx{ld.N2}T)'
-    
+    lineLabel = motionCatalog[ld.motion].labelString( ld.N1, ld.N2, ld.Teeth )
+
     if abs(ld.ExtraCenterIN) > 0.0005 :
         lineLabel += f' EC({ld.ExtraCenterIN:.3})'
 
@@ -704,21 +1349,38 @@ def createCirclePair( line: adsk.fusion.SketchLine,
 
     return ([ startCircle, endCircle ], [diaDim1, diaDim2])
 
-def modifyCCLine( ccLine: CCLine ):
+def modifyCCLine( ccLine: CCLine, showErrors: bool = True ) -> bool :
 
     ld = ccLine.data
+    sketch = ccLine.line.parentSketch
 
-    try:
-        ccLine.lengthDim.value = (ld.ccDistIN + ld.ExtraCenterIN) * 2.54
-    except:
-        futil.popup_error( 'Failed to resize centerline!  Are both ends of C-C Distance constrained?', True )
-        return
-
-    label = createLabelString( ld )
-    ccLine.textBox.text = label
-
-    ccLine.PD1Dim.value = ld.PD1 * 2.54
-    ccLine.PD2Dim.value = ld.PD2 * 2.54
-    ccLine.OD1Dim.value = ld.OD1 * 2.54
-    ccLine.OD2Dim.value = ld.OD2 * 2.54
-
+    # Make all six changes with a single solve of the sketch.  A centerline
+    # that can't take its length only shows once the sketch is solved, so it
+    # is checked after the block.  When the caller has deferred the sketch
+    # the caller checks it with solvedToLength().
+    with futil.computeDeferred( sketch ):
+        try:
+            ccLine.lengthDim.value = (ld.ccDistIN + ld.ExtraCenterIN) * 2.54
+            resized = True
+        except:
+            resized = False
+
+        if resized:
+            label = createLabelString( ld )
+            ccLine.textBox.text = label
+
+            ccLine.PD1Dim.value = ld.PD1 * 2.54
+            ccLine.PD2Dim.value = ld.PD2 * 2.54
+            ccLine.OD1Dim.value = ld.OD1 * 2.54
+            ccLine.OD2Dim.value = ld.OD2 * 2.54
+
+    if resized and not sketch.isComputeDeferred:
+        resized = solvedToLength( ccLine )
+    if not resized and showErrors:
+        futil.popup_error( 'Failed to resize centerline!  Are both ends of C-C Distance constrained?' )
+    return resized
+
+# Whether the centerline of the CCLine solved to the length of its data
+def solvedToLength( ccLine: CCLine ) -> bool :
+    ld = ccLine.data
+    return abs( ccLine.line.length - (ld.ccDistIN + ld.ExtraCenterIN) * 2.54 ) < 1e-6
@@ -0,0 +1,165 @@
+import adsk.core
+import adsk.fusion
+import os
+import csv
+import json
+import time
+import collections
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ...lib.CCLine import *
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCReport'
+CMD_NAME = 'C-C Bill of Materials'
+CMD_Description = 'Export the belts, pulleys and gears of every C-C Distance in the design'
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+# Order of the parts in the report
+PART_ORDER = ( 'Belt', 'Pulley', 'Chain', 'Sprocket', 'Gear Pair', 'Gear' )
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+
+    # Find the the FRCTools submenu.
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+
+    # Create the button command control in the UI.
+    control = submenu.controls.addCommand(cmd_def)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+    command_control = submenu.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.isPromoted = False
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# No inputs are created so the execute event is fired immediately.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Created Event')
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# This event handler is called immediately after the created event because
+# there are no command inputs.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Execute Event')
+
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    if not design:
+        futil.popup_error( 'The C-C Bill of Materials needs an active design.' )
+        return
+
+    fileDlg = ui.createFileDialog()
+    fileDlg.title = 'Save C-C Bill of Materials'
+    fileDlg.filter = 'CSV Files (*.csv);;JSON Files (*.json)'
+    fileDlg.initialFilename = f'{design.parentDocument.name} BOM.csv'
+    if fileDlg.showSave() != adsk.core.DialogResults.DialogOK:
+        return
+    filename = fileDlg.filename
+
+    startTime = time.perf_counter()
+    lineData = getAllLineData( design )
+    bom = buildBOM( lineData )
+
+    if filename.lower().endswith( '.json' ):
+        writeJSON( filename, bom, len(lineData) )
+    else:
+        writeCSV( filename, bom )
+
+    elapsed = time.perf_counter() - startTime
+    futil.log(f'{CMD_NAME}: {len(lineData)} C-C Distances, {len(bom)} BOM lines in {elapsed*1000:.1f}ms')
+    ui.messageBox( f'Found {len(lineData)} C-C Distances.<br>Wrote {len(bom)} lines to {filename}' )
+
+
+# Group identical belts, pulleys and gears and count them.
+# Returns a sorted list of (motion type, part, size, quantity)
+def buildBOM( lineData: list[CCLineData] ) -> list[tuple] :
+    counts = collections.Counter()
+    for ld in lineData:
+        motion = motionCatalog[ld.motion]
+        if motion.pairPart:
+            counts[(ld.motion, motion.pairPart, (max(ld.N1, ld.N2), min(ld.N1, ld.N2)))] += 1
+        if motion.loopPart:
+            counts[(ld.motion, motion.loopPart, (ld.Teeth,))] += 1
+        counts[(ld.motion, motion.wheelPart, (ld.N1,))] += 1
+        counts[(ld.motion, motion.wheelPart, (ld.N2,))] += 1
+
+    keys = sorted( counts, key=lambda k: (motionCatalog.position(k[0]), PART_ORDER.index(k[1]), k[2]) )
+    bom = []
+    for motion, part, teeth in keys:
+        if part == 'Chain':
+            size = f'{teeth[0]} links'
+        else:
+            size = '+'.join( f'{t}T' for t in teeth )
+        bom.append( (motionCatalog[motion].name, part, size, counts[(motion, part, teeth)]) )
+
+    return bom
+
+def writeCSV( filename: str, bom: list[tuple] ) :
+    with open( filename, 'w', newline='' ) as f:
+        writer = csv.writer( f )
+        writer.writerow( ('Motion Type', 'Part', 'Size', 'Quantity') )
+        for row in bom:
+            writer.writerow( row )
+
+def writeJSON( filename: str, bom: list[tuple], ccLineCount: int ) :
+    items = [ {'motion': m, 'part': p, 'size': s, 'quantity': q} for m, p, s, q in bom ]
+    with open( filename, 'w' ) as f:
+        json.dump( {'ccLines': ccLineCount, 'items': items}, f, indent=2 )
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
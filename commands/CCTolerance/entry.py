@@ -0,0 +1,217 @@
+import adsk.core
+import adsk.fusion
+import os
+import time
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ...lib.CCLine import *
+from ...lib import ccTolerance
+from ...lib.ccTolerance import Tolerances, ToleranceStage, analyzeTolerances, toleranceSensitivity, TOLERANCE_NAMES
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_CCTolerance'
+CMD_NAME = 'C-C Tolerance'
+CMD_Description = 'Sample the hole, bearing and part tolerances of the C-C Distances in the active sketch'
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+# The same samples every time so the results only change with the inputs
+TOLERANCE_SEED = 254
+
+# Without NumPy every sample is a Python loop, so take fewer
+DEFAULT_SAMPLES = ccTolerance.DEFAULT_SAMPLES if ccTolerance.np is not None else 10000
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+
+    # Find the the FRCTools submenu.
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+
+    # Create the button command control in the UI.
+    control = submenu.controls.addCommand(cmd_def)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+    command_control = submenu.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.isPromoted = False
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Created Event')
+
+    inputs = args.command.commandInputs
+    defaults = ccTolerance.DEFAULT_TOLERANCES
+
+    inputs.addValueInput('hole_position', 'Hole Position +/-', 'mm', adsk.core.ValueInput.createByString(f'{defaults.holePositionIN * 25.4:.3g} mm'))
+    inputs.addValueInput('bearing_play', 'Bearing Play', 'mm', adsk.core.ValueInput.createByString(f'{defaults.bearingPlayIN * 25.4:.3g} mm'))
+    inputs.addValueInput('pitch_diameter', 'Pitch Diameter +/-', 'mm', adsk.core.ValueInput.createByString(f'{defaults.pitchDiameterIN * 25.4:.3g} mm'))
+    inputs.addFloatSpinnerCommandInput('belt_length', 'Belt Length +/- %', '', 0, 5, 0.05, defaults.loopLengthFraction * 100)
+
+    inputs.addIntegerSpinnerCommandInput('samples', 'Samples', 1000, 1000000, 10000, DEFAULT_SAMPLES)
+    inputs.addFloatSpinnerCommandInput('confidence', 'Confidence %', '', 50, 99.99, 0.1, ccTolerance.DEFAULT_CONFIDENCE * 100)
+
+    inputs.addTextBoxCommandInput('tolerance_result', 'Result', '', 12, True)
+    updateResults( inputs )
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+def activeSketch() -> adsk.fusion.Sketch :
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    sketch = design.activeEditObject if design else None
+    if not sketch or sketch.objectType != adsk.fusion.Sketch.classType():
+        return None
+    return sketch
+
+def readTolerances( inputs: adsk.core.CommandInputs ) -> Tolerances :
+    return Tolerances(
+        inputs.itemById('hole_position').value / 2.54,
+        inputs.itemById('bearing_play').value / 2.54,
+        inputs.itemById('pitch_diameter').value / 2.54,
+        inputs.itemById('belt_length').value / 100 )
+
+# The stage of a CCLine at the sketch positions of its shafts (inches).
+# Shafts are the sketch points at the ends of the lines so CCLines that share
+# a point move together.
+def toleranceStage( ccLine: CCLine ) -> ToleranceStage :
+    line = ccLine.line
+    start = line.startSketchPoint
+    end = line.endSketchPoint
+    ld = ccLine.data
+    return ToleranceStage( line.entityToken, start.entityToken, end.entityToken,
+                           start.geometry.x / 2.54, start.geometry.y / 2.54, end.geometry.x / 2.54, end.geometry.y / 2.54,
+                           motionCatalog[ld.motion], ld.N1, ld.N2, ld.Teeth, ld.ExtraCenterIN )
+
+# Run the analysis of the active sketch.  Returns the results, the sensitivity
+# of each stage and a message when there is nothing to analyze.
+def analyzeSketch( inputs: adsk.core.CommandInputs ) :
+    sketch = activeSketch()
+    if not sketch:
+        return None, None, 'A sketch with C-C Distances must be active'
+    stages = [ toleranceStage( ccLine ) for ccLine in getSketchCCLines( sketch ) ]
+    if not stages:
+        return None, None, f'There are no C-C Distances in {sketch.name}'
+
+    tolerances = readTolerances( inputs )
+    samples = inputs.itemById('samples').value
+    confidence = inputs.itemById('confidence').value / 100
+
+    startTime = time.perf_counter()
+    results = analyzeTolerances( stages, tolerances, samples, confidence, TOLERANCE_SEED )
+    sensitivity = toleranceSensitivity( stages, tolerances, samples, TOLERANCE_SEED )
+    elapsed = time.perf_counter() - startTime
+    futil.log(f'{CMD_NAME}: {len(stages)} C-C Distances x {samples} samples in {elapsed*1000:.1f}ms')
+
+    return results, sensitivity, None
+
+# One line of the report for each C-C Distance, in mm like the C-C Distance results
+def resultLines( results: list, sensitivity: list ) -> list[str] :
+    lines = []
+    for result, parts in zip( results, sensitivity ):
+        stage = result.stage
+        motion = stage.motion
+        e = result.ccError
+        text = f'<b>{motion.labelString( stage.N1, stage.N2, stage.teeth )}</b>: '
+        text += f'C-C error {e.mean*25.4:+.3f} +/- {e.std*25.4:.3f}mm, {e.low*25.4:+.3f} to {e.high*25.4:+.3f}mm. '
+        if result.backlash:
+            text += f'Backlash {max( result.backlash.low, 0 )*25.4:.3f} to {result.backlash.high*25.4:.3f}mm, '
+            text += f'{result.tooClose*100:.1f}% bind. '
+        else:
+            text += f'Slack {result.slack.low*25.4:+.3f} to {result.slack.high*25.4:+.3f}mm, '
+            text += f'{result.tooClose*100:.1f}% loose. '
+        text += f'Extra center {result.suggestedExtraCenterIN:.4f}in (now {stage.extraCenterIN:.4f}in), '
+        text += f'mostly {TOLERANCE_NAMES[max( parts, key=parts.get )]}.'
+        lines.append( text )
+    return lines
+
+def updateResults( inputs: adsk.core.CommandInputs ) :
+    results, sensitivity, message = analyzeSketch( inputs )
+    if message:
+        inputs.itemById('tolerance_result').formattedText = message
+        return
+    inputs.itemById('tolerance_result').formattedText = '<br>'.join( resultLines( results, sensitivity ) )
+
+
+# This event handler is called when the user clicks the OK button in the command dialog.
+# The report is written to the Text Commands window to keep it.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Execute Event')
+
+    results, sensitivity, message = analyzeSketch( args.command.commandInputs )
+    if message:
+        futil.popup_error( message )
+        return
+
+    for line in resultLines( results, sensitivity ):
+        futil.log( line.replace( '<b>', '' ).replace( '</b>', '' ), force_console=True )
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    updateResults( args.inputs )
+
+
+# This event handler is called when the user interacts with any of the inputs in the dialog
+# which allows you to verify that all of the inputs are valid and enables the OK button.
+def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
+    inputs = args.inputs
+    args.areInputsValid = all( inputs.itemById( name ).value >= 0 for name in ( 'hole_position', 'bearing_play', 'pitch_diameter' ) )
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
@@ -0,0 +1,219 @@
+import adsk.core
+import adsk.fusion
+import os
+import json
+import time
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ...lib.CCLine import *
+from ...lib.driveChecks import checkDrives
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_DriveChecks'
+CMD_NAME = 'C-C Drive Checks'
+CMD_Description = 'Check the teeth in mesh, wrap angle, cog sizes and contact ratio of every C-C Distance in the design'
+
+PALETTE_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_DriveChecksPalette'
+PALETTE_NAME = 'C-C Drive Checks'
+
+# Specify the full path to the local html.
+PALETTE_URL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'html', 'index.html')
+
+# The path function builds a valid OS path. This fixes it to be a valid local URL.
+PALETTE_URL = PALETTE_URL.replace('\\', '/')
+
+# Set a default docking behavior for the palette
+PALETTE_DOCKING = adsk.core.PaletteDockingStates.PaletteDockStateRight
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+# Palette and document saving event handlers, kept for as long as the add-in runs
+palette_handlers = []
+save_handlers = []
+
+# The CCLines of the last check, the palette rows refer to them by index
+checked_ccLines = []
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+
+    # Find the the FRCTools submenu.
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+
+    # Create the button command control in the UI.
+    control = submenu.controls.addCommand(cmd_def)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+    if config.DRIVE_CHECKS_ON_SAVE:
+        futil.add_handler(app.documentSaving, document_saving, local_handlers=save_handlers)
+
+
+# Executed when add-in is stopped.
+def stop():
+    global palette_handlers, save_handlers
+
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.PANEL_ID)
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+    command_control = submenu.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+    palette = ui.palettes.itemById(PALETTE_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.isPromoted = False
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+    # Delete the Palette
+    if palette:
+        palette.deleteMe()
+    palette_handlers = []
+    save_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# No inputs are created so the execute event is fired immediately.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Created Event')
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# Check the active design and show the results
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Execute Event')
+
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    if not design:
+        futil.popup_error( 'The C-C Drive Checks need an active design.' )
+        return
+
+    rows = runChecks( design )
+    showPalette()
+    sendRows( rows )
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
+
+
+# Check the design as it is saved.  The palette only opens when something fails.
+def document_saving(args: adsk.core.DocumentEventArgs):
+    design = adsk.fusion.Design.cast( args.document.products.itemByProductType( 'DesignProductType' ) )
+    if not design or not findCCLineAttributes( design ):
+        return
+
+    rows = runChecks( design )
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if rows['issues'] or ( palette and palette.isVisible ):
+        showPalette()
+        sendRows( rows )
+
+
+# Check every CCLine of the design.  Returns the palette rows.
+def runChecks( design: adsk.fusion.Design ) -> dict :
+    global checked_ccLines
+
+    startTime = time.perf_counter()
+    checked_ccLines = getDesignCCLines( design )
+    issues = checkDrives( [ ccLine.data for ccLine in checked_ccLines ], motionCatalog )
+    elapsed = time.perf_counter() - startTime
+    futil.log(f'{CMD_NAME}: {len(checked_ccLines)} C-C Distances, {len(issues)} issues in {elapsed*1000:.1f}ms')
+
+    rows = []
+    for issue in issues:
+        ccLine = checked_ccLines[issue.index]
+        ld = ccLine.data
+        rows.append( {
+            'index': issue.index,
+            'label': motionCatalog[ld.motion].labelString( ld.N1, ld.N2, ld.Teeth ),
+            'sketch': ccLine.line.parentSketch.name,
+            'check': issue.check,
+            'message': issue.message
+        } )
+    return { 'design': design.parentDocument.name, 'ccLines': len( checked_ccLines ), 'issues': rows }
+
+def sendRows( rows: dict ) :
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if palette:
+        palette.sendInfoToHTML( 'setIssues', json.dumps( rows ) )
+
+def showPalette() :
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if palette is None:
+        palette = ui.palettes.add(
+            id=PALETTE_ID,
+            name=PALETTE_NAME,
+            htmlFileURL=PALETTE_URL,
+            isVisible=True,
+            showCloseButton=True,
+            isResizable=True,
+            width=400,
+            height=500,
+            useNewWebBrowser=True
+        )
+        futil.add_handler(palette.incomingFromHTML, palette_incoming, local_handlers=palette_handlers)
+
+    if palette.dockingState == adsk.core.PaletteDockingStates.PaletteDockStateFloating:
+        palette.dockingState = PALETTE_DOCKING
+
+    palette.isVisible = True
+
+
+# Events sent from the palette javascript
+def palette_incoming(html_args: adsk.core.HTMLEventArgs):
+    message_data: dict = json.loads(html_args.data) if html_args.data else {}
+    message_action = html_args.action
+
+    if message_action == 'ready' or message_action == 'refresh':
+        design = adsk.fusion.Design.cast(app.activeProduct)
+        if design:
+            sendRows( runChecks( design ) )
+    elif message_action == 'selectCCLine':
+        # Select the line of the C-C Distance
+        index = message_data.get( 'index', -1 )
+        if 0 <= index < len( checked_ccLines ) and checked_ccLines[index].line.isValid:
+            ui.activeSelections.clear()
+            ui.activeSelections.add( checked_ccLines[index].line )
+
+    html_args.returnData = 'OK'
@@ -0,0 +1,49 @@
+function refresh() {
+    adsk.fusionSendData("refresh", "{}");
+}
+
+function selectCCLine(index) {
+    adsk.fusionSendData("selectCCLine", JSON.stringify({ index: index }));
+}
+
+function setIssues(messageString) {
+    const checks = JSON.parse(messageString);
+    const tbody = document.getElementById("rows");
+    tbody.innerHTML = "";
+    checks.issues.forEach((issue) => {
+        const tr = document.createElement("tr");
+        tr.onclick = () => selectCCLine(issue.index);
+        tr.innerHTML =
+            `<td>${issue.label}</td>` +
+            `<td>${issue.sketch}</td>` +
+            `<td>${issue.check}</td>` +
+            `<td>${issue.message}</td>`;
+        tbody.appendChild(tr);
+    });
+
+    const problems = checks.issues.length === 0 ? "no problems" : `${checks.issues.length} problems`;
+    document.getElementById("summary").innerHTML = `${checks.ccLines} C-C Distances in ${checks.design}, ${problems}`;
+}
+
+window.fusionJavaScriptHandler = {
+    handle: function (action, data) {
+        try {
+            if (action === "setIssues") {
+                setIssues(data);
+            } else if (action === "debugger") {
+                debugger;
+            } else {
+                return `Unexpected command type: ${action}`;
+            }
+        } catch (e) {
+            console.log(e);
+            console.log(`Exception caught with command: ${action}, data: ${data}`);
+        }
+        return "OK";
+    },
+};
+
+window.addEventListener("load", () => {
+    // The palette may be created before the add-in sends the checks
+    setTimeout(() => adsk.fusionSendData("ready", "{}"), 100);
+});
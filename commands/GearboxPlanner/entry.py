@@ -0,0 +1,385 @@
+import adsk.core
+import adsk.fusion
+import os
+import json
+import time
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ...lib.CCLine import *
+from ...lib.gearTrain import GearTrain, Stage
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_GearboxPlanner'
+CMD_NAME = 'Gearbox Planner'
+CMD_Description = 'Show the ratio from each motor to every shaft of the C-C Distances in the active sketch'
+
+PALETTE_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_GearboxPlannerPalette'
+PALETTE_NAME = 'Gearbox Planner'
+
+# Specify the full path to the local html.
+PALETTE_URL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', 'html', 'index.html')
+
+# The path function builds a valid OS path. This fixes it to be a valid local URL.
+PALETTE_URL = PALETTE_URL.replace('\\', '/')
+
+# Set a default docking behavior for the palette
+PALETTE_DOCKING = adsk.core.PaletteDockingStates.PaletteDockStateRight
+
+# Name of the attribute that marks a sketch point as a motor shaft
+MOTOR_ATTRIBUTE = "Motor"
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+# Palette event handlers, kept for as long as the palette exists
+palette_handlers = []
+
+# The gear train of the sketch shown in the palette.  Kept up to date from
+# the CCLine listener so an edit only recomputes the shafts after it.
+planner_sketch = None
+planner_train = GearTrain()
+
+# Shaft id -> ( name, sketch point ) for the shafts in the train
+planner_shafts = {}
+
+# Stage key -> line of the CCLine for the stages in the train
+planner_lines = {}
+
+# Entity token -> shaft id or stage key.  Tokens are only a fast path, the
+# same entity can give a different token, so a miss compares entities.
+planner_tokens = {}
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+
+    # Find the the FRCTools submenu.
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+
+    # Create the button command control in the UI.
+    control = submenu.controls.addCommand(cmd_def)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    global palette_handlers
+
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+    command_control = submenu.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+    palette = ui.palettes.itemById(PALETTE_ID)
+
+    removeCCLineListener( ccline_changed )
+
+    # Delete the button command control
+    if command_control:
+        command_control.isPromoted = False
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+    # Delete the Palette
+    if palette:
+        palette.deleteMe()
+    palette_handlers = []
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# The motor shafts of the active sketch are picked, the palette shows the rest.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Created Event')
+
+    inputs = args.command.commandInputs
+
+    motorSelection = inputs.addSelectionInput('motor_selection', 'Motor Shafts', 'Select the sketch points or circles of the motor shafts')
+    motorSelection.addSelectionFilter( "SketchPoints" )
+    motorSelection.addSelectionFilter( "SketchCircles" )
+    motorSelection.setSelectionLimits( 1, 0 )
+
+    # Start with the motors picked last time
+    sketch = activeSketch()
+    if sketch:
+        for point in findMotorPoints( sketch ):
+            motorSelection.addSelection( point )
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# Mark the selected motor shafts and show the planner palette for the sketch
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Execute Event')
+
+    sketch = activeSketch()
+    if not sketch:
+        futil.popup_error( 'A sketch must be active to plan a gearbox.' )
+        return
+
+    motorSelection: adsk.core.SelectionCommandInput = args.command.commandInputs.itemById('motor_selection')
+    motorPoints = []
+    for i in range( motorSelection.selectionCount ):
+        entity = motorSelection.selection( i ).entity
+        if entity.objectType == adsk.fusion.SketchCircle.classType():
+            entity = entity.centerSketchPoint
+        motorPoints.append( entity )
+
+    # Replace the old motor marks of the sketch
+    for point in findMotorPoints( sketch ):
+        attr = point.attributes.itemByName( CC_ATTRIBUTE_GROUP, MOTOR_ATTRIBUTE )
+        if attr:
+            attr.deleteMe()
+    for point in motorPoints:
+        point.attributes.add( CC_ATTRIBUTE_GROUP, MOTOR_ATTRIBUTE, '1' )
+
+    loadTrain( sketch )
+    showPalette()
+    addCCLineListener( ccline_changed )
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
+
+
+def activeSketch() -> adsk.fusion.Sketch :
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    sketch = design.activeEditObject if design else None
+    if not sketch or sketch.objectType != adsk.fusion.Sketch.classType():
+        return None
+    return sketch
+
+# The sketch points marked as motor shafts in the sketch
+def findMotorPoints( sketch: adsk.fusion.Sketch ) -> list[adsk.fusion.SketchPoint] :
+    design = sketch.parentComponent.parentDesign
+    points = []
+    for attr in design.findAttributes( CC_ATTRIBUTE_GROUP, MOTOR_ATTRIBUTE ):
+        point = attr.parent
+        if point and point.parentSketch == sketch:
+            points.append( point )
+    return points
+
+# The shaft id of a sketch point.  Points that are the same entity or sit on
+# the same spot of the sketch are the same shaft; a new shaft gets the name.
+def shaftOf( point: adsk.fusion.SketchPoint, name: str = None ) -> str :
+    token = point.entityToken
+    shaft = planner_tokens.get( token )
+    if shaft is None:
+        for key, ( shaftName, shaftPoint ) in planner_shafts.items():
+            if shaftPoint.isValid and ( shaftPoint == point or shaftPoint.geometry.isEqualTo( point.geometry ) ):
+                shaft = key
+                break
+        else:
+            shaft = f'shaft{len(planner_shafts) + 1}'
+            planner_shafts[shaft] = ( name or f'Shaft {len(planner_shafts) + 1}', point )
+        planner_tokens[token] = shaft
+    return shaft
+
+# The stage key of the line of a CCLine
+def stageKey( line: adsk.fusion.SketchLine ) -> str :
+    token = line.entityToken
+    key = planner_tokens.get( token )
+    if key is None:
+        key = next( ( k for k, stageLine in planner_lines.items() if stageLine.isValid and stageLine == line ), None )
+        if key is None:
+            key = f'stage{len(planner_lines) + 1}'
+            planner_lines[key] = line
+        planner_tokens[token] = key
+    return key
+
+# The gear train stage of a CCLine.  N1 is at the start point of the line.
+def stageFromCCLine( ccLine: CCLine ) -> Stage :
+    line = ccLine.line
+    shaft1 = shaftOf( line.startSketchPoint )
+    shaft2 = shaftOf( line.endSketchPoint )
+
+    ld = ccLine.data
+    return Stage( stageKey( line ), shaft1, shaft2, ld.N1, ld.N2, motionCatalog[ld.motion].reverses )
+
+# Build the gear train of every CCLine in the sketch
+def loadTrain( sketch: adsk.fusion.Sketch ) :
+    global planner_sketch, planner_train, planner_shafts, planner_lines, planner_tokens
+
+    startTime = time.perf_counter()
+    planner_sketch = sketch
+    planner_train = GearTrain()
+    planner_shafts = {}
+    planner_lines = {}
+    planner_tokens = {}
+
+    motors = []
+    for point in findMotorPoints( sketch ):
+        motor = shaftOf( point, f'Motor {len(motors) + 1}' )
+        if motor not in motors:
+            motors.append( motor )
+
+    for ccLine in getSketchCCLines( sketch ):
+        planner_train.setStage( stageFromCCLine( ccLine ) )
+    planner_train.setMotors( motors )
+    planner_train.takeChanges()
+
+    futil.log(f'{CMD_NAME}: {len(planner_train.stages)} stages, {len(planner_shafts)} shafts in {(time.perf_counter() - startTime)*1000:.1f}ms')
+
+# Keep the train up to date as CCLines are created, edited and deleted.  Only
+# the shafts after the changed stage are recomputed and sent to the palette.
+def ccline_changed( ccLine: CCLine, removed: bool ) :
+    if not planner_sketch or not planner_sketch.isValid:
+        return
+
+    if ccLine is None:
+        # CCLines may have changed behind our back, start over
+        loadTrain( planner_sketch )
+        sendTrain()
+        return
+
+    if not ccLine.line.isValid or ccLine.line.parentSketch != planner_sketch:
+        return
+
+    startTime = time.perf_counter()
+    key = stageKey( ccLine.line )
+    old = planner_train.stages.get( key )
+    if removed:
+        planner_train.removeStage( key )
+    else:
+        planner_train.setStage( stageFromCCLine( ccLine ) )
+
+    # The ends of the stage may have become or stopped being outputs
+    changed = planner_train.takeChanges()
+    for stage in ( old, planner_train.stages.get( key ) ):
+        if stage:
+            changed.update( ( stage.shaft1, stage.shaft2 ) )
+
+    futil.log(f'{CMD_NAME}: updated {len(changed)} shafts in {(time.perf_counter() - startTime)*1000:.2f}ms')
+    sendRows( changed )
+
+
+# One palette row for each motor and shaft it drives
+def trainRows( shafts ) -> tuple :
+    outputs = set( planner_train.outputs() )
+    rows = []
+    removed = []
+    for motorIdx, motor in enumerate( planner_train.motors ):
+        tree = planner_train.drives.get( motor, {} )
+        for shaft in shafts:
+            rowId = f'{motorIdx}:{shaft}'
+            drive = tree.get( shaft )
+            if not drive or shaft not in planner_shafts:
+                removed.append( rowId )
+                continue
+            rows.append( {
+                'id': rowId,
+                'shaft': shaft,
+                'motor': planner_shafts[motor][0] if motor in planner_shafts else f'Motor {motorIdx + 1}',
+                'name': planner_shafts[shaft][0],
+                'ratio': drive.ratio,
+                'direction': drive.direction,
+                'stages': drive.depth,
+                'output': shaft in outputs
+            } )
+    return rows, removed
+
+def sendTrain() :
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if not palette:
+        return
+    rows, removed = trainRows( list( planner_shafts ) )
+    palette.sendInfoToHTML( 'setTrain', json.dumps( {
+        'sketch': planner_sketch.name if planner_sketch else '',
+        'stages': len( planner_train.stages ),
+        'motors': len( planner_train.motors ),
+        'rows': rows } ) )
+
+def sendRows( shafts ) :
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if not palette or not shafts:
+        return
+    rows, removed = trainRows( shafts )
+    palette.sendInfoToHTML( 'updateRows', json.dumps( {
+        'stages': len( planner_train.stages ),
+        'rows': rows,
+        'removed': removed } ) )
+
+def showPalette() :
+    palette = ui.palettes.itemById(PALETTE_ID)
+    if palette is None:
+        palette = ui.palettes.add(
+            id=PALETTE_ID,
+            name=PALETTE_NAME,
+            htmlFileURL=PALETTE_URL,
+            isVisible=True,
+            showCloseButton=True,
+            isResizable=True,
+            width=400,
+            height=500,
+            useNewWebBrowser=True
+        )
+        futil.add_handler(palette.closed, palette_closed, local_handlers=palette_handlers)
+        futil.add_handler(palette.incomingFromHTML, palette_incoming, local_handlers=palette_handlers)
+
+    if palette.dockingState == adsk.core.PaletteDockingStates.PaletteDockStateFloating:
+        palette.dockingState = PALETTE_DOCKING
+
+    palette.isVisible = True
+    sendTrain()
+
+
+# Stop following CCLine changes while the palette is closed
+def palette_closed(args: adsk.core.UserInterfaceGeneralEventArgs):
+    global planner_sketch
+    removeCCLineListener( ccline_changed )
+    planner_sketch = None
+
+
+# Events sent from the palette javascript
+def palette_incoming(html_args: adsk.core.HTMLEventArgs):
+    message_data: dict = json.loads(html_args.data) if html_args.data else {}
+    message_action = html_args.action
+
+    if message_action == 'ready' or message_action == 'refresh':
+        if planner_sketch and planner_sketch.isValid:
+            loadTrain( planner_sketch )
+        sendTrain()
+    elif message_action == 'selectShaft':
+        # Select the sketch point of the shaft
+        shaft = planner_shafts.get( message_data.get( 'shaft' ) )
+        if shaft and shaft[1].isValid:
+            ui.activeSelections.clear()
+            ui.activeSelections.add( shaft[1] )
+
+    html_args.returnData = 'OK'
@@ -0,0 +1,84 @@
+// Rows of the table by id, kept so an update only touches the changed rows
+let rowsById = new Map();
+
+function refresh() {
+    adsk.fusionSendData("refresh", "{}");
+}
+
+function selectShaft(shaft) {
+    adsk.fusionSendData("selectShaft", JSON.stringify({ shaft: shaft }));
+}
+
+function fillRow(tr, row) {
+    tr.className = row.output ? "output" : "";
+    tr.onclick = () => selectShaft(row.shaft);
+    tr.innerHTML =
+        `<td>${row.motor}</td>` +
+        `<td>${row.name}</td>` +
+        `<td class="number">${row.ratio.toFixed(3)}:1</td>` +
+        `<td>${row.direction > 0 ? "+" : "&minus;"}</td>` +
+        `<td class="number">${row.stages}</td>`;
+}
+
+function setRow(row) {
+    let tr = rowsById.get(row.id);
+    if (!tr) {
+        tr = document.createElement("tr");
+        document.getElementById("rows").appendChild(tr);
+        rowsById.set(row.id, tr);
+    }
+    fillRow(tr, row);
+}
+
+function setSummary(stages) {
+    document.getElementById("summary").innerHTML = `${stages} stages`;
+}
+
+function setTrain(messageString) {
+    const train = JSON.parse(messageString);
+    document.getElementById("rows").innerHTML = "";
+    rowsById = new Map();
+    train.rows.forEach(setRow);
+    setSummary(train.stages);
+    if (train.sketch) {
+        document.getElementById("summary").innerHTML += ` in ${train.sketch}, ${train.motors} motors`;
+    }
+}
+
+function updateRows(messageString) {
+    const update = JSON.parse(messageString);
+    update.rows.forEach(setRow);
+    update.removed.forEach((id) => {
+        const tr = rowsById.get(id);
+        if (tr) {
+            tr.remove();
+            rowsById.delete(id);
+        }
+    });
+    setSummary(update.stages);
+}
+
+window.fusionJavaScriptHandler = {
+    handle: function (action, data) {
+        try {
+            if (action === "setTrain") {
+                setTrain(data);
+            } else if (action === "updateRows") {
+                updateRows(data);
+            } else if (action === "debugger") {
+                debugger;
+            } else {
+                return `Unexpected command type: ${action}`;
+            }
+        } catch (e) {
+            console.log(e);
+            console.log(`Exception caught with command: ${action}, data: ${data}`);
+        }
+        return "OK";
+    },
+};
+
+window.addEventListener("load", () => {
+    // The palette may be created before the add-in sends the train
+    setTimeout(() => adsk.fusionSendData("ready", "{}"), 100);
+});
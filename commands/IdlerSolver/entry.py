@@ -0,0 +1,280 @@
+import adsk.core
+import adsk.fusion
+import os
+import math
+import time
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ...lib.CCLine import *
+from ...lib.beltStock import getBeltStock
+from ...lib.beltPath import solveIdler, LineCurve, ArcCurve
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+
+# TODO *** Specify the command identity information. ***
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_IdlerSolver'
+CMD_NAME = 'Belt Idler'
+CMD_Description = 'Place an idler on a line or arc so a C-C Distance takes a given belt'
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# Resource location for command icons, here we assume a sub folder in this directory named "resources".
+ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+# Which side of the belt the idler runs on, in the order of the list
+IDLER_SIDES = ( 'Behind the Belt', 'Inside the Belt' )
+
+
+# Executed when add-in is run.
+def start():
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, ICON_FOLDER)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # ******** Add a button into the UI so the user can run the command. ********
+    # Get the target workspace the button will be created in.
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+
+    # Get the panel the button will be created in.
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+
+    # Find the the FRCTools submenu.
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+
+    # Create the button command control in the UI.
+    control = submenu.controls.addCommand(cmd_def)
+
+    # Specify if the command is promoted to the main toolbar.
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # Get the various UI elements for this command
+    workspace = ui.workspaces.itemById(config.WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(config.SKETCH_CREATE_ID)
+    submenu = panel.controls.itemById( config.DROPDOWN_ID )
+    command_control = submenu.controls.itemById(CMD_ID)
+    command_definition = ui.commandDefinitions.itemById(CMD_ID)
+
+    # Delete the button command control
+    if command_control:
+        command_control.isPromoted = False
+        command_control.deleteMe()
+
+    # Delete the command definition
+    if command_definition:
+        command_definition.deleteMe()
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# This defines the contents of the command dialog and connects to the command related events.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Created Event')
+
+    inputs = args.command.commandInputs
+
+    ccLineSelection = inputs.addSelectionInput('ccline_selection', 'C-C Distance', 'Select the C-C Distance of the belt')
+    ccLineSelection.addSelectionFilter( "SketchLines" )
+    ccLineSelection.setSelectionLimits( 1, 1 )
+
+    curveSelection = inputs.addSelectionInput('idler_curve', 'Idler Path', 'Select the line or arc the idler center is on')
+    curveSelection.addSelectionFilter( "SketchCurves" )
+    curveSelection.setSelectionLimits( 1, 1 )
+
+    idlerSide = inputs.addDropDownCommandInput('idler_side', 'Idler Side', adsk.core.DropDownStyles.TextListDropDownStyle)
+    for side in IDLER_SIDES:
+        idlerSide.listItems.add( side, False, '' )
+    idlerSide.listItems.item( 0 ).isSelected = True
+
+    inputs.addValueInput('idler_diameter', 'Idler Diameter', 'in', adsk.core.ValueInput.createByString('0.625 in'))
+    inputs.addIntegerSpinnerCommandInput( 'belt_teeth', 'Belt Teeth', 35, 400, 1, 70 )
+
+    inputs.addTextBoxCommandInput('idler_result', 'Result', '', 2, True)
+
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.executePreview, command_preview, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_input, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+
+
+# The selected C-C Distance if it is a belt
+def selectedCCLine( inputs: adsk.core.CommandInputs ) -> CCLine :
+    ccLineSelection: adsk.core.SelectionCommandInput = inputs.itemById('ccline_selection')
+    if ccLineSelection.selectionCount != 1:
+        return None
+    ccLine = findCCLine( ccLineSelection.selection(0).entity )
+    if ccLine and motionCatalog[ccLine.data.motion].kind == 'belt':
+        return ccLine
+    return None
+
+# The pitch circles of the two pulleys as ( x, y, radius ) in sketch coordinates (cm)
+def pulleyCircles( ccLine: CCLine ) -> tuple :
+    start = ccLine.line.startSketchPoint.geometry
+    end = ccLine.line.endSketchPoint.geometry
+    return ( start.x, start.y, ccLine.data.PD1 * 2.54 / 2 ), ( end.x, end.y, ccLine.data.PD2 * 2.54 / 2 )
+
+# Lines, arcs and circles can be the idler path
+IDLER_PATH_TYPES = ( adsk.fusion.SketchLine.classType(), adsk.fusion.SketchArc.classType(), adsk.fusion.SketchCircle.classType() )
+
+# The path of the idler center in sketch coordinates (cm)
+def idlerCurve( entity ) :
+    if entity.objectType == adsk.fusion.SketchLine.classType():
+        start = entity.startSketchPoint.geometry
+        end = entity.endSketchPoint.geometry
+        return LineCurve( start.x, start.y, end.x, end.y )
+
+    center = entity.centerSketchPoint.geometry
+    if entity.objectType == adsk.fusion.SketchArc.classType():
+        # Sketch arcs go counter-clockwise from the start point to the end point
+        start = entity.startSketchPoint.geometry
+        end = entity.endSketchPoint.geometry
+        startAngle = math.atan2( start.y - center.y, start.x - center.x )
+        endAngle = math.atan2( end.y - center.y, end.x - center.x )
+        sweep = ( endAngle - startAngle ) % ( 2 * math.pi )
+        return ArcCurve( center.x, center.y, entity.radius, startAngle, sweep )
+
+    # A full circle, start on the far side from the sketch origin
+    return ArcCurve( center.x, center.y, entity.radius, math.atan2( center.y, center.x ), 2 * math.pi )
+
+# Solve for the idler position from the inputs.  Returns ( ccLine, solution, message )
+def solveInputs( inputs: adsk.core.CommandInputs ) :
+    curveSelection: adsk.core.SelectionCommandInput = inputs.itemById('idler_curve')
+    behind = inputs.itemById('idler_side').selectedItem.index == 0
+    idlerDiameter = inputs.itemById('idler_diameter').value
+    beltTeeth = inputs.itemById('belt_teeth').value
+
+    ccLine = selectedCCLine( inputs )
+    if not ccLine:
+        return None, None, 'Select the C-C Distance of a belt'
+    if curveSelection.selectionCount != 1:
+        return ccLine, None, 'Select the line or arc for the idler'
+    curveEntity = curveSelection.selection(0).entity
+    if curveEntity.objectType not in IDLER_PATH_TYPES:
+        return ccLine, None, 'The idler path must be a line, arc or circle'
+    if curveEntity.parentSketch != ccLine.line.parentSketch:
+        return ccLine, None, 'The idler path must be in the sketch of the C-C Distance'
+
+    belt = motionCatalog[ccLine.data.motion]
+    p1, p2 = pulleyCircles( ccLine )
+    # The pitch line runs down the middle of the belt
+    idlerPitchRadius = idlerDiameter / 2 + belt.thicknessCM / 2
+
+    startTime = time.perf_counter()
+    solution = solveIdler( p1, p2, idlerCurve( curveEntity ), idlerPitchRadius, beltTeeth * belt.pitchCM, behind )
+    elapsed = time.perf_counter() - startTime
+    futil.log( f'{CMD_NAME}: solved in {elapsed*1000:.2f}ms' )
+
+    if not solution:
+        return ccLine, None, f'A {beltTeeth}T belt can not reach an idler on that path'
+    wrapDeg = math.degrees( solution.path.wraps[1] )
+    return ccLine, solution, f'{beltTeeth}T {belt.label}, idler wrap {wrapDeg:.0f} deg ({solution.steps} Newton steps)'
+
+# Create the idler circle, its pitch circle and the two belt spans that go around it
+def createIdler( ccLine: CCLine, curveEntity, solution, idlerDiameter: float ) :
+    sketch = ccLine.line.parentSketch
+    geoConstraints = sketch.geometricConstraints
+    sketchCurves = sketch.sketchCurves
+    idlerPitchRadius = abs( solution.loop[1][2] )
+
+    with futil.computeDeferred( sketch ):
+        centerPt = adsk.core.Point3D.create( solution.x, solution.y, 0 )
+        idlerCircle = sketchCurves.sketchCircles.addByCenterRadius( centerPt, idlerDiameter / 2 )
+        geoConstraints.addCoincident( idlerCircle.centerSketchPoint, curveEntity )
+        textPoint = adsk.core.Point3D.create( solution.x + idlerDiameter, solution.y + idlerDiameter, 0 )
+        diameterDim = sketch.sketchDimensions.addDiameterDimension( idlerCircle, textPoint )
+        diameterDim.value = idlerDiameter
+
+        pitchCircle = sketchCurves.sketchCircles.addByCenterRadius( idlerCircle.centerSketchPoint, idlerPitchRadius )
+        pitchCircle.isConstruction = True
+        geoConstraints.addConcentric( pitchCircle, idlerCircle )
+
+        # The pulley pitch circles in loop order
+        if solution.loop[0] == pulleyCircles( ccLine )[0]:
+            circles = ( ccLine.pitchCircle1, pitchCircle, ccLine.pitchCircle2 )
+        else:
+            circles = ( ccLine.pitchCircle2, pitchCircle, ccLine.pitchCircle1 )
+
+        # The spans into and out of the idler
+        for i in ( 0, 1 ):
+            span = solution.path.spans[i]
+            spanLine = sketchCurves.sketchLines.addByTwoPoints(
+                adsk.core.Point3D.create( span.x1, span.y1, 0 ), adsk.core.Point3D.create( span.x2, span.y2, 0 ) )
+            spanLine.isConstruction = True
+            geoConstraints.addCoincident( spanLine.startSketchPoint, circles[i] )
+            geoConstraints.addCoincident( spanLine.endSketchPoint, circles[i + 1] )
+            geoConstraints.addTangent( spanLine, circles[i] )
+            geoConstraints.addTangent( spanLine, circles[i + 1] )
+
+    return idlerCircle
+
+
+# This event handler is called when the user clicks the OK button in the command dialog or
+# is immediately called after the created event not command inputs were created for the dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Execute Event')
+
+    inputs = args.command.commandInputs
+    ccLine, solution, message = solveInputs( inputs )
+    if not solution:
+        futil.popup_error( message )
+        return
+
+    curveEntity = inputs.itemById('idler_curve').selection(0).entity
+    createIdler( ccLine, curveEntity, solution, inputs.itemById('idler_diameter').value )
+
+
+# This event handler is called when the command needs to compute a new preview in the graphics window.
+def command_preview(args: adsk.core.CommandEventArgs):
+    inputs = args.command.commandInputs
+    ccLine, solution, message = solveInputs( inputs )
+    if solution:
+        curveEntity = inputs.itemById('idler_curve').selection(0).entity
+        createIdler( ccLine, curveEntity, solution, inputs.itemById('idler_diameter').value )
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    changed_input = args.input
+    inputs = args.inputs
+
+    if changed_input.id == 'ccline_selection':
+        ccLine = selectedCCLine( inputs )
+        if ccLine:
+            # Start from the next stocked belt that is longer than the C-C Distance's belt
+            ld = ccLine.data
+            stocked = getBeltStock( config.BELT_STOCK_FILE ).step( motionCatalog[ld.motion].name, ld.Teeth, True )
+            inputs.itemById('belt_teeth').value = stocked if stocked else ld.Teeth + 5
+
+    ccLine, solution, message = solveInputs( inputs )
+    inputs.itemById('idler_result').text = message
+
+
+# This event handler is called when the user interacts with any of the inputs in the dialog
+# which allows you to verify that all of the inputs are valid and enables the OK button.
+def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
+    inputs = args.inputs
+    args.areInputsValid = selectedCCLine( inputs ) is not None and \
+        inputs.itemById('idler_curve').selectionCount == 1 and inputs.itemById('idler_diameter').value > 0
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    # futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
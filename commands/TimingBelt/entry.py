@@ -2,9 +2,12 @@ import adsk.core
 import adsk.fusion
 import os
 import math
+import time
 from ...lib import fusionAddInUtils as futil
 from ... import config
 from ...lib.CCLine import *
+from ...lib.beltPath import beltPath, pulleyLoop, curveLoop
+from ...lib.beltProfile import BeltOutline, beltOutline, outlinePoints
 
 app = adsk.core.Application.get()
 ui = app.userInterface
@@ -21,10 +24,21 @@ IS_PROMOTED = False
 # Resource location for command icons, here we assume a sub folder in this directory named "resources".
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
+# The belt motion types with a tooth profile, in the order of the belt type list
+beltTypes = [ t for t in motionCatalog.ofKind( 'belt' ) if t.hasProfile ]
+
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
 
+# The custom graphics of the preview and the outline points they were drawn
+# from.  The points are kept so a new belt width is only a redraw.
+preview_graphics = None
+preview_outline = None
+
+# Color of the preview belt
+PREVIEW_COLOR = ( 64, 64, 64 )
+
 
 # Executed when add-in is run.
 def start():
@@ -79,14 +93,20 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
     inputs = args.command.commandInputs
 
     # Create a Sketch Curve selection input.
-    pitchLineSelection = inputs.addSelectionInput('belt_pitch_circles', 'End Circles', 'Select a C-C Line or end circles')
+    pitchLineSelection = inputs.addSelectionInput('belt_pitch_circles', 'Pitch Circles', 'Select a C-C Line, pitch circles or a closed loop of lines and arcs')
     pitchLineSelection.addSelectionFilter( "SketchCurves" )
-    pitchLineSelection.setSelectionLimits( 1, 2 )
+    pitchLineSelection.setSelectionLimits( 1, 0 )
+
+    # Idlers the belt goes around the back of
+    idlerSelection = inputs.addSelectionInput('back_idlers', 'Back Side Idlers', 'Select the pitch circles of idlers on the back of the belt')
+    idlerSelection.addSelectionFilter( "SketchCircles" )
+    idlerSelection.setSelectionLimits( 0, 0 )
 
     # Create a simple text box input.
     belt_type = inputs.addDropDownCommandInput('belt_type', 'Timing Belt Type', adsk.core.DropDownStyles.TextListDropDownStyle)
-    belt_type.listItems.add('HTD 5mm Pitch', True, '')
-    belt_type.listItems.add('GT2 3mm Pitch', False, '')
+    for beltType in beltTypes:
+        belt_type.listItems.add( f'{beltType.label} Pitch', False, '')
+    belt_type.listItems.item( 0 ).isSelected = True
     belt_type.isEnabled = False
 
     # Create a value input field and set the default using 1 unit of the default length unit.
@@ -110,6 +130,8 @@ def command_execute(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     # futil.log(f'{CMD_NAME} Command Execute Event')
 
+    clearPreview()
+
     # Get a reference to your command's inputs.
     inputs = args.command.commandInputs
     pitchLineSelection: adsk.core.SelectionCommandInput = inputs.itemById('belt_pitch_circles')
@@ -123,9 +145,41 @@ def command_execute(args: adsk.core.CommandEventArgs):
     while i < pitchLineSelection.selectionCount:
         userSelections.append( pitchLineSelection.selection(i).entity )
         i += 1
+    idlerSelections = selectionEntities( inputs.itemById('back_idlers') )
     
     originalSketch: adsk.fusion.Sketch = pitchLineSelection.selection(0).entity.parentSketch
 
+    beltType = beltTypes[belt_type.selectedItem.index]
+    beltThickness = beltType.thicknessCM
+
+    # Work out the whole belt before anything is added to the design, so a
+    # belt that can't be made leaves no empty component behind.
+    # Determine if circles are selected or a pitch loop is selected
+    try:
+        loop = selectedLoop( userSelections, idlerSelections )
+    except ValueError as error:
+        futil.popup_error( f'{error}.' )
+        return
+    try:
+        curveLength = beltPath( loop ).length
+    except ValueError:
+        futil.popup_error( 'The belt can not go around overlapping circles.' )
+        return
+
+    toothCount = beltToothCount( curveLength, beltType )
+    futil.log(f'Loop length is {curveLength} number of teeth is {toothCount}...')
+
+    suppressTeeth: adsk.core.BoolValueCommandInput = inputs.itemById('suppress_teeth')
+    outlineTeeth = 0 if suppressTeeth.value else toothCount
+
+    startTime = time.perf_counter()
+    try:
+        outline = beltOutline( loop, beltType.tooth, beltThickness, outlineTeeth )
+    except ValueError as error:
+        futil.popup_error( f'{error}.' )
+        return
+    outlineTime = time.perf_counter()
+
     # Create a new component to put the sketches and geometry into
     design = adsk.fusion.Design.cast(app.activeProduct)
     rootComp = design.rootComponent
@@ -136,195 +190,151 @@ def command_execute(args: adsk.core.CommandEventArgs):
     sketch = workingComp.sketches.add( originalSketch.referencePlane, workingOcc )
     sketch.name = 'TimingBelt'
 
-    if belt_type.selectedItem.index == 0:
-        beltPitchLength = 5
-        beltThickness = 0.174
-    else:
-        beltPitchLength = 3
-        beltThickness = 0.126
-
+    PitchLoop = createPitchLoop( sketch, loop )[0]
+    futil.log(f'path curves len = {PitchLoop.count}')
 
-    # Determine if two circles are selected or a pitch loop is selected
-    pathCurves = adsk.core.ObjectCollection.create()
-    if userSelections[0].objectType == adsk.fusion.SketchCircle.classType():
-        c1 = userSelections[0].geometry
-        c2 = userSelections[1].geometry
-        PitchLoop = createPitchLoopFromCircles( sketch, c1, c2 )
-
-        futil.log(f'path curves len = {PitchLoop.count}')
-        for curve in PitchLoop:
-            pathCurves.add( curve.createForAssemblyContext(workingOcc))
-    else :
-        return
-        # PitchLoop = originalSketch.findConnectedCurves( userSelections[0] )
-        # for curve in PitchLoop:
-        #     newCurve = sketch.include( curve )
-        #     newCurve.item(0).isConstruction = True
-        #     pathCurves.add( curve )
-        #     curves.append( newCurve.item(0) )
-    
-    # futil.log( "Path Curves ::")
-    # futil.print_SketchObjectCollection( pathCurves )
-
-    curveLength = 0.0
-    for curve in pathCurves:
-        curveLength += curve.length
-
-    toothCount = int( (curveLength * 10 / beltPitchLength) + 0.5 )
-    futil.log(f'Loop length is {curveLength} number of teeth is {toothCount}...')
-
-    if beltPitchLength == 5:
-        comp_name = f"Belt_HTD_5mm-{toothCount}Tx{int(belt_width.value*10)}mm"
-    else:
-        comp_name = f"Belt_GT2_3mm-{toothCount}Tx{int(belt_width.value*10)}mm"
+    comp_name = f"Belt_{beltType.partName}-{toothCount}Tx{int(belt_width.value*10)}mm"
 
     workingComp.name = comp_name
 
-
-    # Create the Offsets for the belt thickness.
-    half_belt_thickness = adsk.core.ValueInput.createByReal( beltThickness / 2 ) # half of thickness
-
-    geoConstraints = sketch.geometricConstraints
-    curves = []
-    for curve in PitchLoop:
-        curves.append( curve )
-
-    offsetInput = geoConstraints.createOffsetInput( curves, half_belt_thickness )
-    geoConstraints.addTwoSidesOffset( offsetInput, True )
-
-    futil.log(f'Offsetting created {sketch.profiles.count} profiles..')
-    if sketch.profiles.count < 2 :
-        futil.popup_error(f'offset profiles not created correctly.')
-
-    maxArea = 0
-    insideLoop = None
-    i = 0
-    while i < sketch.profiles.count:
-        profile = sketch.profiles.item(i)
-        if profile.areaProperties().area > maxArea:
-            maxArea = profile.areaProperties().area
-            insideLoop = profile.profileLoops.item(0)
-        i += 1
-
-    # futil.log(f'Inside loop has {insideLoop.profileCurves.count} curves in it.')
-  
-    (lineCurve, lineNormal, toothAnchorPoint) = findToothAnchor( insideLoop )
-
-    if beltPitchLength == 5:
-        baseLine = createHTD_5mmProfile( sketch )
-    else:
-        baseLine = createGT2_3mmProfile( sketch )
-
-
-    geoConstraints.addCoincident( baseLine.startSketchPoint, toothAnchorPoint )
-    # Rotating the tooth profile did not work so a dimension is used instead.
-    # Create a dimension between the tooth profile baseline and the line Curve
-    # and set it to a small angle.  Then delete the dimension and make line collinear
-    angleDim = sketch.sketchDimensions.addAngularDimension( baseLine, lineCurve, baseLine.startSketchPoint.geometry )
-    angleDim.value = 0.1 #radians
-    angleDim.deleteMe()
-    geoConstraints.addCollinear( baseLine, lineCurve )
-
-    if args.firingEvent.name == "OnExecutePreview" :
-        # Don't extrude and pattern on path if previewing just do the belt outline.
-        extrudeBeltPreview( sketch, pathCurves, belt_width.value )
+    drawBeltOutline( sketch, outline )
+    sketchTime = time.perf_counter()
+    if not extrudeBelt( sketch, belt_width.value ):
+        workingOcc.deleteMe()
+        futil.popup_error( 'The belt outline crosses itself, the pulleys may be too small for the belt.' )
         return
-    
-    extrudeBelt( sketch, pathCurves, belt_width.value, toothCount, beltPitchLength )
+    extrudeTime = time.perf_counter()
 
+    futil.log(f'{CMD_NAME}: {outlineTeeth} teeth, {len(outline.outside) + len(outline.inside)} curves, '
+              f'outline {(outlineTime - startTime)*1000:.1f}ms, sketch {(sketchTime - outlineTime)*1000:.1f}ms, '
+              f'extrude {(extrudeTime - sketchTime)*1000:.1f}ms')
 
-def extrudeBeltPreview( sketch: adsk.fusion.Sketch, path: adsk.core.ObjectCollection, beltWidth: float ) :
 
-    workingComp = sketch.parentComponent
-
-    # Determine the profiles of the belt and tooth
-    maxArea = 0
-    minArea = 9999999
-    i = 0
-    while i < sketch.profiles.count:
-        profile = sketch.profiles.item(i)
-        if profile.areaProperties().area > maxArea:
-            maxArea = profile.areaProperties().area
-        if profile.areaProperties().area < minArea:
-            minArea = profile.areaProperties().area
-        i += 1
-
-    beltLoop = None
-    profileLoop = None
-    i = 0
-    while i < sketch.profiles.count:
-        profile = sketch.profiles.item(i)
-        if profile.areaProperties().area > minArea and profile.areaProperties().area < maxArea:
-            beltLoop = profile
-        elif profile.areaProperties().area < maxArea:
-            profileLoop = profile
-        i += 1
-
-    extrudes = workingComp.features.extrudeFeatures
-    beltWidthValue = adsk.core.ValueInput.createByReal( beltWidth )
-    extrudes.addSimple(beltLoop, beltWidthValue, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-
-def extrudeBelt( sketch: adsk.fusion.Sketch, path: adsk.core.ObjectCollection,
-                beltWidth: float, toothCount: int, beltPitchMM: int ) :
+# Extrude the belt.  The outline is the only closed region with a hole in the
+# sketch.  Returns False when there is no such region, the outline crosses itself.
+def extrudeBelt( sketch: adsk.fusion.Sketch, beltWidth: float ) -> bool :
 
     workingComp = sketch.parentComponent
 
-    # Determine the profiles of the belt and tooth
-    maxArea = 0
-    minArea = 9999999
-    i = 0
-    while i < sketch.profiles.count:
-        profile = sketch.profiles.item(i)
-        if profile.areaProperties().area > maxArea:
-            maxArea = profile.areaProperties().area
-        if profile.areaProperties().area < minArea:
-            minArea = profile.areaProperties().area
-        i += 1
-
-    beltLoop = None
-    profileLoop = None
+    beltProfile = None
     i = 0
     while i < sketch.profiles.count:
         profile = sketch.profiles.item(i)
-        if profile.areaProperties().area > minArea and profile.areaProperties().area < maxArea:
-            beltLoop = profile
-        elif profile.areaProperties().area < maxArea:
-            profileLoop = profile
+        if profile.profileLoops.count == 2:
+            beltProfile = profile
         i += 1
+    if not beltProfile:
+        return False
 
     extrudes = workingComp.features.extrudeFeatures
     beltWidthValue = adsk.core.ValueInput.createByReal( beltWidth )
-    extrudeBelt = extrudes.addSimple(beltLoop, beltWidthValue, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-    extrudeTooth = extrudes.addSimple(profileLoop, beltWidthValue, adsk.fusion.FeatureOperations.JoinFeatureOperation)
-
-
-    pathPatterns = workingComp.features.pathPatternFeatures
-    beltPitch = adsk.core.ValueInput.createByReal( beltPitchMM / 10.0 )  # mm -> cm
-    toothCountVI = adsk.core.ValueInput.createByReal( toothCount )
-    patternCollection = adsk.core.ObjectCollection.create()
-    patternCollection.add( extrudeTooth )
-
-#    pathCurves = sketch.findConnectedCurves( originalConnectedCurves.item(0) )
-    futil.print_SketchObjectCollection( path )
-    patternPath = adsk.fusion.Path.create( path, adsk.fusion.ChainedCurveOptions.noChainedCurves )
-#    patternPath = adsk.fusion.Path.create( originalConnectedCurves.item(0), adsk.fusion.ChainedCurveOptions.connectedChainedCurves )
-    toothPatternInput = pathPatterns.createInput( 
-        patternCollection, patternPath, toothCountVI, beltPitch, adsk.fusion.PatternDistanceType.SpacingPatternDistanceType )
-    toothPatternInput.isOrientationAlongPath = True
-    toothPatternInput.patternComputeOption = adsk.fusion.PatternComputeOptions.IdenticalPatternCompute
-    toothPattern = pathPatterns.add( toothPatternInput )
+    extrudes.addSimple(beltProfile, beltWidthValue, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+    return True
 
 
 # This event handler is called when the command needs to compute a new preview in the graphics window.
+# The preview is custom graphics of the belt outline so nothing in the model
+# changes until OK.
 def command_preview(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     # futil.log(f'{CMD_NAME} Command Preview Event')
+    global preview_outline
+
     inputs = args.command.commandInputs
-    suppressTeeth = inputs.itemById('suppress_teeth')
+    pitchLineSelection: adsk.core.SelectionCommandInput = inputs.itemById('belt_pitch_circles')
+    belt_width: adsk.core.ValueCommandInput = inputs.itemById('belt_width')
+    belt_type: adsk.core.DropDownCommandInput = inputs.itemById('belt_type')
+    suppressTeeth: adsk.core.BoolValueCommandInput = inputs.itemById('suppress_teeth')
+
+    clearPreview()
+    entities = selectionEntities( pitchLineSelection )
+    if not entities:
+        return
 
-    command_execute( args )
-    if suppressTeeth.value :
-        args.isValidResult = True
+    startTime = time.perf_counter()
+    try:
+        loop = selectedLoop( entities, selectionEntities( inputs.itemById('back_idlers') ) )
+    except ValueError:
+        return
+    beltType = beltTypes[belt_type.selectedItem.index]
+    key = ( tuple( loop ), beltType.id, suppressTeeth.value )
+    if preview_outline is None or preview_outline[0] != key:
+        try:
+            curveLength = beltPath( loop ).length
+            teeth = 0 if suppressTeeth.value else beltToothCount( curveLength, beltType )
+            outline = beltOutline( loop, beltType.tooth, beltType.thicknessCM, teeth )
+        except ValueError:
+            return
+        preview_outline = ( key, outlinePoints( outline.outside ), outlinePoints( outline.inside ) )
+    outlineTime = time.perf_counter()
+
+    drawBeltPreview( preview_outline[1], preview_outline[2], sketchToModel( entities[0] ), belt_width.value )
+    futil.log(f'{CMD_NAME}: preview outline {(outlineTime - startTime)*1000:.1f}ms, '
+              f'graphics {(time.perf_counter() - outlineTime)*1000:.1f}ms')
+
+# Draw the walls of the belt between its bottom and top outlines as a mesh,
+# with the outlines as lines.  The points are in the sketch and the belt goes
+# up along the sketch normal like the extrude.
+def drawBeltPreview( outside: list, inside: list, transform: adsk.core.Matrix3D, beltWidth: float ) :
+    global preview_graphics
+
+    m = transform.asArray()
+    def toModel( x, y, z ) :
+        return ( m[0] * x + m[1] * y + m[2] * z + m[3],
+                 m[4] * x + m[5] * y + m[6] * z + m[7],
+                 m[8] * x + m[9] * y + m[10] * z + m[11] )
+
+    coordinates = []
+    normals = []
+    triangles = []
+    normalIndexes = []
+    strips = []
+    # The outline goes counter-clockwise so the outside of the belt is on the
+    # right of the outside loop and on the left of the inside loop.
+    for points, side in ( ( outside, 1 ), ( inside, -1 ) ):
+        bottom = [ toModel( x, y, 0 ) for x, y in points ]
+        top = [ toModel( x, y, beltWidth ) for x, y in points ]
+        count = len( points )
+        for i in range( count ):
+            j = ( i + 1 ) % count
+            dx = points[j][0] - points[i][0]
+            dy = points[j][1] - points[i][1]
+            length = math.hypot( dx, dy )
+            if length == 0:
+                continue
+            first = len( coordinates ) // 3
+            for p in ( bottom[i], bottom[j], top[j], top[i] ):
+                coordinates.extend( p )
+            nx, ny, nz = toModel( side * dy / length, -side * dx / length, 0 )
+            normals.extend( ( nx - m[3], ny - m[7], nz - m[11] ) )
+            normal = len( normals ) // 3 - 1
+            triangles.extend( ( first, first + 1, first + 2, first, first + 2, first + 3 ) )
+            normalIndexes.extend( ( normal, ) * 6 )
+        strips.append( bottom + bottom[:1] )
+        strips.append( top + top[:1] )
+
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    preview_graphics = design.rootComponent.customGraphicsGroups.add()
+    color = adsk.fusion.CustomGraphicsSolidColorEffect.create( adsk.core.Color.create( *PREVIEW_COLOR, 255 ) )
+    mesh = preview_graphics.addMesh( adsk.fusion.CustomGraphicsCoordinates.create( coordinates ),
+                                     triangles, normals, normalIndexes )
+    mesh.color = color
+    for strip in strips:
+        lines = preview_graphics.addLines( adsk.fusion.CustomGraphicsCoordinates.create( [ v for p in strip for v in p ] ), [], True )
+        lines.color = color
+
+def clearPreview() :
+    global preview_graphics
+    if preview_graphics and preview_graphics.isValid:
+        preview_graphics.deleteMe()
+    preview_graphics = None
+
+# The transform from the sketch of an entity to the model
+def sketchToModel( entity: adsk.fusion.SketchEntity ) -> adsk.core.Matrix3D :
+    transform = entity.parentSketch.transform.copy()
+    if entity.assemblyContext:
+        transform.transformBy( entity.assemblyContext.transform2 )
+    return transform
 
 # This event handler is called when the user changes anything in the command dialog
 # allowing you to modify values of other inputs based on that change.
@@ -340,26 +350,31 @@ def command_input_changed(args: adsk.core.InputChangedEventArgs):
 
     if changed_input.id == 'belt_pitch_circles' :
         if pitchLineSelection.selectionCount == 1:
-            ccLine = getCCLineFromEntity( pitchLineSelection.selection(0).entity )
+            ccLine = findCCLine( pitchLineSelection.selection(0).entity )
             if ccLine :
                 pitchLineSelection.clearSelection()
-                if ccLine.data.motion != 0 :
-                    belt_type.listItems.item( ccLine.data.motion - 1).isSelected = True
+                motion = motionCatalog[ccLine.data.motion]
+                if motion in beltTypes :
+                    belt_type.listItems.item( beltTypes.index( motion ) ).isSelected = True
                     belt_type.isEnabled = False
                     pitchLineSelection.addSelection( ccLine.pitchCircle1 )
                     pitchLineSelection.addSelection( ccLine.pitchCircle2 )
             else :
                 belt_type.isEnabled = True
-        if pitchLineSelection.selectionCount == 3 and belt_type.isEnabled == False :
+        if pitchLineSelection.selectionCount > 2 and belt_type.isEnabled == False :
             # Another entity was selected when a ccLine is selected.
-            newEntity = pitchLineSelection.selection(2).entity
-            ccLine = getCCLineFromEntity( newEntity )
+            newEntity = pitchLineSelection.selection( pitchLineSelection.selectionCount - 1 ).entity
+            ccLine = findCCLine( newEntity )
 
-            if ccLine :
+            if newEntity.objectType == adsk.fusion.SketchCircle.classType() and not ccLine :
+                # Another pulley of the same belt
+                pass
+            elif ccLine :
                 # The new selection is another ccLine (or the same one)
                 pitchLineSelection.clearSelection()
-                if ccLine.data.motion != 0 :
-                    belt_type.listItems.item( ccLine.data.motion - 1).isSelected = True
+                motion = motionCatalog[ccLine.data.motion]
+                if motion in beltTypes :
+                    belt_type.listItems.item( beltTypes.index( motion ) ).isSelected = True
                     belt_type.isEnabled = False
                     pitchLineSelection.addSelection( ccLine.pitchCircle1 )
                     pitchLineSelection.addSelection( ccLine.pitchCircle2 )
@@ -376,7 +391,10 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
     inputs = args.inputs
 
     pitchLineSelection: adsk.core.SelectionCommandInput = inputs.itemById('belt_pitch_circles')
-    
+    if pitchLineSelection.selectionCount == 0:
+        args.areInputsValid = False
+        return
+
     parentSketch: adsk.fusion.Sketch = pitchLineSelection.selection(0).entity.parentSketch
     connectedCurves = parentSketch.findConnectedCurves( pitchLineSelection.selection(0).entity )
             
@@ -392,7 +410,13 @@ def command_validate_input(args: adsk.core.ValidateInputsEventArgs):
 
     # futil.log(f'{CMD_NAME} Validate:: num selected = {pitchLineSelection.selectionCount}')
 
-    if abs(beltWidth.value) > 0.01 and pitchLineSelection.selectionCount == 2:
+    try:
+        selectedLoop( selectionEntities( pitchLineSelection ), selectionEntities( inputs.itemById('back_idlers') ) )
+        validLoop = True
+    except ValueError:
+        validLoop = False
+
+    if abs(beltWidth.value) > 0.01 and validLoop:
         args.areInputsValid = True
     else:
         args.areInputsValid = False
@@ -403,233 +427,125 @@ def command_destroy(args: adsk.core.CommandEventArgs):
     # General logging for debug.
     futil.log(f'{CMD_NAME} Command Destroy Event')
 
-    global local_handlers
+    global local_handlers, preview_outline
     local_handlers = []
-
-
-# Create the HTD 5mm tooth profile.
-def createHTD_5mmProfile( sketch: adsk.fusion.Sketch ):
-    geoConstraints = sketch.geometricConstraints
-    sketchCurves = sketch.sketchCurves
-    sketchDims = sketch.sketchDimensions
-
-    baseLineLength = 0.385373
-    filletRadius = 0.043
-    toothBumpRadius = 0.15
-    toothBumpOffset = 0.054
-    filletSweepAngle = 1.6284  # 93.3 degrees
-    toothBumpSweepAngle = -3.25548  # 186.525 degrees
-
-    # Create the tooth profile at the origin
-    originPt = adsk.core.Point3D.create( 0, 0, 0)
-    baseLine = sketchCurves.sketchLines.addByTwoPoints( 
-        originPt, adsk.core.Point3D.create( baseLineLength, 0, 0) )
-    arcEndLine = sketchCurves.sketchLines.addByTwoPoints( 
-        baseLine.startSketchPoint, adsk.core.Point3D.create( 0, filletRadius, 0) )
-    arcEndLine.isConstruction = True
-    geoConstraints.addPerpendicular( arcEndLine, baseLine )
-    textPoint = adsk.core.Point3D.create(-0.01, 0.02, 0)
-    linearDim = sketchDims.addDistanceDimension(arcEndLine.startSketchPoint, arcEndLine.endSketchPoint, 
-                                                       adsk.fusion.DimensionOrientations.AlignedDimensionOrientation,
-                                                       textPoint )
-    linearDim.value = filletRadius
-
-    toothline = sketchCurves.sketchLines.addByTwoPoints( 
-        adsk.core.Point3D.create( baseLineLength/2, 0, 0), adsk.core.Point3D.create(  baseLineLength/2, toothBumpOffset, 0) )
-    toothline.isConstruction = True
-    geoConstraints.addPerpendicular( toothline, baseLine )
-    geoConstraints.addCoincident( toothline.startSketchPoint, baseLine )
-    textPoint = adsk.core.Point3D.create( baseLineLength/2, toothBumpOffset, 0)
-    textPoint.translateBy( adsk.core.Vector3D.create( -0.02, 0, 0) )
-    linearDim = sketchDims.addDistanceDimension(toothline.startSketchPoint, toothline.endSketchPoint, 
-                                                       adsk.fusion.DimensionOrientations.AlignedDimensionOrientation,
-                                                       textPoint )
-    linearDim.value = toothBumpOffset
-
-    firstFillet = sketchCurves.sketchArcs.addByCenterStartSweep( 
-        arcEndLine.endSketchPoint, baseLine.startSketchPoint, filletSweepAngle )
-    geoConstraints.addTangent( firstFillet, baseLine )
-    geoConstraints.addCoincident( firstFillet.centerSketchPoint, arcEndLine.endSketchPoint )
-
-    toothBump = sketchCurves.sketchArcs.addByCenterStartSweep( 
-        toothline.endSketchPoint, firstFillet.endSketchPoint, toothBumpSweepAngle )
-    geoConstraints.addCoincident(toothBump.centerSketchPoint, toothline.endSketchPoint )
-    geoConstraints.addTangent(firstFillet, toothBump )
-    textPoint = toothline.startSketchPoint.geometry.copy()
-    textPoint.translateBy( adsk.core.Vector3D.create( -.05, .05, 0) )
-    cirDim = sketchDims.addRadialDimension( toothBump, textPoint )
-    cirDim.value = toothBumpRadius
-
-    secondFillet = sketchCurves.sketchArcs.addByCenterStartSweep( 
-        adsk.core.Point3D.create( baseLineLength, filletRadius, 0), toothBump.startSketchPoint, filletSweepAngle )
-    geoConstraints.addCoincident( secondFillet.endSketchPoint, baseLine.endSketchPoint )
-    geoConstraints.addTangent( secondFillet, baseLine )
-    geoConstraints.addTangent( secondFillet, toothBump )
-
-    textPoint = secondFillet.centerSketchPoint.geometry.copy()
-    textPoint.translateBy( adsk.core.Vector3D.create( .05, .05, 0) )
-    arcDim = sketchDims.addRadialDimension( secondFillet, textPoint )
-    arcDim.value = filletRadius
-
-    return baseLine
-
-# Create the GT2 3mm tooth profile.
-def createGT2_3mmProfile( parentSketch: adsk.fusion.Sketch ):
-    geoConstraints = parentSketch.geometricConstraints
-
-    baseLineLength = 0.2044505
-    filletRadius = 0.035
-    toothBumpRadius = 0.085
-    toothBumpOffset = 0.025
-    filletSweepAngle = 1.64322  # 94.14961 degrees
-    toothBumpSweepAngle = -3.28806  # 188.3922 degrees
-
-    # Create the tooth profile at the origin
-    originPt = adsk.core.Point3D.create( 0, 0, 0)
-    baseLine = parentSketch.sketchCurves.sketchLines.addByTwoPoints( 
-        originPt, adsk.core.Point3D.create( baseLineLength, 0, 0) )
-    arcEndLine = parentSketch.sketchCurves.sketchLines.addByTwoPoints( 
-        baseLine.startSketchPoint, adsk.core.Point3D.create( 0, filletRadius, 0) )
-    arcEndLine.isConstruction = True
-    geoConstraints.addPerpendicular( arcEndLine, baseLine )
-    textPoint = adsk.core.Point3D.create(-0.01, 0.02, 0)
-    linearDim = parentSketch.sketchDimensions.addDistanceDimension(arcEndLine.startSketchPoint, arcEndLine.endSketchPoint, 
-                                                       adsk.fusion.DimensionOrientations.AlignedDimensionOrientation,
-                                                       textPoint )
-    linearDim.value = filletRadius
-
-    toothline = parentSketch.sketchCurves.sketchLines.addByTwoPoints( 
-        adsk.core.Point3D.create( baseLineLength/2, 0, 0), adsk.core.Point3D.create(  baseLineLength/2, toothBumpOffset, 0) )
-    toothline.isConstruction = True
-    geoConstraints.addPerpendicular( toothline, baseLine )
-    geoConstraints.addCoincident( toothline.startSketchPoint, baseLine )
-    textPoint = adsk.core.Point3D.create( baseLineLength/2, toothBumpOffset, 0)
-    textPoint.translateBy( adsk.core.Vector3D.create( -0.02, 0, 0) )
-    linearDim = parentSketch.sketchDimensions.addDistanceDimension(toothline.startSketchPoint, toothline.endSketchPoint, 
-                                                       adsk.fusion.DimensionOrientations.AlignedDimensionOrientation,
-                                                       textPoint )
-    linearDim.value = toothBumpOffset
-
-    firstFillet = parentSketch.sketchCurves.sketchArcs.addByCenterStartSweep( 
-        arcEndLine.endSketchPoint, baseLine.startSketchPoint, filletSweepAngle )
-    geoConstraints.addTangent( firstFillet, baseLine )
-    geoConstraints.addCoincident( firstFillet.centerSketchPoint, arcEndLine.endSketchPoint )
-
-    toothBump = parentSketch.sketchCurves.sketchArcs.addByCenterStartSweep( 
-        toothline.endSketchPoint, firstFillet.endSketchPoint, toothBumpSweepAngle )
-    geoConstraints.addCoincident(toothBump.centerSketchPoint, toothline.endSketchPoint )
-    geoConstraints.addTangent(firstFillet, toothBump )
-    textPoint = toothline.startSketchPoint.geometry.copy()
-    textPoint.translateBy( adsk.core.Vector3D.create( -.05, .05, 0) )
-    cirDim = parentSketch.sketchDimensions.addRadialDimension( toothBump, textPoint )
-    cirDim.value = toothBumpRadius
-
-    secondFillet = parentSketch.sketchCurves.sketchArcs.addByCenterStartSweep( 
-        adsk.core.Point3D.create( baseLineLength, filletRadius, 0), toothBump.startSketchPoint, filletSweepAngle )
-    geoConstraints.addCoincident( secondFillet.endSketchPoint, baseLine.endSketchPoint )
-    geoConstraints.addTangent( secondFillet, baseLine )
-    geoConstraints.addTangent( secondFillet, toothBump )
-
-    textPoint = secondFillet.centerSketchPoint.geometry.copy()
-    textPoint.translateBy( adsk.core.Vector3D.create( .05, .05, 0) )
-    arcDim = parentSketch.sketchDimensions.addRadialDimension( secondFillet, textPoint )
-    arcDim.value = filletRadius
-
-    return baseLine
-
-def createPitchLoopFromCircles( sketch: adsk.fusion.Sketch, 
-                               c1: adsk.core.Circle3D, c2: adsk.core.Circle3D ) -> adsk.core.ObjectCollection :
-    geoConstraints = sketch.geometricConstraints
-
-    # Create the end circles in the sketch
-    circle1 = sketch.sketchCurves.sketchCircles.addByCenterRadius( c1.center, c1.radius )
-    circle1.isConstruction = True
-    circle2 = sketch.sketchCurves.sketchCircles.addByCenterRadius( c2.center, c2.radius )
-    circle2.isConstruction = True
-
-    # Create pitch line curves from two circles
-    CLstartPt = futil.toPoint2D( circle1.centerSketchPoint.geometry )
-    CLendPt = futil.toPoint2D( circle2.centerSketchPoint.geometry )
-    CLnormal = futil.lineNormal( CLstartPt, CLendPt )
-
-    T1startPt = futil.addPoint2D( CLstartPt, futil.multVector2D( CLnormal, circle1.radius ) )
-    T1endPt = futil.addPoint2D( CLendPt, futil.multVector2D( CLnormal, circle2.radius ) )
-    tangentLine1 = sketch.sketchCurves.sketchLines.addByTwoPoints( futil.toPoint3D(T1startPt), futil.toPoint3D(T1endPt) )
-    tangentLine1.isConstruction = True
-    geoConstraints.addCoincident( tangentLine1.startSketchPoint, circle1 )
-    geoConstraints.addCoincident( tangentLine1.endSketchPoint, circle2 )
-    geoConstraints.addTangent( tangentLine1, circle1 )
-    geoConstraints.addTangent( tangentLine1, circle2 )
-
-    T2startPt = futil.addPoint2D( CLstartPt, futil.multVector2D( CLnormal, -circle1.radius ) )
-    T2endPt = futil.addPoint2D( CLendPt, futil.multVector2D( CLnormal, -circle2.radius ) )
-    tangentLine2 = sketch.sketchCurves.sketchLines.addByTwoPoints( futil.toPoint3D(T2startPt), futil.toPoint3D(T2endPt) )
-    tangentLine2.isConstruction = True
-    geoConstraints.addCoincident( tangentLine2.startSketchPoint, circle1 )
-    geoConstraints.addCoincident( tangentLine2.endSketchPoint, circle2 )
-    geoConstraints.addTangent( tangentLine2, circle1 )
-    geoConstraints.addTangent( tangentLine2, circle2 )
-
-    arc1 = sketch.sketchCurves.sketchArcs.addByCenterStartEnd( 
-        circle1.centerSketchPoint, tangentLine1.startSketchPoint, tangentLine2.startSketchPoint )
-    arc1.isConstruction = True
-#    geoConstraints.addConcentric( arc1, circle1 )
-    try :
-        geoConstraints.addTangent( arc1, tangentLine1 )
-    except:
-        None
-
-    arc2 = sketch.sketchCurves.sketchArcs.addByCenterStartEnd( 
-        circle2.centerSketchPoint, tangentLine2.endSketchPoint, tangentLine1.endSketchPoint )
-    arc2.isConstruction = True
-#    geoConstraints.addConcentric( arc2, circle2 )
+    clearPreview()
+    preview_outline = None
+
+
+# The number of teeth of a belt type that fit a pitch loop length (cm)
+def beltToothCount( curveLength: float, beltType ) -> int :
+    return int( (curveLength * 10 / beltType.pitchMM) + 0.5 )
+
+# Draw the loops of a belt outline.  Each curve starts on the end point of
+# the one before so the loops close without constraints.  The curves are not
+# fixed: nothing in the sketch moves them and fixing hundreds of curves takes
+# about as long as drawing them.
+def drawBeltOutline( sketch: adsk.fusion.Sketch, outline: BeltOutline ) :
+    sketchLines = sketch.sketchCurves.sketchLines
+    sketchArcs = sketch.sketchCurves.sketchArcs
+
+    with futil.computeDeferred( sketch ):
+        for curves in ( outline.outside, outline.inside ):
+            firstPoint = None
+            lastPoint = None
+            for i, curve in enumerate( curves ):
+                start = lastPoint if lastPoint else adsk.core.Point3D.create( curve.start[0], curve.start[1], 0 )
+                if i == len( curves ) - 1:
+                    end = firstPoint
+                else:
+                    end = adsk.core.Point3D.create( curve.end[0], curve.end[1], 0 )
+
+                if curve.center is None:
+                    line = sketchLines.addByTwoPoints( start, end )
+                    startPoint, endPoint = line.startSketchPoint, line.endSketchPoint
+                else:
+                    center = adsk.core.Point3D.create( curve.center[0], curve.center[1], 0 )
+                    if curve.ccw:
+                        arc = sketchArcs.addByCenterStartEnd( center, start, end )
+                        startPoint, endPoint = arc.startSketchPoint, arc.endSketchPoint
+                    else:
+                        arc = sketchArcs.addByCenterStartEnd( center, end, start )
+                        startPoint, endPoint = arc.endSketchPoint, arc.startSketchPoint
+
+                if firstPoint is None:
+                    firstPoint = startPoint
+                lastPoint = endPoint
+
+def selectionEntities( selectionInput: adsk.core.SelectionCommandInput ) -> list :
+    return [ selectionInput.selection(i).entity for i in range( selectionInput.selectionCount ) ]
+
+# The pitch loop (see beltPath) of the selected pitch circles and back side
+# idlers, or of a selected closed loop of lines and arcs.  Raises ValueError
+# when the belt can not go around them.
+def selectedLoop( entities: list, idlers: list ) -> list :
+    sketches = { entity.parentSketch.entityToken for entity in entities + idlers }
+    if len( sketches ) > 1:
+        raise ValueError( 'The pitch circles and idlers must be in one sketch' )
+
+    if all( entity.objectType == adsk.fusion.SketchCircle.classType() for entity in entities ):
+        def circle( entity ) :
+            center = entity.geometry.center
+            return ( center.x, center.y, entity.geometry.radius )
+        return pulleyLoop( [ circle( entity ) for entity in entities ], [ circle( entity ) for entity in idlers ] )
+
+    if idlers:
+        raise ValueError( 'Back side idlers go with pitch circles, a loop of lines and arcs already has them' )
+    curves = []
+    for entity in entities:
+        if entity.objectType == adsk.fusion.SketchLine.classType():
+            start = entity.startSketchPoint.geometry
+            end = entity.endSketchPoint.geometry
+            curves.append( ( ( start.x, start.y ), ( end.x, end.y ), None, None ) )
+        elif entity.objectType == adsk.fusion.SketchArc.classType():
+            arc = entity.geometry
+            start = entity.startSketchPoint.geometry
+            end = entity.endSketchPoint.geometry
+            # The loop wants arcs counter-clockwise from start to end
+            if arc.normal.z < 0:
+                start, end = end, start
+            curves.append( ( ( start.x, start.y ), ( end.x, end.y ), ( arc.center.x, arc.center.y ), arc.radius ) )
+        else:
+            raise ValueError( 'Select pitch circles or a closed loop of lines and arcs' )
+    return curveLoop( curves )
+
+# Create the pitch loop around a loop of circles (see beltPath) as fixed
+# sketch geometry.  The tangent points, arcs and loop length are computed with
+# beltPath so the sketch solver never moves them.  Returns the curves in the
+# order the belt goes around them and the exact loop length (cm), or
+# ( None, 0 ) when the circles overlap.
+def createPitchLoop( sketch: adsk.fusion.Sketch, loop: list ) -> tuple :
     try:
-        geoConstraints.addTangent( arc2, tangentLine2 )
-    except:
-        None
-
-    connectedCurves = sketch.findConnectedCurves( tangentLine1 )
-    # curves = []
-    # for curve in connectedCurves:
-    #     curves.append( curve )
-
-    return connectedCurves
-
-# Find the anchor line and endpoint on that line to use for the tooth starting point
-def findToothAnchor( insideLoop: adsk.fusion.ProfileLoop ) :
-
-    # Determin the centroid of the profile loop
-    bbox = insideLoop.profileCurves.item(0).sketchEntity.boundingBox
-    i = 0
-    while i < insideLoop.profileCurves.count:
-        curve = insideLoop.profileCurves.item(i).sketchEntity
-        bbox.combine( curve.boundingBox )
-        i += 1
-
-    centroid = futil.BBCentroid( bbox )
- 
-    lineCurve: adsk.fusion.SketchLine = None
-    lineNormal = adsk.core.Vector2D.create()
-    toothAnchorPoint = adsk.fusion.SketchPoint = None
-    i = 0
-    while i < insideLoop.profileCurves.count:
-        curve = insideLoop.profileCurves.item(i).sketchEntity
-        futil.print_SketchCurve( curve )
-        if curve.objectType == adsk.fusion.SketchLine.classType():
-            curve: adsk.fusion.SketchLine = curve
-            insideNormal = futil.sketchLineNormal( curve, centroid )
-            if futil.toTheRightOf( futil.toLine2D( curve.geometry), centroid ) :
-                lineCurve = curve
-                lineNormal = insideNormal
-                toothAnchorPoint = lineCurve.endSketchPoint
-            else:
-                lineCurve = curve
-                lineNormal = insideNormal
-                toothAnchorPoint = lineCurve.startSketchPoint
-
-            futil.log(f'    Using Line with Normal=({insideNormal.x:.3},{insideNormal.y:.3})...')
-            futil.log(f'     toothAnchor =  ({toothAnchorPoint.geometry.x:.3},{toothAnchorPoint.geometry.y:.3}).')
-            break
-        i += 1
+        path = beltPath( loop )
+    except ValueError:
+        return None, 0.0
+
+    sketchLines = sketch.sketchCurves.sketchLines
+    sketchArcs = sketch.sketchCurves.sketchArcs
+    connectedCurves = adsk.core.ObjectCollection.create()
+    with futil.computeDeferred( sketch ):
+        lines = []
+        for span in path.spans:
+            line = sketchLines.addByTwoPoints( adsk.core.Point3D.create( span.x1, span.y1, 0 ),
+                                               adsk.core.Point3D.create( span.x2, span.y2, 0 ) )
+            lines.append( line )
+
+        # Each arc goes from the span coming in to the span going out,
+        # clockwise around the back side idlers
+        arcs = []
+        for i, ( x, y, s ) in enumerate( loop ):
+            arriving = lines[i - 1].endSketchPoint
+            leaving = lines[i].startSketchPoint
+            if s < 0:
+                arriving, leaving = leaving, arriving
+            arc = sketchArcs.addByCenterStartEnd( adsk.core.Point3D.create( x, y, 0 ), arriving, leaving )
+            arcs.append( arc )
+
+        for i, line in enumerate( lines ):
+            connectedCurves.add( line )
+            connectedCurves.add( arcs[(i + 1) % len( arcs )] )
+        for curve in connectedCurves:
+            curve.isConstruction = True
+            curve.isFixed = True
 
-    return (lineCurve, lineNormal, toothAnchorPoint)
\ No newline at end of file
+    return connectedCurves, path.length
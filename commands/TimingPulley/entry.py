@@ -4,6 +4,7 @@ import os
 import math
 from ...lib import fusionAddInUtils as futil
 from ... import config
+from ...lib.CCLine import motionCatalog
 app = adsk.core.Application.get()
 ui = app.userInterface
 
@@ -19,6 +20,9 @@ IS_PROMOTED = False
 # Resource location for command icons, here we assume a sub folder in this directory named "resources".
 ICON_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resources', '')
 
+# The belt motion types with a tooth profile, in the order of the belt type list
+beltTypes = [ t for t in motionCatalog.ofKind( 'belt' ) if t.hasProfile ]
+
 # Local list of event handlers used to maintain a reference so
 # they are not released and garbage collected.
 local_handlers = []
@@ -87,8 +91,9 @@ def command_created(args: adsk.core.CommandCreatedEventArgs):
 
     # Create a simple text box input.
     belt_type = inputs.addDropDownCommandInput('belt_type', 'Timing Belt Type', adsk.core.DropDownStyles.TextListDropDownStyle)
-    belt_type.listItems.add('HTD 5mm Pitch', True, '')
-    belt_type.listItems.add('GT2 3mm Pitch', False, '')
+    for beltType in beltTypes:
+        belt_type.listItems.add( f'{beltType.label} Pitch', False, '')
+    belt_type.listItems.item( 0 ).isSelected = True
 
     # Create a value input field for the number of teeth.
     defaultLengthUnits = ""
@@ -140,14 +145,9 @@ def command_execute(args: adsk.core.CommandEventArgs):
     sketch = workingComp.sketches.add( sketchPlane, workingOcc )
 
 
-    if beltType.selectedItem.index == 0 :
-        workingComp.name = f"Pulley_HTD_5mm-{toothCount.value}Tx{int(beltWidth.value*10)}mm"
-        beltPitch = 5
-        createHTDPulleyGeometry( sketch, beltPitch, toothCount.value )
-    else:
-        workingComp.name = f"Pulley_GT2_3mm-{toothCount.value}Tx{int(beltWidth.value*10)}mm"
-        beltPitch = 3
-        createGT2PulleyGeometry( sketch, beltPitch, toothCount.value )
+    belt = beltTypes[beltType.selectedItem.index]
+    workingComp.name = f"Pulley_{belt.partName}-{toothCount.value}Tx{int(beltWidth.value*10)}mm"
+    pulleyProfiles[belt.profile]( sketch, belt.pitchMM, toothCount.value, belt.pulley )
 
     # Extrude the pulley sketch 
     if sketch.profiles.count != 1 :
@@ -209,14 +209,15 @@ def command_destroy(args: adsk.core.CommandEventArgs):
     rootComp.isOriginFolderLightBulbOn = False
 
 
-def createHTDPulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, toothCount: int ) :
+# The pulley tooth sizes are in mm
+def createHTDPulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, toothCount: int, pulley: dict ) :
     geoConstraints = sketch.geometricConstraints
 
-    beltThickness = 1.74
-    topRadius = 0.43
-    rootRadius = 1.49
-    rootHeight = 2.06
-    rootWidth = 3.05
+    beltThickness = pulley['beltThickness']
+    topRadius = pulley['topRadius']
+    rootRadius = pulley['rootRadius']
+    rootHeight = pulley['rootHeight']
+    rootWidth = pulley['rootWidth']
 
     # Create a single tooth of the pulley
     pitch_diameter = toothCount * beltPitchMM / math.pi
@@ -328,16 +329,15 @@ def createHTDPulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, too
     geoConstraints.addCircularPattern( circularPattern )
 
 
-def createGT2PulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, toothCount: int ) :
+def createGT2PulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, toothCount: int, pulley: dict ) :
     geoConstraints = sketch.geometricConstraints
 
-    # beltThickness = 1.26
-    pitchLineOffset = 0.381
-    topRadius = 0.25
-    rootRadius = 0.85
-    rootHeight = 1.14
-    transitionRadius = 1.52
-    transitionOffset = 0.61
+    pitchLineOffset = pulley['pitchLineOffset']
+    topRadius = pulley['topRadius']
+    rootRadius = pulley['rootRadius']
+    rootHeight = pulley['rootHeight']
+    transitionRadius = pulley['transitionRadius']
+    transitionOffset = pulley['transitionOffset']
 
     # Create a single tooth of the pulley
     pitch_diameter = toothCount * beltPitchMM / math.pi
@@ -454,3 +454,10 @@ def createGT2PulleyGeometry( sketch: adsk.fusion.Sketch, beltPitchMM: float, too
     circularPattern = geoConstraints.createCircularPatternInput( toothEntities, outerCircle.centerSketchPoint )
     circularPattern.quantity = adsk.core.ValueInput.createByReal( toothCount )
     geoConstraints.addCircularPattern( circularPattern )
+
+
+# The pulley geometry of each belt profile in the motion catalog
+pulleyProfiles = {
+    'HTD': createHTDPulleyGeometry,
+    'GT2': createGT2PulleyGeometry,
+}
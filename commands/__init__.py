@@ -4,7 +4,12 @@
 # You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
 from .BoltPattern import entry as BoltPattern
 from .CCDistance import entry as CCDistance
+from .CCReport import entry as CCReport
+from .CCTolerance import entry as CCTolerance
+from .DriveChecks import entry as DriveChecks
 from .FilletXpert import entry as FilletXpert
+from .GearboxPlanner import entry as GearboxPlanner
+from .IdlerSolver import entry as IdlerSolver
 from .Lighten import entry as Lighten
 from .TimingBelt import entry as TimingBelt
 from .TimingPulley import entry as TimingPulley
@@ -14,7 +19,12 @@ from .Tubify import entry as Tubify
 commands = [
     BoltPattern,
     CCDistance,
+    CCReport,
+    CCTolerance,
+    DriveChecks,
     FilletXpert,
+    GearboxPlanner,
+    IdlerSolver,
     Lighten,
     TimingBelt,
     TimingPulley,
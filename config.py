@@ -25,3 +25,12 @@ WORKSPACE_ID = 'FusionSolidEnvironment'
 PANEL_ID = 'SolidCreatePanel'
 SKETCH_CREATE_ID = 'SketchCreatePanel'
 DROPDOWN_ID = 'MetricFRCToolsSubMenu'
+
+# Belt lengths that are kept in stock, edit the file to match your inventory
+BELT_STOCK_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'lib', 'data', 'beltStock.json' )
+
+# The motion types of the C-C Distance tools, add a type by adding it to the file
+MOTION_TYPES_FILE = os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'lib', 'data', 'motionTypes.json' )
+
+# Run the C-C Drive Checks every time a design is saved
+DRIVE_CHECKS_ON_SAVE = True
@@ -1,6 +1,10 @@
+import json
+import collections
 import adsk.core
 import adsk.fusion
 from . import fusionAddInUtils as futil
+from .motionCatalog import getMotionCatalog
+from .. import config
 
 
 
@@ -26,38 +30,122 @@ CC_LINE_TEXT_HEIGHT_DIM = "TEXT_HEIGHT"
 
 CC_LINE_PARENT_LINE = "CCLine"
 
+# Object types of the entities that make up a CCLine
+CC_MEMBER_TYPES = frozenset( (
+    adsk.fusion.SketchLine.classType(),
+    adsk.fusion.SketchCircle.classType(),
+    adsk.fusion.SketchText.classType(),
+    adsk.fusion.SketchLinearDimension.classType(),
+    adsk.fusion.SketchDiameterDimension.classType(),
+) )
+
+# The motion types, CC_LINE_MOTION_TYPE is the id of one
+motionCatalog = getMotionCatalog( config.MOTION_TYPES_FILE )
+
 class CCLineData :
-    N1 = 0
-    N2 = 0
-    Teeth = 0
-    ExtraCenterIN = 0.00
-    motion = 0
-    ccDistIN = 0.0    # Calculated before EC is added
-    PD1 = 0.0
-    PD2 = 0.0
-    OD1 = 0.0
-    OD2 = 0.0
+    __slots__ = ( 'N1', 'N2', 'Teeth', 'ExtraCenterIN', 'motion', 'ccDistIN', 'PD1', 'PD2', 'OD1', 'OD2' )
+
+    def __init__( self, N1: int = 0, N2: int = 0, Teeth: int = 0, ExtraCenterIN: float = 0.0, motion: int = 0 ) :
+        self.N1 = N1
+        self.N2 = N2
+        self.Teeth = Teeth
+        self.ExtraCenterIN = ExtraCenterIN
+        self.motion = motion
+        self.ccDistIN = 0.0    # Calculated before EC is added
+        self.PD1 = 0.0
+        self.PD2 = 0.0
+        self.OD1 = 0.0
+        self.OD2 = 0.0
+
+    def copy( self ) -> 'CCLineData' :
+        ld = CCLineData()
+        for name in CCLineData.__slots__:
+            setattr( ld, name, getattr( self, name ) )
+        return ld
+
+    def __eq__( self, other ) -> bool :
+        if not isinstance( other, CCLineData ):
+            return NotImplemented
+        return all( getattr( self, name ) == getattr( other, name ) for name in CCLineData.__slots__ )
+
+    def __repr__( self ) -> str :
+        return f'CCLineData(N1={self.N1}, N2={self.N2}, Teeth={self.Teeth}, EC={self.ExtraCenterIN}, motion={self.motion})'
+
+# A child entity of a CCLine that is looked up from the token in the CCLine
+# record the first time it is used and remembered after that.
+class ChildEntity :
+
+    def __init__( self, attribute: str ) :
+        self.attribute = attribute
+
+    def __set_name__( self, owner, name: str ) :
+        self.name = name
+
+    def __get__( self, ccLine: 'CCLine', owner ) :
+        if ccLine is None:
+            return self
+        try:
+            return ccLine.children[self.name]
+        except KeyError:
+            ent = ccLine.resolveChild( self.attribute )
+            ccLine.children[self.name] = ent
+            return ent
+
+    def __set__( self, ccLine: 'CCLine', ent ) :
+        ccLine.children[self.name] = ent
 
 class CCLine :
-    data = CCLineData()
-    line: adsk.fusion.SketchLine = None
-    pitchCircle1: adsk.fusion.SketchCircle = None
-    pitchCircle2: adsk.fusion.SketchCircle = None
-    ODCircle1: adsk.fusion.SketchCircle = None
-    ODCircle2: adsk.fusion.SketchCircle = None
+    __slots__ = ( 'line', 'data', 'record', 'children' )
+
+    pitchCircle1: adsk.fusion.SketchCircle = ChildEntity( CC_LINE_PITCH_CIRCLE1 )
+    pitchCircle2: adsk.fusion.SketchCircle = ChildEntity( CC_LINE_PITCH_CIRCLE2 )
+    ODCircle1: adsk.fusion.SketchCircle = ChildEntity( CC_LINE_OD_CIRCLE1 )
+    ODCircle2: adsk.fusion.SketchCircle = ChildEntity( CC_LINE_OD_CIRCLE2 )
     # Dimensions
-    lengthDim: adsk.fusion.SketchLinearDimension = None
-    PD1Dim: adsk.fusion.SketchDiameterDimension = None
-    PD2Dim: adsk.fusion.SketchDiameterDimension = None
-    OD1Dim: adsk.fusion.SketchDiameterDimension = None
-    OD2Dim: adsk.fusion.SketchDiameterDimension = None
-    textHeight: adsk.fusion.SketchLinearDimension = None
+    lengthDim: adsk.fusion.SketchLinearDimension = ChildEntity( CC_LINE_LENGTH_DIM )
+    PD1Dim: adsk.fusion.SketchDiameterDimension = ChildEntity( CC_LINE_PITCH_CIRCLE1_DIM )
+    PD2Dim: adsk.fusion.SketchDiameterDimension = ChildEntity( CC_LINE_PITCH_CIRCLE2_DIM )
+    OD1Dim: adsk.fusion.SketchDiameterDimension = ChildEntity( CC_LINE_OD_CIRCLE1_DIM )
+    OD2Dim: adsk.fusion.SketchDiameterDimension = ChildEntity( CC_LINE_OD_CIRCLE2_DIM )
+    textHeight: adsk.fusion.SketchLinearDimension = ChildEntity( CC_LINE_TEXT_HEIGHT_DIM )
     # Line Label
-    textBox: adsk.fusion.SketchText = None
+    textBox: adsk.fusion.SketchText = ChildEntity( CC_LINE_TEXT )
+
+    def __init__( self, line: adsk.fusion.SketchLine = None, data: CCLineData = None, record: dict = None ) :
+        self.line = line
+        self.data = data if data else CCLineData()
+        self.record = record
+        self.children = {}
+
+    # Find the child entity from the token stored in the record
+    def resolveChild( self, attribute: str ) :
+        if not self.line or not self.record:
+            return None
+        return getChildEntity( self.line, attribute, self.record )
+
+
+# Packed CCLine record (schema version 1).  The data values and child entity
+# tokens are stored as JSON in one attribute on the line, keyed by the names of
+# the legacy per-field attributes.
+CC_LINE_RECORD = "RECORD"
+CC_RECORD_VERSION = 1
+
+# Sketch level index of child entity token -> parent line token
+CC_SKETCH_INDEX = "CCIndex"
+
+# The legacy layout stored each of these as a separate attribute on the line
+CC_LINE_DATA_ATTRIBUTES = [ CC_LINE_N1, CC_LINE_N2, CC_LINE_TEETH, CC_LINE_EC, CC_LINE_MOTION_TYPE ]
+CC_LINE_CHILD_ATTRIBUTES = [ 
+    CC_LINE_PITCH_CIRCLE1, CC_LINE_PITCH_CIRCLE2, CC_LINE_OD_CIRCLE1, CC_LINE_OD_CIRCLE2, CC_LINE_TEXT,
+    CC_LINE_LENGTH_DIM, CC_LINE_PITCH_CIRCLE1_DIM, CC_LINE_PITCH_CIRCLE2_DIM, 
+    CC_LINE_OD_CIRCLE1_DIM, CC_LINE_OD_CIRCLE2_DIM, CC_LINE_TEXT_HEIGHT_DIM ]
 
 
 def isCCLine( line: adsk.fusion.SketchLine ) -> bool :
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 )
+    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_RECORD )
+    if not attr:
+        # Check for the legacy attribute layout
+        attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 )
     if not attr:
         return False
     
@@ -75,79 +163,171 @@ def setAttributeList( ents: list[adsk.fusion.SketchEntity], name: str, value: st
         if not newattr:
             futil.log(f'  ======== Adding attribute {name} = {value} FAILED!!')
 
-def setCCLineAttributes( ccLine: CCLine ) :
-    line = ccLine.line
+def makeRecord( ccLine: CCLine ) -> dict :
     ld = ccLine.data
+    record = {
+        'v': CC_RECORD_VERSION,
+        CC_LINE_N1: ld.N1,
+        CC_LINE_N2: ld.N2,
+        CC_LINE_TEETH: ld.Teeth,
+        CC_LINE_EC: ld.ExtraCenterIN,
+        CC_LINE_MOTION_TYPE: ld.motion,
+        CC_LINE_PITCH_CIRCLE1: ccLine.pitchCircle1.entityToken,
+        CC_LINE_PITCH_CIRCLE2: ccLine.pitchCircle2.entityToken,
+        CC_LINE_OD_CIRCLE1: ccLine.ODCircle1.entityToken,
+        CC_LINE_OD_CIRCLE2: ccLine.ODCircle2.entityToken,
+        CC_LINE_TEXT: ccLine.textBox.entityToken,
+        CC_LINE_LENGTH_DIM: ccLine.lengthDim.entityToken,
+        CC_LINE_PITCH_CIRCLE1_DIM: ccLine.PD1Dim.entityToken,
+        CC_LINE_PITCH_CIRCLE2_DIM: ccLine.PD2Dim.entityToken,
+        CC_LINE_OD_CIRCLE1_DIM: ccLine.OD1Dim.entityToken,
+        CC_LINE_OD_CIRCLE2_DIM: ccLine.OD2Dim.entityToken,
+        CC_LINE_TEXT_HEIGHT_DIM: ccLine.textHeight.entityToken,
+    }
+    return record
+
+def decodeRecord( value: str ) -> dict :
+    try:
+        record = json.loads( value )
+    except ValueError:
+        futil.log(f'Invalid CCLine record "{value}"')
+        return None
 
-    # Set the data attributes
-    setAttribute( line, CC_LINE_N1, str(ld.N1) )
-    setAttribute( line, CC_LINE_N2, str(ld.N2) )
-    setAttribute( line, CC_LINE_TEETH, str(ld.Teeth) )
-    setAttribute( line, CC_LINE_EC, str(ld.ExtraCenterIN) )
-    setAttribute( line, CC_LINE_MOTION_TYPE, str(ld.motion) )
-
-    # Set the end circle tokens
-    setAttribute( line, CC_LINE_PITCH_CIRCLE1, ccLine.pitchCircle1.entityToken )
-    setAttribute( line, CC_LINE_PITCH_CIRCLE2, ccLine.pitchCircle2.entityToken )
-    setAttribute( line, CC_LINE_OD_CIRCLE1, ccLine.ODCircle1.entityToken )
-    setAttribute( line, CC_LINE_OD_CIRCLE2, ccLine.ODCircle2.entityToken )
-
-    # Set the TextBox token
-    setAttribute( line, CC_LINE_TEXT, ccLine.textBox.entityToken )
-
-    # Set the dimension tokens
-    setAttribute( line, CC_LINE_LENGTH_DIM, ccLine.lengthDim.entityToken )
-    setAttribute( line, CC_LINE_PITCH_CIRCLE1_DIM, ccLine.PD1Dim.entityToken )
-    setAttribute( line, CC_LINE_PITCH_CIRCLE2_DIM, ccLine.PD2Dim.entityToken )
-    setAttribute( line, CC_LINE_OD_CIRCLE1_DIM, ccLine.OD1Dim.entityToken )
-    setAttribute( line, CC_LINE_OD_CIRCLE2_DIM, ccLine.OD2Dim.entityToken )
-    setAttribute( line, CC_LINE_TEXT_HEIGHT_DIM, ccLine.textHeight.entityToken )
+    if record.get( 'v', 0 ) > CC_RECORD_VERSION:
+        futil.log(f'CCLine record version {record["v"]} is newer than this add-in supports.')
+    return record
 
-    # futil.print_Attributes( line )
+# Reads the legacy per-field attributes into the same form as a packed record
+def readLegacyRecord( line: adsk.fusion.SketchLine ) -> dict :
+    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 )
+    if not attr:
+        return None
 
-    # Set the line as the parent to all the child entities
-    setAttributeList( [ccLine.pitchCircle1, ccLine.pitchCircle2, ccLine.ODCircle1, ccLine.ODCircle2,
-                       ccLine.PD1Dim, ccLine.PD2Dim, ccLine.OD1Dim, ccLine.OD2Dim, ccLine.lengthDim,
-                       ccLine.textBox, ccLine.textHeight],
-                       CC_LINE_PARENT_LINE, line.entityToken )
-    textDef: adsk.fusion.MultiLineTextDefinition = ccLine.textBox.definition
-    for tbline in textDef.rectangleLines:
-        setAttribute( tbline, CC_LINE_PARENT_LINE, line.entityToken )
+    record = { 'v': 0, CC_LINE_N1: int(attr.value) }
+    for name in CC_LINE_DATA_ATTRIBUTES[1:] + CC_LINE_CHILD_ATTRIBUTES:
+        attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, name )
+        if attr:
+            record[name] = attr.value
 
-    # futil.print_Attributes( ccLine.pitchCircle1 )
+    return record
 
-def getLineData( line: adsk.fusion.SketchLine ) -> CCLineData :
+# Returns the packed record of the line, reading the legacy layout if needed.
+def readRecord( line: adsk.fusion.SketchLine ) -> dict :
+    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_RECORD )
+    if attr:
+        return decodeRecord( attr.value )
 
+    return readLegacyRecord( line )
+
+def recordToLineData( record: dict ) -> CCLineData :
     cclineData = CCLineData()
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 )
+    cclineData.N1 = int(record[CC_LINE_N1])
+    cclineData.N2 = int(record[CC_LINE_N2])
+    cclineData.Teeth = int(record[CC_LINE_TEETH])
+    cclineData.ExtraCenterIN = float(record[CC_LINE_EC])
+    cclineData.motion = int(record[CC_LINE_MOTION_TYPE])
+    return cclineData
+
+# Decode the line data from the value of a CC_LINE_RECORD attribute
+def decodeLineData( value: str ) -> CCLineData :
+    record = decodeRecord( value )
+    if not record:
+        return None
+    return recordToLineData( record )
+
+def getSketchIndex( sketch: adsk.fusion.Sketch ) -> dict :
+    attr = sketch.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_SKETCH_INDEX )
     if not attr:
+        return {}
+    try:
+        return json.loads( attr.value )
+    except ValueError:
+        futil.log(f'Invalid CCLine index on sketch {sketch.name}')
+        return {}
+
+def setSketchIndex( sketch: adsk.fusion.Sketch, index: dict ) :
+    setAttribute( sketch, CC_SKETCH_INDEX, json.dumps( index, separators=(',', ':') ) )
+
+def removeFromSketchIndex( sketch: adsk.fusion.Sketch, lineTokens: list[str] ) :
+    index = getSketchIndex( sketch )
+    if not index:
+        return
+    lineTokens = set( lineTokens )
+    index = { child: parent for child, parent in index.items() if parent not in lineTokens }
+    setSketchIndex( sketch, index )
+
+# Write the CCLine record.  If a sketch index is passed in it is updated in
+# place and the caller must save it with setSketchIndex().  That lets a batch
+# of new CCLines write the sketch index once.
+def setCCLineAttributes( ccLine: CCLine, index: dict = None ) :
+    line = ccLine.line
+    lineToken = line.entityToken
+
+    # Upgrade a legacy CCLine by removing the per-field attributes
+    if line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 ):
+        for name in CC_LINE_DATA_ATTRIBUTES + CC_LINE_CHILD_ATTRIBUTES:
+            attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, name )
+            if attr:
+                attr.deleteMe()
+
+    record = makeRecord( ccLine )
+    setAttribute( line, CC_LINE_RECORD, json.dumps( record, separators=(',', ':') ) )
+    ccLine.record = record
+
+    # Set the line as the parent of all the child entities in the sketch index
+    sketch = line.parentSketch
+    saveIndex = index is None
+    if saveIndex:
+        index = getSketchIndex( sketch )
+    for child in [ child for child, parent in index.items() if parent == lineToken ]:
+        del index[child]
+    for ent in getCCLineMembers( ccLine ):
+        if ent != line:
+            index[ent.entityToken] = lineToken
+    if saveIndex:
+        setSketchIndex( sketch, index )
+
+    # futil.print_Attributes( line )
+
+def getLineData( line: adsk.fusion.SketchLine ) -> CCLineData :
+
+    record = readRecord( line )
+    if not record:
         return None
     
-    cclineData.N1 = int(attr.value)
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N2 )
-    cclineData.N2 = int(attr.value)
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_TEETH )
-    cclineData.Teeth = int(attr.value)
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_EC )
-    cclineData.ExtraCenterIN = float(attr.value)
-    attr = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_MOTION_TYPE )
-    cclineData.motion = int(attr.value)
-
-    return cclineData
+    return recordToLineData( record )
 
 # Returns the parent line of the CCLine or None if not a member of a CCLine
 def getParentLine( curve: adsk.fusion.SketchCurve ) -> adsk.fusion.SketchLine :
     if not curve:
         return None
     
-    # Check to see if the curve has the CC_LINE_PARENT_LINE attribute set
+    # Check to see if this is the actual CCLine
     try:
-        token = curve.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_PARENT_LINE )
+        if curve.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_RECORD ):
+            return curve
+        sketch = curve.parentSketch
     except:
         return None
-    
+
+    design = sketch.parentComponent.parentDesign
+
+    # Look up the parent in the sketch index
+    index = getSketchIndex( sketch )
+    curveToken = curve.entityToken
+    token = index.get( curveToken )
+    if not token and index:
+        token = findIndexedParent( design, sketch, index, curve, curveToken )
+    if token:
+        line = design.findEntityByToken( token )
+        if len(line) == 0:
+            return None
+        return line[0]
+
+    # Check for the legacy CC_LINE_PARENT_LINE attribute
+    token = curve.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_PARENT_LINE )
     if not token:
-        # No parent line set.  Check if this is the actual CCLine by looking for N1
+        # No parent line set.  Check if this is a legacy CCLine by looking for N1
         token = curve.attributes.itemByName( CC_ATTRIBUTE_GROUP, CC_LINE_N1 )
         if not token:
             return None
@@ -155,101 +335,387 @@ def getParentLine( curve: adsk.fusion.SketchCurve ) -> adsk.fusion.SketchLine :
             return curve
     
     # Get the Parent Line and return it if it exists
-    line = curve.parentSketch.parentComponent.parentDesign.findEntityByToken( token.value )
+    line = design.findEntityByToken( token.value )
     if len(line) == 0:
         return None
     
     return line[0]
-    
-def getChildCircles( line: adsk.fusion.SketchLine ) -> list[adsk.fusion.SketchCircle] :
 
-    design = line.parentSketch.parentComponent.parentDesign
+# Fusion can give an entity a different token than the one saved, so a token
+# that isn't in the sketch index is not proof that the curve has no parent.
+# Resolve the children in the index and compare entities.  A match is saved
+# under the new token so the next lookup is a plain dictionary hit.
+def findIndexedParent( design: adsk.fusion.Design, sketch: adsk.fusion.Sketch, index: dict,
+                       curve: adsk.fusion.SketchCurve, curveToken: str ) -> str :
+    for child, parent in index.items():
+        ents = design.findEntityByToken( child )
+        if len( ents ) > 0 and ents[0] == curve:
+            index[curveToken] = parent
+            setSketchIndex( sketch, index )
+            return parent
+    return None
+
+def getChildCircles( line: adsk.fusion.SketchLine, record: dict = None ) -> list[adsk.fusion.SketchCircle] :
+
+    if not record:
+        record = readRecord( line )
 
     attrNames = [ CC_LINE_PITCH_CIRCLE1, CC_LINE_PITCH_CIRCLE2, CC_LINE_OD_CIRCLE1, CC_LINE_OD_CIRCLE2 ]
 
     circles = []
-    i = 0
-    while i < len(attrNames):
-        token = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, attrNames[i] )
-        circle = design.findEntityByToken( token.value )
-        if len( circle ) == 0:
+    for name in attrNames:
+        circle = getChildEntity( line, name, record )
+        if not circle:
             futil.log(f'Error getting child circles of line...')
             return None
-        circles.append( circle[0] )
-        i += 1
+        circles.append( circle )
 
     return circles
 
-def getChildEntity( line: adsk.fusion.SketchLine, attribute: str ) :
+def getChildEntity( line: adsk.fusion.SketchLine, attribute: str, record: dict = None ) :
 
     design = line.parentSketch.parentComponent.parentDesign
 
-    token = line.attributes.itemByName( CC_ATTRIBUTE_GROUP, attribute )
+    if not record:
+        record = readRecord( line )
+
+    token = record.get( attribute ) if record else None
     if not token:
         futil.log(f'Error getting attribute "{attribute}" from line')
+        return None
 
-    ents = design.findEntityByToken( token.value )
+    ents = design.findEntityByToken( token )
     if len( ents ) == 0:
         futil.log(f'Error getting child entity "{attribute}"')
         return None
     
     return ents[0]
 
+# Returns the CCLine that the curve is a member of.  The child entities are
+# only looked up when they are first used.
 def getCCLineFromEntity( curve: adsk.fusion.SketchCurve ) -> CCLine :
-    ccLine = CCLine()
 
     # futil.log(f'getCCLineFromEntity --- ')
     # futil.print_Attributes( curve )
 
-    ccLine.line = getParentLine( curve )
-    if not ccLine.line:
+    line = getParentLine( curve )
+    if not line:
         return None
 
     # Get the associated data from the line attributes
-    ccLine.data = getLineData( ccLine.line )
+    record = readRecord( line )
+    if not record:
+        return None
 
-    circles = getChildCircles( ccLine.line )
-    if len(circles) != 4:
-        futil.log( f'Error getting child circle data.')
-        return ccLine
-    
-    ccLine.pitchCircle1 = circles[0]
-    ccLine.pitchCircle2 = circles[1]
-    ccLine.ODCircle1 = circles[2]
-    ccLine.ODCircle2 = circles[3]
-
-    ccLine.lengthDim = getChildEntity( ccLine.line, CC_LINE_LENGTH_DIM )
-    ccLine.PD1Dim = getChildEntity( ccLine.line, CC_LINE_PITCH_CIRCLE1_DIM )
-    ccLine.PD2Dim = getChildEntity( ccLine.line, CC_LINE_PITCH_CIRCLE2_DIM )
-    ccLine.OD1Dim = getChildEntity( ccLine.line, CC_LINE_OD_CIRCLE1_DIM )
-    ccLine.OD2Dim = getChildEntity( ccLine.line, CC_LINE_OD_CIRCLE2_DIM )
-    ccLine.textBox = getChildEntity( ccLine.line, CC_LINE_TEXT )
-    ccLine.textHeight = getChildEntity( ccLine.line, CC_LINE_TEXT_HEIGHT_DIM )
-
-    return ccLine
+    return CCLine( line, recordToLineData( record ), record )
     
 def deleteCCLine( ccLine: CCLine ):
-    try:
-        ccLine.pitchCircle1.deleteMe()
-    except:
-        None
-    try:
-        ccLine.pitchCircle2.deleteMe()
-    except:
-        None
-    try:
-        ccLine.ODCircle1.deleteMe()
-    except:
-        None
-    try:
-        ccLine.ODCircle2.deleteMe()
-    except:
-        None
-    try:
-        ccLine.textBox.deleteMe()
-    except:
-        None
-    try:
-        ccLine.line.deleteMe()
-    except:
-        None
+    deleteCCLines( [ccLine] )
+
+# Delete all of the CCLines and their child entities as one batch
+def deleteCCLines( ccLines: list[CCLine] ):
+    if not ccLines:
+        return
+
+    # Gather the members of every CCLine and the sketches they are in
+    dims = []
+    texts = []
+    curves = []
+    sketches = {}
+    lineTokens = collections.defaultdict( list )
+    for ccLine in ccLines:
+        if not ccLine.line.isValid:
+            continue
+        unregisterCCLine( ccLine )
+        sketch = ccLine.line.parentSketch
+        sketchToken = sketch.entityToken
+        sketches[sketchToken] = sketch
+        lineTokens[sketchToken].append( ccLine.line.entityToken )
+
+        dims.extend( [ccLine.lengthDim, ccLine.PD1Dim, ccLine.PD2Dim, ccLine.OD1Dim, ccLine.OD2Dim, ccLine.textHeight] )
+        texts.append( ccLine.textBox )
+        curves.extend( [ccLine.pitchCircle1, ccLine.pitchCircle2, ccLine.ODCircle1, ccLine.ODCircle2] )
+        if ccLine.textBox:
+            textDef: adsk.fusion.MultiLineTextDefinition = ccLine.textBox.definition
+            curves.extend( textDef.rectangleLines )
+        curves.append( ccLine.line )
+
+    for sketchToken, sketch in sketches.items():
+        removeFromSketchIndex( sketch, lineTokens[sketchToken] )
+
+    # Delete dimensions before the curves they reference.  Entities that went
+    # away with something deleted earlier are no longer valid and are skipped.
+    with futil.computeDeferred( *sketches.values() ):
+        for ent in dims + texts + curves:
+            if not ent or not ent.isValid:
+                continue
+            try:
+                ent.deleteMe()
+            except:
+                futil.log(f'Failed to delete {ent.objectType} of CCLine')
+
+# Per-design registry of resolved CCLines.  Every entity token of a CCLine and
+# its child entities maps to the CCLine so the UI hooks can identify a CCLine
+# with a single dictionary lookup instead of walking the attributes.  Tokens
+# are only the fast path: an entity can come back with a different token, so
+# a miss is settled by comparing entities (see resolveMiss).
+class CCLineRegistry :
+
+    def __init__( self, design: adsk.fusion.Design ) :
+        self.design = design
+        self.byToken: dict[str, CCLine] = {}
+        self.memberTokens: dict[str, list[str]] = {}
+        self.lineSketch: dict[str, str] = {}
+        self.nonMembers: set[str] = set()     # Tokens known not to be in a CCLine or a sketch with one
+        self.isBuilt = False
+
+    # Find all of the CCLines in the design with one attribute sweep
+    def build( self ) :
+        self.byToken = {}
+        self.memberTokens = {}
+        self.lineSketch = {}
+        self.nonMembers = set()
+        sketchIndices = {}
+        for attr in findCCLineAttributes( self.design ):
+            line = attr.parent
+            if not line:
+                continue
+            if attr.name == CC_LINE_RECORD:
+                record = decodeRecord( attr.value )
+            else:
+                record = readLegacyRecord( line )
+            if not record:
+                continue
+
+            sketch = line.parentSketch
+            sketchToken = sketch.entityToken
+            if sketchToken not in sketchIndices:
+                sketchIndices[sketchToken] = getSketchIndex( sketch )
+
+            self.add( CCLine( line, recordToLineData( record ), record ), sketchIndices[sketchToken], sketchToken )
+        self.isBuilt = True
+        futil.log(f'CCLineRegistry built with {len(self.memberTokens)} CCLines.')
+
+    # Register the CCLine under the tokens in its record and the sketch index
+    # so none of the child entities have to be looked up.
+    def add( self, ccLine: CCLine, index: dict = None, sketchToken: str = None ) :
+        lineToken = ccLine.line.entityToken
+        self.remove( lineToken, ccLine.line if self.isBuilt else None )
+
+        if index is None or sketchToken is None:
+            sketch = ccLine.line.parentSketch
+            sketchToken = sketch.entityToken
+            if index is None:
+                index = getSketchIndex( sketch )
+        self.lineSketch[lineToken] = sketchToken
+
+        tokens = [ lineToken ]
+        if ccLine.record:
+            tokens.extend( ccLine.record[name] for name in CC_LINE_CHILD_ATTRIBUTES if name in ccLine.record )
+        tokens.extend( child for child, parent in index.items() if parent == lineToken )
+        for token in tokens:
+            self.byToken[token] = ccLine
+        self.memberTokens[lineToken] = tokens
+        self.nonMembers.clear()
+
+    # Remove a CCLine by the token of its line.  If that token has changed
+    # since the CCLine was added the line itself finds it.
+    def remove( self, lineToken: str, line: adsk.fusion.SketchLine = None ) :
+        if lineToken not in self.memberTokens and line:
+            lineToken = next( ( token for token in self.memberTokens if self.byToken[token].line == line ), lineToken )
+        self.nonMembers.clear()
+        tokens = self.memberTokens.pop( lineToken, None )
+        if not tokens:
+            return
+        for token in tokens:
+            self.byToken.pop( token, None )
+        self.lineSketch.pop( lineToken, None )
+
+    def lookup( self, entity: adsk.core.Base ) -> CCLine :
+        if not self.isBuilt:
+            self.build()
+
+        # Reject entities that can't be part of a CCLine without touching attributes
+        if entity.objectType not in CC_MEMBER_TYPES:
+            return None
+
+        try:
+            token = entity.entityToken
+        except:
+            return None
+        ccLine = self.byToken.get( token )
+
+        if ccLine and not ccLine.line.isValid:
+            # The CCLine was removed behind our back (undo, etc.)
+            self.invalidate()
+            return self.lookup( entity )
+
+        if not ccLine and token not in self.nonMembers:
+            ccLine = self.resolveMiss( entity, token )
+        return ccLine
+
+    # Fusion can give an entity a different token than the one saved, so a
+    # miss is checked against the resolved members of the CCLines in the same
+    # sketch.  A member is added under its new token, anything else is
+    # remembered as not a member until the CCLines change.
+    def resolveMiss( self, entity: adsk.core.Base, token: str ) -> CCLine :
+        try:
+            sketch = entity.parentSketch
+        except:
+            return None
+        for ccLine in self.sketchCCLines( sketch ):
+            if not ccLine.line.isValid:
+                continue
+            if any( member == entity for member in getCCLineMembers( ccLine ) if member ):
+                lineToken = next( t for t in self.memberTokens if self.byToken[t] is ccLine )
+                self.byToken[token] = ccLine
+                self.memberTokens[lineToken].append( token )
+                return ccLine
+        self.nonMembers.add( token )
+        return None
+
+    # All of the CCLines in the sketch
+    def sketchCCLines( self, sketch: adsk.fusion.Sketch ) -> list[CCLine] :
+        if not self.isBuilt:
+            self.build()
+        sketchToken = sketch.entityToken
+        ccLines = [ self.byToken[lineToken] for lineToken, token in self.lineSketch.items() if token == sketchToken ]
+        if not ccLines and sketchToken not in self.nonMembers:
+            # The sketch may have a new token, compare the sketches themselves
+            ccLines = [ self.byToken[lineToken] for lineToken in self.memberTokens
+                        if self.byToken[lineToken].line.isValid and self.byToken[lineToken].line.parentSketch == sketch ]
+            if not ccLines:
+                self.nonMembers.add( sketchToken )
+        return ccLines
+
+    # All of the CCLines in the design
+    def allCCLines( self ) -> list[CCLine] :
+        if not self.isBuilt:
+            self.build()
+        if any( not self.byToken[lineToken].line.isValid for lineToken in self.memberTokens ):
+            # Some were removed behind our back (undo, etc.)
+            self.invalidate()
+            self.build()
+        return [ self.byToken[lineToken] for lineToken in self.memberTokens ]
+
+    def hasCCLines( self, sketch: adsk.fusion.Sketch ) -> bool :
+        if not self.isBuilt:
+            self.build()
+        return len( self.sketchCCLines( sketch ) ) > 0
+
+    def invalidate( self ) :
+        self.isBuilt = False
+        self.byToken = {}
+        self.memberTokens = {}
+        self.lineSketch = {}
+        self.nonMembers = set()
+
+_registries: list[CCLineRegistry] = []
+
+# Functions called with ( ccLine, removed ) when a CCLine is created, changed or
+# deleted, and with ( None, True ) when the registries are thrown away because
+# CCLines may have changed behind our back (undo, redo, etc.)
+_ccLineListeners = []
+
+# Find the record attribute of every CCLine in the design including legacy ones
+def findCCLineAttributes( design: adsk.fusion.Design ) -> list[adsk.core.Attribute] :
+    attrs = list( design.findAttributes( CC_ATTRIBUTE_GROUP, CC_LINE_RECORD ) )
+    attrs.extend( design.findAttributes( CC_ATTRIBUTE_GROUP, CC_LINE_N1 ) )
+    return attrs
+
+# Decode the data of every CCLine in the design from a single attribute sweep
+def getAllLineData( design: adsk.fusion.Design ) -> list[CCLineData] :
+    lineData = []
+    for attr in findCCLineAttributes( design ):
+        if attr.name == CC_LINE_RECORD:
+            ld = decodeLineData( attr.value )
+        else:
+            ld = getLineData( attr.parent )
+        if ld:
+            lineData.append( ld )
+
+    return lineData
+
+def getRegistry( design: adsk.fusion.Design = None ) -> CCLineRegistry :
+    global _registries
+
+    if not design:
+        design = adsk.fusion.Design.cast( adsk.core.Application.get().activeProduct )
+        if not design:
+            return None
+
+    # Drop the registries of designs that have been closed
+    _registries = [reg for reg in _registries if reg.design.isValid]
+
+    for reg in _registries:
+        if reg.design == design:
+            return reg
+
+    reg = CCLineRegistry( design )
+    _registries.append( reg )
+    return reg
+
+# Returns the CCLine that the entity is a member of or None.
+def findCCLine( entity: adsk.core.Base ) -> CCLine :
+    reg = getRegistry()
+    if not reg:
+        return None
+    return reg.lookup( entity )
+
+def registerCCLine( ccLine: CCLine, index: dict = None ) :
+    reg = getRegistry( ccLine.line.parentSketch.parentComponent.parentDesign )
+    if reg.isBuilt:
+        reg.add( ccLine, index )
+    notifyCCLineListeners( ccLine, False )
+
+def unregisterCCLine( ccLine: CCLine ) :
+    reg = getRegistry( ccLine.line.parentSketch.parentComponent.parentDesign )
+    if reg and reg.isBuilt:
+        reg.remove( ccLine.line.entityToken, ccLine.line )
+    notifyCCLineListeners( ccLine, True )
+
+def addCCLineListener( listener ) :
+    if listener not in _ccLineListeners:
+        _ccLineListeners.append( listener )
+
+def removeCCLineListener( listener ) :
+    if listener in _ccLineListeners:
+        _ccLineListeners.remove( listener )
+
+def notifyCCLineListeners( ccLine: CCLine, removed: bool ) :
+    for listener in list( _ccLineListeners ):
+        try:
+            listener( ccLine, removed )
+        except:
+            futil.handle_error( 'CCLine listener' )
+
+# True if the sketch has any CCLines in it
+def sketchHasCCLines( sketch: adsk.fusion.Sketch ) -> bool :
+    reg = getRegistry( sketch.parentComponent.parentDesign )
+    return reg.hasCCLines( sketch )
+
+# All of the CCLines in the sketch
+def getSketchCCLines( sketch: adsk.fusion.Sketch ) -> list[CCLine] :
+    reg = getRegistry( sketch.parentComponent.parentDesign )
+    return reg.sketchCCLines( sketch )
+
+# All of the CCLines in the design
+def getDesignCCLines( design: adsk.fusion.Design ) -> list[CCLine] :
+    return getRegistry( design ).allCCLines()
+
+def invalidateRegistries() :
+    for reg in _registries:
+        reg.invalidate()
+    notifyCCLineListeners( None, True )
+
+# All of the sketch entities that make up a CCLine
+def getCCLineMembers( ccLine: CCLine ) -> list :
+    members = [ccLine.line, ccLine.pitchCircle1, ccLine.pitchCircle2, ccLine.ODCircle1, ccLine.ODCircle2,
+               ccLine.lengthDim, ccLine.PD1Dim, ccLine.PD2Dim, ccLine.OD1Dim, ccLine.OD2Dim,
+               ccLine.textBox, ccLine.textHeight]
+    if ccLine.textBox:
+        textDef: adsk.fusion.MultiLineTextDefinition = ccLine.textBox.definition
+        for tbline in textDef.rectangleLines:
+            members.append( tbline )
+
+    return [ent for ent in members if ent]
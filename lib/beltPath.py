@@ -0,0 +1,471 @@
+# Length of a belt wrapped around a loop of circles, and the idler position
+# that makes a loop take a given belt.
+#
+# The Timing Belt and Idler Solver commands pass in plain circles and curves,
+# and python lib/beltPath.py times the solver on random idler problems.
+#
+# A loop is a list of (x, y, s) circles in the order the belt goes around
+# them counter-clockwise.  s is the radius of the pitch line, positive when
+# the circle is inside the loop and negative when the belt runs around the
+# back of it (an idler pushing in from the outside).  All lengths are in the
+# same units as the circles.
+
+import math
+import collections
+
+
+# The straight span from one circle to the next.  Touches the first circle
+# at (x1, y1) and the next at (x2, y2).  angle is the direction of the
+# normal from the belt to the inside of the loop.
+Span = collections.namedtuple( 'Span', ( 'x1', 'y1', 'x2', 'y2', 'angle' ) )
+
+# The spans, the angle the belt wraps each circle and the total length
+BeltPath = collections.namedtuple( 'BeltPath', ( 'spans', 'wraps', 'length' ) )
+
+TWO_PI = 2 * math.pi
+
+
+# The normal angle of the span from circle a to circle b
+def _spanAngle( a: tuple, b: tuple ) -> float :
+    dx = b[0] - a[0]
+    dy = b[1] - a[1]
+    dist = math.hypot( dx, dy )
+    ds = b[2] - a[2]
+    if dist <= abs( ds ):
+        raise ValueError( 'The belt can not go between circles that overlap like this' )
+    return math.atan2( dy, dx ) + math.acos( ds / dist )
+
+def beltPath( loop: list ) -> BeltPath :
+    count = len( loop )
+    angles = [ _spanAngle( loop[i], loop[(i + 1) % count] ) for i in range( count ) ]
+
+    spans = []
+    length = 0.0
+    for i in range( count ):
+        a = loop[i]
+        b = loop[(i + 1) % count]
+        nx = math.cos( angles[i] )
+        ny = math.sin( angles[i] )
+        span = Span( a[0] - a[2] * nx, a[1] - a[2] * ny, b[0] - b[2] * nx, b[1] - b[2] * ny, angles[i] )
+        spans.append( span )
+        length += math.hypot( span.x2 - span.x1, span.y2 - span.y1 )
+
+    # The belt turns counter-clockwise around circles inside the loop and
+    # clockwise around the ones it runs behind
+    wraps = []
+    for i in range( count ):
+        turn = ( angles[i] - angles[i - 1] ) % TWO_PI
+        if loop[i][2] < 0:
+            turn = ( TWO_PI - turn ) % TWO_PI
+        wraps.append( turn )
+        length += abs( loop[i][2] ) * turn
+
+    return BeltPath( spans, wraps, length )
+
+def beltLength( loop: list ) -> float :
+    return beltPath( loop ).length
+
+
+# The loop around pulleys and back side idlers, all (x, y, radius).  The belt
+# goes around the convex hull of the pulleys.  Pulleys inside the hull can
+# only touch the back of the belt so they are taken as back side idlers too.
+# Each idler goes on the span it is closest to, in order along it.
+def pulleyLoop( pulleys: list, backIdlers: list = () ) -> list :
+    if len( set( pulleys ) ) < 2:
+        raise ValueError( 'A belt needs at least two pulleys' )
+    hull = _circleHull( list( set( pulleys ) ) )
+    idlers = [ p for p in set( pulleys ) if p not in hull ] + list( backIdlers )
+
+    # The idlers on each span, with how far along the span they are
+    placed = [ [] for i in hull ]
+    for idler in idlers:
+        best = None
+        for i in range( len( hull ) ):
+            distance, along = _spanDistance( hull[i], hull[(i + 1) % len( hull )], idler )
+            rank = ( 0 <= along <= 1, -abs( distance ) )
+            if best is None or rank > best[0]:
+                best = ( rank, i, along )
+        placed[best[1]].append( ( best[2], idler ) )
+
+    loop = []
+    for i, pulley in enumerate( hull ):
+        loop.append( pulley )
+        for along, ( x, y, r ) in sorted( placed[i] ):
+            loop.append( ( x, y, -r ) )
+
+    path = beltPath( loop )
+    for ( x, y, s ), wrap in zip( loop, path.wraps ):
+        if s < 0 and not 0 < wrap < math.pi:
+            raise ValueError( 'The belt can not go around the back side idlers like this' )
+    return loop
+
+# Signed distance of circle c from the span of a to b, positive inside the
+# loop, and how far along the span its center is (0 to 1)
+def _spanDistance( a: tuple, b: tuple, c: tuple ) -> tuple :
+    angle = _spanAngle( a, b )
+    nx = math.cos( angle )
+    ny = math.sin( angle )
+    x1 = a[0] - a[2] * nx
+    y1 = a[1] - a[2] * ny
+    dx = b[0] - b[2] * nx - x1
+    dy = b[1] - b[2] * ny - y1
+    along = ( ( c[0] - x1 ) * dx + ( c[1] - y1 ) * dy ) / ( dx * dx + dy * dy )
+    return ( c[0] - x1 ) * nx + ( c[1] - y1 ) * ny, along
+
+# The circles on the convex hull of a list of (x, y, radius) circles,
+# counter-clockwise.  This is the gift wrapping march: from the lowest circle
+# the span to the next hull circle is the one the belt turns least to reach.
+# It takes O(n h) for n circles and h on the hull, and a belt has few of
+# both.  A large circle can be on the hull more than once.
+def _circleHull( circles: list ) -> list :
+    start = min( circles, key=lambda c: ( c[1] - c[2], c[0] ) )
+    hull = [ start ]
+    angle = math.pi / 2
+    while len( hull ) <= 2 * len( circles ):
+        current = hull[-1]
+        best = None
+        for c in circles:
+            if c is current:
+                continue
+            try:
+                spanAngle = _spanAngle( current, c )
+            except ValueError:
+                # One circle is inside the other
+                continue
+            turn = ( spanAngle - angle ) % TWO_PI
+            distance = math.hypot( c[0] - current[0], c[1] - current[1] )
+            if best is None or ( turn, -distance ) < ( best[0], -best[1] ):
+                best = ( turn, distance, c, spanAngle )
+        if best is None:
+            break
+
+        # Around to the first span again
+        turn, distance, c, spanAngle = best
+        if current is start and len( hull ) > 1 and c is hull[1]:
+            break
+        hull.append( c )
+        angle = spanAngle
+    return hull[:-1]
+
+# The loop of a closed chain of sketch lines and arcs.  Each curve is
+# ( start, end, center, radius ) with the center None for lines and arcs
+# going counter-clockwise from start to end.  The curves can be in any order
+# and direction.  The arcs are the circles of the loop, the lines only join
+# them since beltPath works out the spans.  An arc the belt goes around
+# clockwise is a back side idler.
+def curveLoop( curves: list ) -> list :
+    if not curves:
+        raise ValueError( 'The curves are not a closed loop' )
+    size = max( abs( v ) for start, end, center, radius in curves for v in start + end )
+    tolerance = 1e-9 * ( 1 + size )
+
+    def same( p, q ) :
+        return abs( p[0] - q[0] ) <= tolerance and abs( p[1] - q[1] ) <= tolerance
+
+    # Go around the chain from the end of the first curve
+    remaining = list( curves[1:] )
+    start, end, center, radius = curves[0]
+    chain = [ ( curves[0], True ) ]
+    point = end
+    while remaining:
+        for k, curve in enumerate( remaining ):
+            if same( curve[0], point ):
+                chain.append( ( curve, True ) )
+                point = curve[1]
+                break
+            if same( curve[1], point ):
+                chain.append( ( curve, False ) )
+                point = curve[0]
+                break
+        else:
+            raise ValueError( 'The curves are not one closed loop' )
+        remaining.pop( k )
+    if not same( point, start ):
+        raise ValueError( 'The curves are not a closed loop' )
+
+    # Twice the area inside the chain, positive when it goes counter-clockwise.
+    # The arcs add their circular segments to the polygon of the curve ends.
+    area = 0.0
+    loop = []
+    for ( start, end, center, radius ), forward in chain:
+        p, q = ( start, end ) if forward else ( end, start )
+        area += p[0] * q[1] - q[0] * p[1]
+        if center is None:
+            continue
+        sweep = ( math.atan2( end[1] - center[1], end[0] - center[0] ) -
+                  math.atan2( start[1] - center[1], start[0] - center[0] ) ) % TWO_PI
+        segment = radius * radius * ( sweep - math.sin( sweep ) )
+        area += segment if forward else -segment
+        loop.append( ( center[0], center[1], radius if forward else -radius ) )
+
+    if len( loop ) < 2:
+        raise ValueError( 'The loop needs at least two arcs for the pulleys' )
+    if area < 0:
+        loop = [ ( x, y, -s ) for x, y, s in reversed( loop ) ]
+    return loop
+
+
+# The unit direction of travel of each span of the loop
+def _spanDirections( path: BeltPath ) -> list :
+    return [ ( math.sin( span.angle ), -math.cos( span.angle ) ) for span in path.spans ]
+
+# Gradient of the belt length as circle i of the loop moves.  Only the spans
+# on each side of it change length; the change of the wrap cancels the
+# movement of the tangent points.
+def lengthGradient( path: BeltPath, i: int ) -> tuple :
+    directions = _spanDirections( path )
+    inX, inY = directions[i - 1]
+    outX, outY = directions[i]
+    return inX - outX, inY - outY
+
+
+# A curve the idler center is kept on, as a function of a parameter from 0 to 1
+# and its derivative.
+class LineCurve:
+
+    def __init__( self, x1: float, y1: float, x2: float, y2: float ):
+        self.x1 = x1
+        self.y1 = y1
+        self.dx = x2 - x1
+        self.dy = y2 - y1
+
+    def point( self, u: float ) -> tuple :
+        return self.x1 + u * self.dx, self.y1 + u * self.dy
+
+    def tangent( self, u: float ) -> tuple :
+        return self.dx, self.dy
+
+class ArcCurve:
+
+    def __init__( self, cx: float, cy: float, radius: float, startAngle: float, sweep: float ):
+        self.cx = cx
+        self.cy = cy
+        self.radius = radius
+        self.startAngle = startAngle
+        self.sweep = sweep
+
+    def point( self, u: float ) -> tuple :
+        angle = self.startAngle + u * self.sweep
+        return self.cx + self.radius * math.cos( angle ), self.cy + self.radius * math.sin( angle )
+
+    def tangent( self, u: float ) -> tuple :
+        angle = self.startAngle + u * self.sweep
+        return -self.radius * self.sweep * math.sin( angle ), self.radius * self.sweep * math.cos( angle )
+
+
+# Where an idler on a curve makes the loop around two pulleys take a belt.
+IdlerSolution = collections.namedtuple( 'IdlerSolution', ( 'u', 'x', 'y', 'path', 'loop', 'steps' ) )
+
+# Parameter steps when looking for the stretch of the curve with the answer
+IDLER_SAMPLES = 64
+
+# Stop when the belt length is this close to the target (relative)
+IDLER_TOLERANCE = 1e-12
+IDLER_MAX_STEPS = 60
+
+# The loop around pulleys p1 and p2 (x, y, pitch radius) with an idler at
+# (x, y).  The idler goes on the span on its side of the C-C line, inside the
+# loop or behind the belt.
+def idlerLoop( p1: tuple, p2: tuple, x: float, y: float, idlerRadius: float, behind: bool ) -> list :
+    idler = ( x, y, -idlerRadius if behind else idlerRadius )
+    cross = ( p2[0] - p1[0] ) * ( y - p1[1] ) - ( p2[1] - p1[1] ) * ( x - p1[0] )
+    if cross < 0:
+        return [ p1, idler, p2 ]
+    return [ p2, idler, p1 ]
+
+# The belt length with the idler at parameter u, or None when the idler
+# does not press on the belt there
+def _idlerLength( p1, p2, curve, u, idlerRadius, behind ) :
+    x, y = curve.point( u )
+    loop = idlerLoop( p1, p2, x, y, idlerRadius, behind )
+    try:
+        path = beltPath( loop )
+    except ValueError:
+        return None, None, None
+    if not 0 < path.wraps[1] < math.pi:
+        return None, None, None
+    return path.length, path, loop
+
+# Solve for the idler position on a curve that gives the belt length.
+#
+# The curve is sampled to find a stretch where the length crosses the target
+# and Newton's method finds the crossing, with the exact gradient of the
+# length.  A Newton step that leaves the stretch is replaced by bisection.
+# Where the idler starts or stops pressing on the belt between two samples
+# the edge is found by bisection and sampled too, since the longest belt is
+# often right at it.  A sample that is a longest belt still too short, or a
+# shortest belt still too long, can hide a crossing just beside it, so the
+# extreme between its neighbours is found by golden section search and
+# checked too.  Returns the solution closest to the start of the curve, or
+# None.
+def solveIdler( p1: tuple, p2: tuple, curve, idlerRadius: float, beltLengthTarget: float,
+                behind: bool = False, samples: int = IDLER_SAMPLES ) -> IdlerSolution :
+    tolerance = IDLER_TOLERANCE * beltLengthTarget
+
+    lastU = lastErr = None
+    prevU = prevErr = None      # The point before the last one
+    for k in range( samples + 1 ):
+        u = k / samples
+        length = _idlerLength( p1, p2, curve, u, idlerRadius, behind )[0]
+        points = [ ( u, length ) ]
+        if k > 0 and ( length is None ) != ( lastLength is None ):
+            edge = _idlerEdge( p1, p2, curve, idlerRadius, behind, ( k - 1 ) / samples, u, length is None )
+            points.insert( 0, edge )
+        lastLength = length
+
+        for u, length in points:
+            if length is None:
+                lastU = lastErr = prevU = prevErr = None
+                continue
+            err = length - beltLengthTarget
+            if abs( err ) <= tolerance:
+                return _idlerSolution( p1, p2, curve, u, idlerRadius, behind, 0 )
+            if lastErr is not None and ( lastErr < 0 ) != ( err < 0 ):
+                solution = _refineIdler( p1, p2, curve, idlerRadius, beltLengthTarget, behind, lastU, u, lastErr, tolerance )
+                if solution:
+                    return solution
+            elif prevErr is not None and ( 0 > lastErr >= max( prevErr, err ) or 0 < lastErr <= min( prevErr, err ) ):
+                # The last point is the nearest to the target of its neighbours
+                # without reaching it, look for a crossing around it
+                sign = 1 if lastErr < 0 else -1
+                extremeU, extremeErr = _idlerExtreme( p1, p2, curve, idlerRadius, behind, beltLengthTarget,
+                                                      prevU, u, sign, tolerance )
+                if extremeU is not None and abs( extremeErr ) <= tolerance:
+                    return _idlerSolution( p1, p2, curve, extremeU, idlerRadius, behind, 0 )
+                if extremeU is not None and ( extremeErr < 0 ) != ( lastErr < 0 ):
+                    solution = _refineIdler( p1, p2, curve, idlerRadius, beltLengthTarget, behind,
+                                             prevU, extremeU, prevErr, tolerance )
+                    if solution:
+                        return solution
+            prevU, prevErr = lastU, lastErr
+            lastU = u
+            lastErr = err
+
+    return None
+
+# The valid point closest to where the idler starts or stops pressing on the
+# belt between parameters lo and hi.  validLo tells which end is valid.
+def _idlerEdge( p1, p2, curve, idlerRadius, behind, lo, hi, validLo, steps: int = 40 ) :
+    valid, invalid = ( lo, hi ) if validLo else ( hi, lo )
+    length = _idlerLength( p1, p2, curve, valid, idlerRadius, behind )[0]
+    for i in range( steps ):
+        u = ( valid + invalid ) / 2
+        mid = _idlerLength( p1, p2, curve, u, idlerRadius, behind )[0]
+        if mid is None:
+            invalid = u
+        else:
+            valid, length = u, mid
+    return valid, length
+
+# Golden section search between parameters lo and hi for the longest belt
+# when sign is 1, or the shortest when it is -1.  Stops once the belt reaches
+# the target.  Returns the parameter and length error, or None, None where
+# the idler does not press on the belt.
+def _idlerExtreme( p1, p2, curve, idlerRadius, behind, target, lo, hi, sign, tolerance, steps: int = 40 ) :
+    def score( u ) :
+        length = _idlerLength( p1, p2, curve, u, idlerRadius, behind )[0]
+        if length is None:
+            return -math.inf, None
+        return sign * ( length - target ), length - target
+
+    ratio = ( math.sqrt( 5 ) - 1 ) / 2
+    a = hi - ratio * ( hi - lo )
+    b = lo + ratio * ( hi - lo )
+    scoreA, errA = score( a )
+    scoreB, errB = score( b )
+    for i in range( steps ):
+        if max( scoreA, scoreB ) >= -tolerance:
+            break
+        if scoreA > scoreB:
+            hi, b, scoreB, errB = b, a, scoreA, errA
+            a = hi - ratio * ( hi - lo )
+            scoreA, errA = score( a )
+        else:
+            lo, a, scoreA, errA = a, b, scoreB, errB
+            b = lo + ratio * ( hi - lo )
+            scoreB, errB = score( b )
+
+    if scoreA >= scoreB:
+        return ( a, errA ) if errA is not None else ( None, None )
+    return ( b, errB ) if errB is not None else ( None, None )
+
+def _refineIdler( p1, p2, curve, idlerRadius, target, behind, lo, hi, errLo, tolerance ) :
+    u = ( lo + hi ) / 2
+    for step in range( 1, IDLER_MAX_STEPS + 1 ):
+        length, path, loop = _idlerLength( p1, p2, curve, u, idlerRadius, behind )
+        if length is None:
+            return None
+        err = length - target
+        if abs( err ) <= tolerance:
+            return _idlerSolution( p1, p2, curve, u, idlerRadius, behind, step )
+
+        # Keep the stretch around the answer
+        if ( err < 0 ) == ( errLo < 0 ):
+            lo, errLo = u, err
+        else:
+            hi = u
+
+        gx, gy = lengthGradient( path, 1 )
+        tx, ty = curve.tangent( u )
+        slope = gx * tx + gy * ty
+        newU = u - err / slope if slope else lo
+        if not min( lo, hi ) < newU < max( lo, hi ):
+            newU = ( lo + hi ) / 2
+        if newU == u:
+            break
+        u = newU
+
+    return _idlerSolution( p1, p2, curve, u, idlerRadius, behind, IDLER_MAX_STEPS )
+
+def _idlerSolution( p1, p2, curve, u, idlerRadius, behind, steps ) :
+    length, path, loop = _idlerLength( p1, p2, curve, u, idlerRadius, behind )
+    x, y = curve.point( u )
+    return IdlerSolution( u, x, y, path, loop, steps )
+
+
+# Time the solver on random idler problems
+def _benchmark( count: int = 2000 ) :
+    import random
+    import time
+
+    random.seed( 1 )
+    problems = []
+    for i in range( count ):
+        r1 = random.uniform( 0.5, 2 )
+        r2 = random.uniform( 0.5, 2 )
+        cc = random.uniform( r1 + r2 + 1, 12 )
+        p1 = ( 0.0, 0.0, r1 )
+        p2 = ( cc, 0.0, r2 )
+        # A line across the lower span with the idler behind the belt
+        x = random.uniform( r1, cc - r2 )
+        curve = LineCurve( x, 0.5, x, -max( r1, r2 ) - 3 )
+        plain = beltLength( [ p1, p2 ] )
+        problems.append( ( p1, p2, curve, plain + random.uniform( 0.05, 1.5 ) ) )
+
+    startTime = time.perf_counter()
+    solved = [ solveIdler( p1, p2, curve, 0.4, target, behind=True ) for p1, p2, curve, target in problems ]
+    elapsed = time.perf_counter() - startTime
+
+    worst = max( abs( s.path.length - p[3] ) / p[3] for s, p in zip( solved, problems ) if s )
+    found = sum( 1 for s in solved if s )
+    steps = sum( s.steps for s in solved if s ) / max( found, 1 )
+    print( f'{count} idlers: {found} solved in {elapsed*1000:.0f}ms, {steps:.1f} Newton steps, worst error {worst:.1e}' )
+
+    # Serpentine loops of pulleys and back side idlers
+    loops = []
+    for i in range( count ):
+        pulleys = [ ( random.uniform( 0, 20 ), random.uniform( 0, 20 ), random.uniform( 0.5, 2 ) ) for k in range( 6 ) ]
+        loops.append( pulleys )
+    startTime = time.perf_counter()
+    built = 0
+    for pulleys in loops:
+        try:
+            pulleyLoop( pulleys[:4], pulleys[4:] )
+            built += 1
+        except ValueError:
+            pass
+    elapsed = time.perf_counter() - startTime
+    print( f'{count} loops of 4 pulleys and 2 idlers: {built} built in {elapsed*1000:.0f}ms' )
+
+if __name__ == '__main__':
+    _benchmark()
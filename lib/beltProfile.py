@@ -0,0 +1,390 @@
+# Exact tooth profile of an HTD or GT2 belt.
+#
+# Only the Timing Belt command turns these curves into sketch geometry, so
+# python lib/beltProfile.py can time the outlines and check that they join.
+#
+# A belt tooth is a base line on the inside of the belt, a fillet arc at each
+# end of it and the round bump of the tooth between them.  The tooth dict of
+# a belt type in the motion catalog gives the fillet radius, the bump radius
+# and how far the bump center is from the base line (cm).  The bump touches
+# each fillet from the outside, which fixes everything else:
+#
+#   base length = 2 sqrt( (bump + fillet)^2 - (offset - fillet)^2 )
+#
+# The profile is worked out on a base line from (0, 0) to (base length, 0)
+# with the tooth toward +y, then moved onto the belt.
+#
+# beltOutline works out the whole toothed outline of a belt around a loop of
+# pulleys so the belt is one extrude of one profile.  The teeth are placed by
+# length along the pitch line of the loop and bent onto the pulleys: each
+# fillet touches the inside of the belt and the bump wherever the tooth is.
+
+import math
+import collections
+
+try:
+    from .beltPath import beltPath
+except ImportError:
+    from beltPath import beltPath
+
+
+# The points, lines and arcs of a profile.  points maps a name to (x, y),
+# lines are pairs of point names and arcs are (center (x, y), radius,
+# start name, end name) going counter-clockwise from the start to the end.
+ToothProfile = collections.namedtuple( 'ToothProfile', ( 'points', 'lines', 'arcs', 'baseLength', 'height' ) )
+
+
+def toothProfile( tooth: dict ) -> ToothProfile :
+    fillet = tooth['filletRadius']
+    bump = tooth['toothBumpRadius']
+    offset = tooth['toothBumpOffset']
+
+    rise = offset - fillet
+    if bump + fillet <= abs( rise ):
+        raise ValueError( 'The tooth bump does not reach the fillets' )
+    half = math.sqrt( ( bump + fillet ) ** 2 - rise ** 2 )
+    baseLength = 2 * half
+
+    # The fillets touch the bump on the lines between the centers
+    ux = half / ( bump + fillet )
+    uy = rise / ( bump + fillet )
+    points = {
+        'start': ( 0.0, 0.0 ),
+        'end': ( baseLength, 0.0 ),
+        'left': ( fillet * ux, fillet + fillet * uy ),
+        'right': ( baseLength - fillet * ux, fillet + fillet * uy ),
+    }
+    arcs = [
+        ( ( 0.0, fillet ), fillet, 'start', 'left' ),
+        ( ( half, offset ), bump, 'right', 'left' ),
+        ( ( baseLength, fillet ), fillet, 'right', 'end' ),
+    ]
+    return ToothProfile( points, [ ( 'start', 'end' ) ], arcs, baseLength, offset + bump )
+
+# Move a profile so the start of the base line is at (x, y), the base line
+# goes along (ux, uy) and the tooth is toward (nx, ny).  Both directions are
+# unit vectors.  When they make a left handed frame the profile is mirrored
+# and the arcs are turned around to stay counter-clockwise.
+def placeProfile( profile: ToothProfile, x: float, y: float, ux: float, uy: float, nx: float, ny: float ) -> ToothProfile :
+    def place( p ) :
+        return ( x + p[0] * ux + p[1] * nx, y + p[0] * uy + p[1] * ny )
+
+    points = { name: place( p ) for name, p in profile.points.items() }
+    mirrored = ux * ny - uy * nx < 0
+    arcs = []
+    for center, radius, start, end in profile.arcs:
+        if mirrored:
+            start, end = end, start
+        arcs.append( ( place( center ), radius, start, end ) )
+    return ToothProfile( points, list( profile.lines ), arcs, profile.baseLength, profile.height )
+
+# The counter-clockwise sweep of an arc of a profile (radians)
+def arcSweep( profile: ToothProfile, arc: tuple ) -> float :
+    ( cx, cy ), radius, start, end = arc
+    sx, sy = profile.points[start]
+    ex, ey = profile.points[end]
+    return ( math.atan2( ey - cy, ex - cx ) - math.atan2( sy - cy, sx - cx ) ) % ( 2 * math.pi )
+
+
+# One curve of a belt outline, in the order the outline goes around.  center
+# and radius are None for a line.  Arcs go counter-clockwise from start to end
+# when ccw is set and clockwise when not.
+OutlineCurve = collections.namedtuple( 'OutlineCurve', ( 'start', 'end', 'center', 'radius', 'ccw' ) )
+
+# The outside and inside loops of a belt, the teeth and the spacing of the
+# teeth along the pitch line
+BeltOutline = collections.namedtuple( 'BeltOutline', ( 'outside', 'inside', 'teeth', 'toothSpacing' ) )
+
+
+# The pitch line of a loop of circles (see beltPath) as a list of pieces in
+# the order the belt goes around: each span and then the wrap of the circle
+# it goes to.  Every piece is ( start length, length, kind, data ) and
+# _piecePoint finds the point at a length along the pitch line, moved d
+# toward the inside of the loop.
+def _pitchPieces( loop: list ) -> tuple :
+    path = beltPath( loop )
+    count = len( loop )
+    pieces = []
+    position = 0.0
+    for i, span in enumerate( path.spans ):
+        length = math.hypot( span.x2 - span.x1, span.y2 - span.y1 )
+        pieces.append( ( position, length, 'span', span ) )
+        position += length
+
+        x, y, s = loop[(i + 1) % count]
+        wrap = path.wraps[(i + 1) % count]
+        pieces.append( ( position, abs( s ) * wrap, 'wrap', ( x, y, s, span.angle ) ) )
+        position += abs( s ) * wrap
+    return pieces, position
+
+def _piecePoint( piece: tuple, length: float, d: float ) -> tuple :
+    start, size, kind, data = piece
+    if kind == 'span':
+        nx = math.cos( data.angle )
+        ny = math.sin( data.angle )
+        t = length - start
+        return ( data.x1 + t * ny + d * nx, data.y1 - t * nx + d * ny )
+    x, y, s, angle = data
+    angle += math.copysign( length - start, s ) / abs( s )
+    return ( x - ( s - d ) * math.cos( angle ), y - ( s - d ) * math.sin( angle ) )
+
+# The lengths along a piece where the pitch line moved d to the inside is r
+# from the point (px, py)
+def _pieceCrossings( piece: tuple, d: float, px: float, py: float, r: float ) -> list :
+    start, size, kind, data = piece
+    if kind == 'span':
+        x, y = _piecePoint( piece, start, d )
+        nx = math.cos( data.angle )
+        ny = math.sin( data.angle )
+        wx = x - px
+        wy = y - py
+        b = wx * ny - wy * nx
+        disc = b * b - ( wx * wx + wy * wy - r * r )
+        if disc < 0:
+            return []
+        root = math.sqrt( disc )
+        return [ start - b - root, start - b + root ]
+
+    x, y, s, angle = data
+    rho = s - d
+    ex = x - px
+    ey = y - py
+    e = math.hypot( ex, ey )
+    if e == 0 or rho == 0:
+        return []
+    k = ( e * e + rho * rho - r * r ) / ( 2 * rho * e )
+    if abs( k ) > 1:
+        return []
+    # The normal there is at psi +/- acos( k )
+    psi = math.atan2( ey, ex )
+    crossings = []
+    for phi in ( psi + math.acos( k ), psi - math.acos( k ) ):
+        turn = ( ( phi - angle ) * math.copysign( 1, s ) ) % ( 2 * math.pi )
+        crossings.append( start + turn * abs( s ) )
+    return crossings
+
+# The piece with a length on it, for lengths that can go past either end of
+# the loop
+def _pieceAt( pieces: list, total: float, length: float ) -> tuple :
+    lap, length = divmod( length, total )
+    for piece in pieces:
+        if piece[1] > 0 and length <= piece[0] + piece[1]:
+            return piece, lap * total
+    return pieces[-1], lap * total
+
+# The curves of the loop moved d to the inside, from length a to length b
+# along the pitch line.  b can be up to a lap past a.
+def _loopCurves( pieces: list, total: float, a: float, b: float, d: float ) -> list :
+    curves = []
+    for lap in ( -total, 0.0, total ):
+        for piece in pieces:
+            start, size, kind, data = piece
+            lo = max( a, start + lap )
+            hi = min( b, start + lap + size )
+            if hi - lo <= 1e-12 * total:
+                continue
+            p1 = _piecePoint( piece, lo - lap, d )
+            p2 = _piecePoint( piece, hi - lap, d )
+            if kind == 'span':
+                curves.append( ( lo, OutlineCurve( p1, p2, None, None, True ) ) )
+            else:
+                x, y, s, angle = data
+                curves.append( ( lo, OutlineCurve( p1, p2, ( x, y ), abs( s - d ), s - d > 0 ) ) )
+    curves.sort( key=lambda c: c[0] )
+    return [ curve for lo, curve in curves ]
+
+# The crossing of the loop moved d to the inside with the circle of radius r
+# around (px, py) closest to the length near, before or after it
+def _nearestCrossing( pieces: list, total: float, d: float, px: float, py: float, r: float,
+                      near: float, after: bool ) -> float :
+    best = None
+    for lap in ( -total, 0.0, total ):
+        for piece in pieces:
+            start, size, kind, data = piece
+            for length in _pieceCrossings( piece, d, px, py, r ):
+                if not start - 1e-12 <= length <= start + size + 1e-12:
+                    continue
+                length += lap
+                if ( length > near ) != after:
+                    continue
+                if best is None or abs( length - near ) < abs( best - near ):
+                    best = length
+    if best is None:
+        raise ValueError( 'The tooth does not fit on the belt' )
+    return best
+
+# The toothed outline of a belt around a loop of (x, y, s) pitch circles
+# (see beltPath) with toothCount teeth of a belt tooth dict and the belt
+# thickness.  The pitch line is the middle of the belt and the teeth are on
+# the inside.  Without teeth the inside is plain.  All lengths are in the
+# units of the loop, cm for the catalog teeth.
+def beltOutline( loop: list, tooth: dict, thickness: float, toothCount: int ) -> BeltOutline :
+    half = thickness / 2
+    fillet = tooth['filletRadius']
+    bump = tooth['toothBumpRadius']
+    offset = tooth['toothBumpOffset']
+
+    for x, y, s in loop:
+        if abs( s ) <= half + fillet:
+            raise ValueError( 'A pulley is too small for the belt' )
+
+    pieces, total = _pitchPieces( loop )
+    outside = _loopCurves( pieces, total, 0.0, total, -half )
+    if toothCount <= 0:
+        return BeltOutline( outside, _loopCurves( pieces, total, 0.0, total, half ), 0, 0.0 )
+
+    spacing = total / toothCount
+    teeth = []
+    for i in range( toothCount ):
+        middle = ( i + 0.5 ) * spacing
+        piece, lap = _pieceAt( pieces, total, middle )
+        cx, cy = _piecePoint( piece, middle - lap, half + offset )
+
+        # The fillets are on the line d = half + fillet, bump + fillet from the bump
+        feet = []
+        for after in ( False, True ):
+            length = _nearestCrossing( pieces, total, half + fillet, cx, cy, bump + fillet, middle, after )
+            piece, lap = _pieceAt( pieces, total, length )
+            fx, fy = _piecePoint( piece, length - lap, half + fillet )
+            foot = _piecePoint( piece, length - lap, half )
+            touch = ( fx + ( cx - fx ) * fillet / ( bump + fillet ), fy + ( cy - fy ) * fillet / ( bump + fillet ) )
+            feet.append( ( length, ( fx, fy ), foot, touch ) )
+        teeth.append( ( middle, ( cx, cy ), feet ) )
+
+    inside = []
+    for i, ( middle, center, ( first, last ) ) in enumerate( teeth ):
+        inside.append( OutlineCurve( first[2], first[3], first[1], fillet, True ) )
+        inside.append( OutlineCurve( first[3], last[3], center, bump, False ) )
+        inside.append( OutlineCurve( last[3], last[2], last[1], fillet, True ) )
+
+        following = teeth[(i + 1) % toothCount][2][0][0]
+        if i + 1 == toothCount:
+            following += total
+        if following < last[0]:
+            raise ValueError( 'The belt teeth overlap' )
+        inside.extend( _loopCurves( pieces, total, last[0], following, half ) )
+
+    return BeltOutline( outside, inside, toothCount, spacing )
+
+# The points of a closed loop of outline curves with the arcs cut into
+# segments of at most maxAngle (radians).  The first point is not repeated
+# at the end.
+def outlinePoints( curves: list, maxAngle: float = math.radians( 15 ) ) -> list :
+    points = []
+    for curve in curves:
+        points.append( curve.start )
+        if curve.center is None:
+            continue
+        cx, cy = curve.center
+        startAngle = math.atan2( curve.start[1] - cy, curve.start[0] - cx )
+        sweep = ( math.atan2( curve.end[1] - cy, curve.end[0] - cx ) - startAngle ) % ( 2 * math.pi )
+        if not curve.ccw:
+            sweep -= 2 * math.pi
+        steps = max( 1, math.ceil( abs( sweep ) / maxAngle ) )
+        for k in range( 1, steps ):
+            angle = startAngle + sweep * k / steps
+            points.append( ( cx + curve.radius * math.cos( angle ), cy + curve.radius * math.sin( angle ) ) )
+    return points
+
+
+# Check every profile of the catalog: each arc starts and ends on its circle
+# and the curves meet with the same direction
+def _check() :
+    import os
+    try:
+        from .motionCatalog import getMotionCatalog
+    except ImportError:
+        from motionCatalog import getMotionCatalog
+
+    catalog = getMotionCatalog( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'data', 'motionTypes.json' ) )
+    for beltType in catalog.ofKind( 'belt' ):
+        if not beltType.hasProfile:
+            continue
+        profile = placeProfile( toothProfile( beltType.tooth ), 1.0, 2.0, 0.6, 0.8, 0.8, -0.6 )
+        worst = 0.0
+        for ( cx, cy ), radius, start, end in profile.arcs:
+            for name in ( start, end ):
+                px, py = profile.points[name]
+                worst = max( worst, abs( math.hypot( px - cx, py - cy ) - radius ) )
+
+        # Tangent of each arc at a point, turned to point along the arc
+        def tangent( arc, name ) :
+            ( cx, cy ), radius, start, end = arc
+            px, py = profile.points[name]
+            return ( -( py - cy ) / radius, ( px - cx ) / radius )
+
+        kinks = 0.0
+        for a, b in zip( profile.arcs, profile.arcs[1:] ):
+            shared = ( { a[2], a[3] } & { b[2], b[3] } ).pop()
+            ta = tangent( a, shared )
+            tb = tangent( b, shared )
+            kinks = max( kinks, abs( ta[0] * tb[1] - ta[1] * tb[0] ) )
+
+        sweeps = ', '.join( f'{math.degrees( arcSweep( profile, arc ) ):.1f}' for arc in profile.arcs )
+        print( f'{beltType.name:14} base {profile.baseLength*10:.3f}mm  height {profile.height*10:.3f}mm  '
+               f'sweeps {sweeps} deg  off circle {worst:.1e}  kink {kinks:.1e}' )
+
+# The tangent of an outline curve, in the direction it goes, at one end
+def _curveTangent( curve: OutlineCurve, atEnd: bool ) -> tuple :
+    ( sx, sy ), ( ex, ey ) = curve.start, curve.end
+    if curve.center is None:
+        length = math.hypot( ex - sx, ey - sy )
+        return ( ( ex - sx ) / length, ( ey - sy ) / length )
+    px, py = curve.end if atEnd else curve.start
+    cx, cy = curve.center
+    turn = 1 if curve.ccw else -1
+    return ( -turn * ( py - cy ) / curve.radius, turn * ( px - cx ) / curve.radius )
+
+# The worst gap and the worst kink between the curves of a closed loop, and
+# the worst distance of an arc end from its circle
+def _loopErrors( curves: list ) -> tuple :
+    gap = kink = worst = 0.0
+    for a, b in zip( curves, curves[1:] + curves[:1] ):
+        gap = max( gap, math.hypot( a.end[0] - b.start[0], a.end[1] - b.start[1] ) )
+        ta = _curveTangent( a, True )
+        tb = _curveTangent( b, False )
+        kink = max( kink, abs( ta[0] * tb[1] - ta[1] * tb[0] ) + max( 0.0, -( ta[0] * tb[0] + ta[1] * tb[1] ) ) )
+        if a.center is not None:
+            for px, py in ( a.start, a.end ):
+                worst = max( worst, abs( math.hypot( px - a.center[0], py - a.center[1] ) - a.radius ) )
+    return gap, kink, worst
+
+# Time the outline of belts of each type and length and check the curves
+# join up smoothly
+def _benchmark() :
+    import os
+    import time
+    try:
+        from .motionCatalog import getMotionCatalog
+    except ImportError:
+        from motionCatalog import getMotionCatalog
+
+    catalog = getMotionCatalog( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'data', 'motionTypes.json' ) )
+    for beltType in catalog.ofKind( 'belt' ):
+        if not beltType.hasProfile:
+            continue
+        pitch = beltType.pitchMM / 10
+        thickness = beltType.thicknessMM / 10
+        for teeth in ( 60, 150, 300 ):
+            # 18T and 36T pulleys with the C-C distance that takes the belt
+            r1 = 18 * pitch / ( 2 * math.pi )
+            r2 = 36 * pitch / ( 2 * math.pi )
+            cc = ( teeth * pitch - math.pi * ( r1 + r2 ) ) / 2
+            for step in range( 20 ):
+                cc -= ( beltPath( [ ( 0.0, 0.0, r1 ), ( cc, 0.0, r2 ) ] ).length - teeth * pitch ) / 2
+            loop = [ ( 0.0, 0.0, r1 ), ( cc, 0.0, r2 ) ]
+
+            startTime = time.perf_counter()
+            outline = beltOutline( loop, beltType.tooth, thickness, teeth )
+            elapsed = time.perf_counter() - startTime
+            points = len( outlinePoints( outline.outside ) ) + len( outlinePoints( outline.inside ) )
+            pointsElapsed = time.perf_counter() - startTime - elapsed
+
+            errors = [ max( e ) for e in zip( _loopErrors( outline.outside ), _loopErrors( outline.inside ) ) ]
+            curves = len( outline.outside ) + len( outline.inside )
+            print( f'{beltType.name:14} {teeth:3}T  {elapsed*1000:6.2f}ms  {curves:5} curves  '
+                   f'{pointsElapsed*1000:5.2f}ms  {points:5} preview points  gap {errors[0]:.1e}  kink {errors[1]:.1e}  off circle {errors[2]:.1e}' )
+
+if __name__ == '__main__':
+    _check()
+    _benchmark()
@@ -0,0 +1,61 @@
+# Index of the belt lengths that are kept in stock.
+#
+# This module does not import adsk.  The stock file is a JSON object with a
+# sorted or unsorted list of belt teeth for each motion type name.  Keys that
+# start with an underscore are ignored.
+
+import json
+import bisect
+
+
+class BeltStock:
+    __slots__ = ( 'teeth', )
+
+    def __init__( self, teeth: dict = None ):
+        # motion type name -> sorted list of stocked belt teeth
+        self.teeth = {}
+        for motionName, counts in ( teeth or {} ).items():
+            if not motionName.startswith( '_' ):
+                self.teeth[motionName] = sorted( set( int( t ) for t in counts ) )
+
+    def hasStock( self, motionName: str ) -> bool :
+        return bool( self.teeth.get( motionName ) )
+
+    def isStocked( self, motionName: str, beltTeeth: int ) -> bool :
+        counts = self.teeth.get( motionName, [] )
+        i = bisect.bisect_left( counts, beltTeeth )
+        return i < len( counts ) and counts[i] == beltTeeth
+
+    # The nearest stocked belts below and above (or equal to) beltTeeth.
+    # Either is None when there is no stocked belt on that side.
+    def nearest( self, motionName: str, beltTeeth: int ) -> tuple :
+        counts = self.teeth.get( motionName, [] )
+        i = bisect.bisect_left( counts, beltTeeth )
+        below = counts[i - 1] if i > 0 else None
+        above = counts[i] if i < len( counts ) else None
+        return below, above
+
+    # The next stocked belt strictly above or below beltTeeth, for stepping a spinner
+    def step( self, motionName: str, beltTeeth: int, up: bool ) :
+        counts = self.teeth.get( motionName, [] )
+        if up:
+            i = bisect.bisect_right( counts, beltTeeth )
+            return counts[i] if i < len( counts ) else None
+        i = bisect.bisect_left( counts, beltTeeth )
+        return counts[i - 1] if i > 0 else None
+
+
+# The loaded stock files, by file name
+_stockCache = {}
+
+# Load a stock file once.  A missing or bad file gives an empty stock.
+def getBeltStock( filename: str ) -> BeltStock :
+    stock = _stockCache.get( filename )
+    if stock is None:
+        try:
+            with open( filename ) as f:
+                stock = BeltStock( json.load( f ) )
+        except ( OSError, ValueError ):
+            stock = BeltStock()
+        _stockCache[filename] = stock
+    return stock
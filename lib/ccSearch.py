@@ -0,0 +1,385 @@
+# Search every gear, pulley/belt or sprocket/chain combination for a ratio and C-C window.
+#
+# The ratio explorer of the C-C Distance dialog calls these, and the time of
+# a search with and without NumPy is shown by python lib/ccSearch.py.
+#
+# The ratio is N2 / N1 and the C-C distances are in inches without any
+# extra center.  Uses NumPy when it is available.
+
+import math
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from .motionMath import GearsCCDistanceIN, BeltCCDistanceIN, BeltBatchIN, ChainCCDistanceIN, ChainBatchIN, ChainPitchDiameterIN
+except ImportError:
+    from motionMath import GearsCCDistanceIN, BeltCCDistanceIN, BeltBatchIN, ChainCCDistanceIN, ChainBatchIN, ChainPitchDiameterIN
+
+
+# One combination found by a search.  teeth is 0 for gears.
+CCMatch = collections.namedtuple( 'CCMatch', ( 'N1', 'N2', 'teeth', 'ratio', 'ccIN' ) )
+
+# One combination found by a grid search.  The C-C distance plus the extra
+# center is holes * the grid pitch.
+GridMatch = collections.namedtuple( 'GridMatch', ( 'N1', 'N2', 'teeth', 'ratio', 'ccIN', 'holes', 'extraCenterIN' ) )
+
+
+# All gear pairs with a ratio and C-C distance in the windows, best first.
+def searchGears( dp: int, ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                 cogRange: tuple = (8, 100), limit: int = 50 ) -> list[CCMatch] :
+    if np is not None:
+        N1, N2 = _cogPairs( cogRange, ratioMin, ratioMax )
+        cc = GearsCCDistanceIN( N1, N2, dp )
+        keep = ( cc >= ccMinIN ) & ( cc <= ccMaxIN )
+        N1, N2, cc = N1[keep], N2[keep], cc[keep]
+        return _topMatches( N1, N2, np.zeros( len( N1 ) ), cc, ratioMin, ratioMax, ccMinIN, ccMaxIN, limit )
+
+    matches = []
+    for N1 in range( cogRange[0], cogRange[1] + 1 ):
+        for N2 in range( cogRange[0], cogRange[1] + 1 ):
+            ratio = N2 / N1
+            if ratio < ratioMin or ratio > ratioMax:
+                continue
+            cc = GearsCCDistanceIN( N1, N2, dp )
+            if ccMinIN <= cc <= ccMaxIN:
+                matches.append( CCMatch( N1, N2, 0, ratio, cc ) )
+
+    return rankMatches( matches, ratioMin, ratioMax, ccMinIN, ccMaxIN, limit )
+
+# All pulley and belt combinations with a ratio and C-C distance in the windows, best first.
+#
+# The belt length grows with the C-C distance, so the range of belt teeth that
+# can fit the C-C window is worked out for each pulley pair.  Only those belts
+# are evaluated.
+def searchBelts( pitchMM: float, ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                 cogRange: tuple = (8, 100), teethRange: tuple = (35, 400), limit: int = 50 ) -> list[CCMatch] :
+    return _searchWrapped( _BELT, pitchMM, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, limit )
+
+# All sprocket and chain combinations with a ratio and C-C distance in the windows, best first.
+# teeth is the number of links.
+def searchChains( pitchIN: float, ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                  cogRange: tuple = (8, 100), linksRange: tuple = (35, 400), limit: int = 50 ) -> list[CCMatch] :
+    return _searchWrapped( _CHAIN, pitchIN, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, linksRange, limit )
+
+def _searchWrapped( wrap: tuple, pitch: float, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, limit ) :
+    if np is None:
+        return _searchWrappedPython( wrap, pitch, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, limit )
+
+    N1, N2 = _cogPairs( cogRange, ratioMin, ratioMax )
+
+    rows, teeth = _expandWrapped( wrap, N1, N2, pitch, ccMinIN, ccMaxIN, teethRange )
+    N1 = N1[rows]
+    N2 = N2[rows]
+
+    cc = wrap[1]( N1, N2, teeth, pitch )[0]
+    keep = ( cc >= ccMinIN ) & ( cc <= ccMaxIN )
+    N1, N2, teeth, cc = N1[keep], N2[keep], teeth[keep], cc[keep]
+
+    return _topMatches( N1, N2, teeth, cc, ratioMin, ratioMax, ccMinIN, ccMaxIN, limit )
+
+# Every cog pair in the range with a ratio in the window, as NumPy columns
+def _cogPairs( cogRange: tuple, ratioMin: float, ratioMax: float ) :
+    cogs = np.arange( cogRange[0], cogRange[1] + 1, dtype=float )
+    N1, N2 = np.meshgrid( cogs, cogs, indexing='ij' )
+    N1 = N1.ravel()
+    N2 = N2.ravel()
+    ratio = N2 / N1
+    keep = ( ratio >= ratioMin ) & ( ratio <= ratioMax )
+    return N1[keep], N2[keep]
+
+# The best matches of NumPy columns, in the order of rankMatches
+def _topMatches( N1, N2, teeth, cc, ratioMin, ratioMax, ccMinIN, ccMaxIN, limit ) -> list[CCMatch] :
+    ratio = N2 / N1
+
+    # Only fully sort the rows that can make the top of the ranking
+    ratioErr, ccErr = _errors( ratio, cc, ratioMin, ratioMax, ccMinIN, ccMaxIN, np.abs )
+    if limit and len( ratioErr ) > limit:
+        top = ratioErr <= np.partition( ratioErr, limit - 1 )[limit - 1]
+        N1, N2, teeth, ratio, cc = N1[top], N2[top], teeth[top], ratio[top], cc[top]
+        ratioErr, ccErr = ratioErr[top], ccErr[top]
+    order = np.lexsort( ( teeth, ccErr, ratioErr ) )[:limit]
+
+    return [ CCMatch( int(N1[i]), int(N2[i]), int(teeth[i]), float(ratio[i]), float(cc[i]) ) for i in order ]
+
+# Every belt of every pulley pair that may give a C-C distance in the window.
+# The C-C window can be different for each pair.  Returns the pair index and
+# the belt teeth of each row.
+def _expandWrapped( wrap: tuple, N1, N2, pitch, ccMinIN, ccMaxIN, teethRange ) :
+    teethMin, teethMax = wrap[0]( N1, N2, pitch, ccMinIN, ccMaxIN, np.ceil, np.floor, np.maximum )
+    teethMin = np.maximum( teethMin, teethRange[0] ).astype( int )
+    teethMax = np.minimum( teethMax, teethRange[1] ).astype( int )
+    counts = np.maximum( teethMax - teethMin + 1, 0 )
+
+    rows = np.repeat( np.arange( len( counts ) ), counts )
+    starts = np.repeat( np.cumsum( counts ) - counts, counts )
+    teeth = np.repeat( teethMin, counts ) + np.arange( counts.sum() ) - starts
+
+    return rows, teeth
+
+# Without NumPy every belt is a Python call, so the work is kept down:
+#
+#   - The pulley pairs are taken in order of ratio error, the first key of the
+#     ranking.  Once limit matches are found no later pair can make the list.
+#   - The C-C window is turned into the exact belt window of each pair with
+#     the belt length at its ends, so only belts that fit are evaluated.
+#   - Belts get longer with the C-C distance, so the best limit belts of a
+#     pair are the ones closest to the belt at the middle of the C-C window.
+#   - Swapping the pulleys gives the same C-C distance, which is worked out
+#     once for both.
+def _searchWrappedPython( wrap, pitch, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, limit ) :
+    ccMid = ( ccMinIN + ccMaxIN ) / 2
+    pairs = sorted( ( _errors( N2 / N1, 0, ratioMin, ratioMax, 0, 0, abs )[0], N1, N2 )
+                    for N1 in range( cogRange[0], cogRange[1] + 1 )
+                    for N2 in range( cogRange[0], cogRange[1] + 1 )
+                    if ratioMin <= N2 / N1 <= ratioMax )
+
+    matches = []
+    ccCache = {}
+    lastErr = None
+    for ratioErr, N1, N2 in pairs:
+        if limit and len( matches ) >= limit and ratioErr != lastErr:
+            break
+        lastErr = ratioErr
+
+        teethAt, ccLowest = wrap[3]( N1, N2, pitch )
+        teethMin, teethMax = _exactWindow( teethAt, ccLowest, ccMinIN, ccMaxIN )
+        teethMin = max( teethMin, teethRange[0] )
+        teethMax = min( teethMax, teethRange[1] )
+        if limit and teethMin <= teethMax:
+            middle = min( max( round( teethAt( max( ccMid, ccLowest ) ) ), teethMin ), teethMax )
+            teethMin = max( teethMin, middle - limit )
+            teethMax = min( teethMax, middle + limit )
+        for teeth in range( teethMin, teethMax + 1 ):
+            key = ( min( N1, N2 ), max( N1, N2 ), teeth )
+            if key not in ccCache:
+                try:
+                    ccCache[key] = wrap[2]( N1, N2, teeth, pitch )
+                except ValueError:
+                    # Too short to go around both pulleys
+                    ccCache[key] = None
+            cc = ccCache[key]
+            if cc is not None and ccMinIN <= cc <= ccMaxIN:
+                matches.append( CCMatch( N1, N2, teeth, N2 / N1, cc ) )
+
+    return rankMatches( matches, ratioMin, ratioMax, ccMinIN, ccMaxIN, limit )
+
+# The smallest and largest teeth with a C-C distance in the window, from the
+# exact length at the ends of the window.  The window is widened by a hair
+# for rounding and only ever holds belts that fit.
+def _exactWindow( teethAt, ccLowest: float, ccMinIN: float, ccMaxIN: float ) -> tuple :
+    ccLow = max( ccMinIN, ccLowest )
+    if ccMaxIN < ccLow:
+        return 1, 0
+    return math.ceil( teethAt( ccLow ) - 1e-9 ), math.floor( teethAt( ccMaxIN ) + 1e-9 )
+
+# The belt teeth of a pulley pair as a function of the C-C distance, the
+# length BeltCCDistanceIN solves, and the smallest C-C distance it solves for
+def _beltTeethAt( N1: int, N2: int, pitchMM: float ) :
+    PD1 = N1 * pitchMM / ( 25.4 * math.pi )
+    PD2 = N2 * pitchMM / ( 25.4 * math.pi )
+    wrapped = math.pi * ( PD1 + PD2 ) / 2
+    spread = ( PD1 - PD2 ) ** 2 / 4
+    scale = 25.4 / pitchMM
+
+    def teethAt( ccIN: float ) -> float :
+        return ( 2 * ccIN + wrapped + spread / ccIN ) * scale
+
+    return teethAt, max( abs( PD1 - PD2 ) / ( 2 * math.sqrt( 2 ) ), 1e-6 )
+
+# The chain links of a sprocket pair as a function of the C-C distance, the
+# length ChainCCDistanceIN solves, and the smallest C-C distance it solves for
+def _chainLinksAt( N1: int, N2: int, pitchIN: float ) :
+    big = ChainPitchDiameterIN( max( N1, N2 ), pitchIN )
+    small = ChainPitchDiameterIN( min( N1, N2 ), pitchIN )
+    diff = big - small
+    wrapped = math.pi * ( big + small ) / 2
+
+    def linksAt( ccIN: float ) -> float :
+        if diff == 0:
+            return ( 2 * ccIN + math.pi * big ) / pitchIN
+        phi = math.asin( min( diff / ( 2 * ccIN ), 1.0 ) )
+        return ( wrapped + diff * ( math.cos( phi ) / math.sin( phi ) + phi ) ) / pitchIN
+
+    return linksAt, max( diff / 2, 1e-6 )
+
+
+# The smallest and largest belt teeth that give a C-C distance in the window.
+# Inverts the belt length L = 2C + pi(D1+D2)/2 + (D1-D2)^2/4C which only grows
+# with C above |D1-D2|/(2*sqrt(2)).  Widened by one tooth for rounding, the
+# exact C-C distance of each belt is checked afterwards.
+def _beltTeethWindow( N1, N2, pitchMM, ccMinIN, ccMaxIN, ceil, floor, maximum ) :
+    PD1 = N1 * pitchMM / ( 25.4 * math.pi )
+    PD2 = N2 * pitchMM / ( 25.4 * math.pi )
+    diff2 = ( PD1 - PD2 ) * ( PD1 - PD2 )
+    ccLow = maximum( maximum( ccMinIN, 1e-6 ), abs( PD1 - PD2 ) / ( 2 * math.sqrt( 2 ) ) )
+
+    lengthMin = 2 * ccLow + math.pi * ( PD1 + PD2 ) / 2 + diff2 / ( 4 * ccLow )
+    lengthMax = 2 * ccMaxIN + math.pi * ( PD1 + PD2 ) / 2 + diff2 / ( 4 * ccMaxIN )
+
+    return ceil( lengthMin * 25.4 / pitchMM ) - 1, floor( lengthMax * 25.4 / pitchMM ) + 1
+
+# The smallest and largest number of links that give a C-C distance in the
+# window.  Inverts the ANSI chain length in links
+#   L = 2C/p + (N1+N2)/2 + p K^2/C,  K = (N1-N2)/(2 pi)
+# which only grows with C above p|K|/sqrt(2).  It is close to the exact
+# length the C-C distance is solved from, the window is widened by two links
+# and the exact C-C distance of each chain is checked afterwards.
+def _chainLinksWindow( N1, N2, pitchIN, ccMinIN, ccMaxIN, ceil, floor, maximum ) :
+    K2 = ( ( N1 - N2 ) / ( 2 * math.pi ) ) ** 2
+    ccLow = maximum( maximum( ccMinIN, 1e-6 ), pitchIN * abs( N1 - N2 ) / ( 2 * math.pi * math.sqrt( 2 ) ) )
+
+    linksMin = 2 * ccLow / pitchIN + ( N1 + N2 ) / 2 + pitchIN * K2 / ccLow
+    linksMax = 2 * ccMaxIN / pitchIN + ( N1 + N2 ) / 2 + pitchIN * K2 / ccMaxIN
+
+    return ceil( linksMin ) - 2, floor( linksMax ) + 2
+
+# Belts and chains are searched the same way with these functions:
+# ( teeth window of a pulley pair, batch C-C, scalar C-C, exact teeth of a
+#   pulley pair by C-C distance )
+_BELT = ( _beltTeethWindow, BeltBatchIN, BeltCCDistanceIN, _beltTeethAt )
+_CHAIN = ( _chainLinksWindow, ChainBatchIN, ChainCCDistanceIN, _chainLinksAt )
+
+# All gear pairs whose C-C distance plus an extra center in the band lands on
+# a multiple of the grid pitch, best first.  Also limited to the ratio and
+# C-C windows.
+def searchGridGears( dp: int, gridIN: float, extraMinIN: float, extraMaxIN: float,
+                     ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                     cogRange: tuple = (8, 100), limit: int = 50 ) -> list[GridMatch] :
+    matches = []
+    for match in searchGears( dp, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, limit=None ):
+        for holes in range( math.ceil( ( match.ccIN + extraMinIN ) / gridIN ), math.floor( ( match.ccIN + extraMaxIN ) / gridIN ) + 1 ):
+            if holes > 0:
+                matches.append( GridMatch( *match, holes, holes * gridIN - match.ccIN ) )
+
+    return rankGridMatches( matches, extraMinIN, extraMaxIN, limit )
+
+# All pulley and belt combinations whose C-C distance plus an extra center in
+# the band lands on a multiple of the grid pitch, best first.  Also limited to
+# the ratio and C-C windows.
+#
+# Each multiple of the grid is a narrow C-C window, so only the one or two
+# belts of each pulley pair that can reach it are evaluated.
+def searchGridBelts( pitchMM: float, gridIN: float, extraMinIN: float, extraMaxIN: float,
+                     ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                     cogRange: tuple = (8, 100), teethRange: tuple = (35, 400), limit: int = 50 ) -> list[GridMatch] :
+    return _searchGridWrapped( _BELT, pitchMM, gridIN, extraMinIN, extraMaxIN, ratioMin, ratioMax,
+                               ccMinIN, ccMaxIN, cogRange, teethRange, limit )
+
+# The same as searchGridBelts for sprockets and chain.  teeth is the number of links.
+def searchGridChains( pitchIN: float, gridIN: float, extraMinIN: float, extraMaxIN: float,
+                      ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                      cogRange: tuple = (8, 100), linksRange: tuple = (35, 400), limit: int = 50 ) -> list[GridMatch] :
+    return _searchGridWrapped( _CHAIN, pitchIN, gridIN, extraMinIN, extraMaxIN, ratioMin, ratioMax,
+                               ccMinIN, ccMaxIN, cogRange, linksRange, limit )
+
+def _searchGridWrapped( wrap: tuple, pitch: float, gridIN, extraMinIN, extraMaxIN, ratioMin, ratioMax,
+                        ccMinIN, ccMaxIN, cogRange, teethRange, limit ) :
+    holesMin = max( 1, math.ceil( ( ccMinIN + extraMinIN ) / gridIN ) )
+    holesMax = math.floor( ( ccMaxIN + extraMaxIN ) / gridIN )
+
+    if np is None:
+        # A belt gets at most 2 pitches longer per unit of C-C distance, so
+        # one length in the middle of the band tells if any belt of the pair
+        # can land on a multiple of the grid, which it usually can't.  Only
+        # those belts are evaluated.  Swapped pulleys share the work.
+        extraMid = ( extraMinIN + extraMaxIN ) / 2
+        reach = ( extraMaxIN - extraMinIN ) / pitch * ( 25.4 if wrap is _BELT else 1.0 ) + 1e-9
+        matches = []
+        for N1 in range( cogRange[0], cogRange[1] + 1 ):
+            for N2 in range( N1, cogRange[1] + 1 ):
+                swaps = [ ( a, b ) for a, b in ( ( N1, N2 ), ( N2, N1 ) ) if ratioMin <= b / a <= ratioMax ]
+                if not swaps:
+                    continue
+                teethAt, ccLowest = wrap[3]( N1, N2, pitch )
+                for holes in range( max( holesMin, math.ceil( ( ccLowest + extraMinIN ) / gridIN ) ), holesMax + 1 ):
+                    middle = teethAt( max( holes * gridIN - extraMid, ccLowest ) )
+                    teethMin = math.ceil( middle - reach )
+                    teethMax = math.floor( middle + reach )
+                    if teethMin > teethMax:
+                        continue
+                    for teeth in range( max( teethMin, teethRange[0] ), min( teethMax, teethRange[1] ) + 1 ):
+                        try:
+                            cc = wrap[2]( N1, N2, teeth, pitch )
+                        except ValueError:
+                            continue
+                        extra = holes * gridIN - cc
+                        if extraMinIN <= extra <= extraMaxIN and ccMinIN <= cc <= ccMaxIN:
+                            for a, b in dict.fromkeys( swaps ):
+                                matches.append( GridMatch( a, b, teeth, b / a, cc, holes, extra ) )
+
+        return rankGridMatches( matches, extraMinIN, extraMaxIN, limit )
+
+    cogs = np.arange( cogRange[0], cogRange[1] + 1, dtype=float )
+    N1, N2 = np.meshgrid( cogs, cogs, indexing='ij' )
+    N1 = N1.ravel()
+    N2 = N2.ravel()
+    ratio = N2 / N1
+    keep = ( ratio >= ratioMin ) & ( ratio <= ratioMax )
+
+    # One row for every multiple of the grid of every pulley pair
+    holeCounts = np.arange( holesMin, holesMax + 1 )
+    N1 = np.repeat( N1[keep], len( holeCounts ) )
+    N2 = np.repeat( N2[keep], len( holeCounts ) )
+    holes = np.tile( holeCounts, int( keep.sum() ) )
+
+    rows, teeth = _expandWrapped( wrap, N1, N2, pitch, holes * gridIN - extraMaxIN, holes * gridIN - extraMinIN, teethRange )
+    N1, N2, holes = N1[rows], N2[rows], holes[rows]
+
+    cc = wrap[1]( N1, N2, teeth, pitch )[0]
+    extra = holes * gridIN - cc
+    keep = ( extra >= extraMinIN ) & ( extra <= extraMaxIN ) & ( cc >= ccMinIN ) & ( cc <= ccMaxIN )
+    N1, N2, teeth, cc, holes, extra = N1[keep], N2[keep], teeth[keep], cc[keep], holes[keep], extra[keep]
+
+    order = np.lexsort( ( teeth, np.abs( extra - ( extraMinIN + extraMaxIN ) / 2 ) ) )[:limit]
+
+    return [ GridMatch( int(N1[i]), int(N2[i]), int(teeth[i]), float(N2[i] / N1[i]), float(cc[i]), int(holes[i]), float(extra[i]) )
+             for i in order ]
+
+# Sort grid matches by how far the extra center is from the middle of its band, then the smaller belt.
+def rankGridMatches( matches: list[GridMatch], extraMinIN: float, extraMaxIN: float, limit: int = 50 ) -> list[GridMatch] :
+    def key( m: GridMatch ) :
+        return ( abs( m.extraCenterIN - ( extraMinIN + extraMaxIN ) / 2 ), m.teeth )
+
+    return sorted( matches, key=key )[:limit]
+
+# How far each match is from the middle of the ratio and C-C windows
+def _errors( ratio, cc, ratioMin, ratioMax, ccMinIN, ccMaxIN, absolute ) :
+    return absolute( ratio - ( ratioMin + ratioMax ) / 2 ), absolute( cc - ( ccMinIN + ccMaxIN ) / 2 )
+
+# Sort matches by ratio error, then C-C error, then the smaller belt.
+def rankMatches( matches: list[CCMatch], ratioMin: float, ratioMax: float,
+                 ccMinIN: float, ccMaxIN: float, limit: int = 50 ) -> list[CCMatch] :
+    def key( m: CCMatch ) :
+        return _errors( m.ratio, m.ccIN, ratioMin, ratioMax, ccMinIN, ccMaxIN, abs ) + ( m.teeth, )
+
+    return sorted( matches, key=key )[:limit]
+
+
+# Time a full sweep of every pulley pair and belt
+def _benchmark() :
+    import time
+
+    startTime = time.perf_counter()
+    matches = searchBelts( 5, 0.0, 100.0, 0.0, 100.0, (8, 100), (35, 400), limit=10 )
+    elapsed = time.perf_counter() - startTime
+    print( f'Full sweep 8-100T x 8-100T x 35-400 belts, NumPy {"available" if np is not None else "not available"}' )
+    print( f'  {elapsed*1000:8.1f}ms  best {matches[0] if matches else None}' )
+
+    startTime = time.perf_counter()
+    matches = searchBelts( 5, 2.9, 3.1, 3.0, 6.0 )
+    elapsed = time.perf_counter() - startTime
+    print( f'3:1 between 3in and 6in' )
+    print( f'  {elapsed*1000:8.1f}ms  {len(matches)} matches, best {matches[0] if matches else None}' )
+
+    startTime = time.perf_counter()
+    matches = searchGridBelts( 5, 16 / 25.4, 0.0, 0.02, 0.0, 100.0, 0.0, 30.0 )
+    elapsed = time.perf_counter() - startTime
+    print( f'Any ratio on a 16mm grid up to 30in' )
+    print( f'  {elapsed*1000:8.1f}ms  best {matches[0] if matches else None}' )
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,269 @@
+# Monte Carlo tolerance analysis of the C-C Distances of a gearbox.
+#
+# The C-C Tolerance command hands this module plain stage and shaft data, so
+# a run of thousands of samples can be timed with python lib/ccTolerance.py.
+#
+# Every shaft of the gearbox gets a random hole position and bearing play for
+# each sample, shared by all of the stages on it.  Every gear, pulley and
+# sprocket gets a random pitch diameter and every belt and chain a random
+# length.  The center distance each sample gets is compared with the one its
+# parts need:
+#
+#   C-C error   how much further apart the shafts are than the parts need.
+#               The extra center of a design is the C-C error it plans for.
+#   backlash    the gear backlash at the pitch circle the C-C error gives
+#   slack       the belt or chain that is left over, negative when it has
+#               to stretch
+#
+# A negative C-C error binds gears and leaves belts and chains loose.  All
+# distances are in inches.  Uses NumPy when it is available.
+
+import math
+import random
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from .motionMath import GEAR_PRESSURE_ANGLE
+except ImportError:
+    from motionMath import GEAR_PRESSURE_ANGLE
+
+
+# The tolerances of a build.  The position, diameter and length tolerances are
+# +/- 3 standard deviations of a normal distribution, the hole position on
+# each axis.  The bearing play is how far a shaft can move off the center of
+# its hole, any direction and distance up to it equally likely.
+Tolerances = collections.namedtuple( 'Tolerances',
+    ( 'holePositionIN', 'bearingPlayIN', 'pitchDiameterIN', 'loopLengthFraction' ) )
+
+DEFAULT_TOLERANCES = Tolerances( 0.002, 0.001, 0.001, 0.001 )
+
+# Names of the tolerances for reports
+TOLERANCE_NAMES = {
+    'holePositionIN': 'Hole Position',
+    'bearingPlayIN': 'Bearing Play',
+    'pitchDiameterIN': 'Pitch Diameter',
+    'loopLengthFraction': 'Belt Length',
+}
+
+# One C-C Distance.  Shafts are any hashable key, stages on the same shaft
+# move together.  motion is the motionCatalog type, x and y are the designed
+# shaft positions.
+ToleranceStage = collections.namedtuple( 'ToleranceStage',
+    ( 'key', 'shaft1', 'shaft2', 'x1', 'y1', 'x2', 'y2', 'motion', 'N1', 'N2', 'teeth', 'extraCenterIN' ) )
+
+# A summary of the samples of one value.  low and high are the percentiles
+# at the two ends of the confidence, so that much of the samples are between.
+Distribution = collections.namedtuple( 'Distribution', ( 'mean', 'std', 'min', 'low', 'median', 'high', 'max' ) )
+
+# The result for one stage.  backlash is None for belts and chains and slack
+# None for gears.  tooClose is the fraction of samples with a negative C-C
+# error.  suggestedExtraCenterIN is the extra center that puts the low end of
+# the C-C error at 0.
+ToleranceResult = collections.namedtuple( 'ToleranceResult',
+    ( 'stage', 'ccError', 'backlash', 'slack', 'tooClose', 'suggestedExtraCenterIN' ) )
+
+DEFAULT_SAMPLES = 100000
+DEFAULT_CONFIDENCE = 0.997
+
+
+# The pitch length of a belt around two pitch circles C apart.  The same
+# exact open belt length the chain C-C solver uses.
+def wrapLengthIN( C: float, PD1: float, PD2: float ) -> float :
+    diff = abs( PD1 - PD2 )
+    beta = math.asin( diff / ( 2 * C ) )
+    return 2 * C * math.cos( beta ) + math.pi * ( PD1 + PD2 ) / 2 + diff * beta
+
+
+# Sample every stage.  Returns a ToleranceResult for each stage in order.
+# seed makes the samples repeatable.
+def analyzeTolerances( stages: list, tolerances: Tolerances = DEFAULT_TOLERANCES, samples: int = DEFAULT_SAMPLES,
+                       confidence: float = DEFAULT_CONFIDENCE, seed: int = None ) -> list[ToleranceResult] :
+    if np is None:
+        sampled = _samplePython( stages, tolerances, samples, seed )
+    else:
+        sampled = _sampleNumPy( stages, tolerances, samples, seed )
+
+    results = []
+    for stage, ( ccError, slack ) in zip( stages, sampled ):
+        errors = _distribution( ccError, confidence )
+        backlash = None
+        if not stage.motion.wrapped:
+            # The backlash is linear in the C-C error so its distribution is too
+            scale = 2 * math.tan( GEAR_PRESSURE_ANGLE )
+            backlash = Distribution( *( v * scale for v in errors ) )
+        results.append( ToleranceResult(
+            stage,
+            errors,
+            backlash,
+            _distribution( slack, confidence ) if slack is not None else None,
+            _fraction( ccError ),
+            stage.extraCenterIN - errors.low ) )
+
+    return results
+
+# How much of the spread of the C-C error of each stage comes from each
+# tolerance.  Each tolerance is sampled on its own and the standard deviation
+# of the C-C error it gives is returned for each stage, as a dict of
+# tolerance field name to standard deviation.
+def toleranceSensitivity( stages: list, tolerances: Tolerances = DEFAULT_TOLERANCES, samples: int = DEFAULT_SAMPLES,
+                          seed: int = None ) -> list[dict] :
+    sensitivity = [ {} for stage in stages ]
+    for name in Tolerances._fields:
+        alone = Tolerances( **{ field: getattr( tolerances, field ) if field == name else 0.0 for field in Tolerances._fields } )
+        results = analyzeTolerances( stages, alone, samples, DEFAULT_CONFIDENCE, seed )
+        for i, result in enumerate( results ):
+            sensitivity[i][name] = result.ccError.std
+    return sensitivity
+
+
+# Designed C-C distance, and the pitch diameters and loop length the parts need
+def _stageNominal( stage: ToleranceStage ) -> tuple :
+    motion = stage.motion
+    return motion.pitchDiameterIN( stage.N1 ), motion.pitchDiameterIN( stage.N2 ), motion.loopLengthIN( stage.teeth )
+
+def _sampleNumPy( stages, tolerances, samples, seed ) :
+    rng = np.random.default_rng( seed )
+
+    # The same offset for every stage on a shaft
+    offsets = {}
+    for stage in stages:
+        for shaft in ( stage.shaft1, stage.shaft2 ):
+            if shaft not in offsets:
+                dx = rng.normal( 0.0, tolerances.holePositionIN / 3, samples )
+                dy = rng.normal( 0.0, tolerances.holePositionIN / 3, samples )
+                play = tolerances.bearingPlayIN * np.sqrt( rng.random( samples ) )
+                angle = rng.random( samples ) * ( 2 * math.pi )
+                offsets[shaft] = ( dx + play * np.cos( angle ), dy + play * np.sin( angle ) )
+
+    sampled = []
+    for stage in stages:
+        PD1, PD2, length = _stageNominal( stage )
+        dx1, dy1 = offsets[stage.shaft1]
+        dx2, dy2 = offsets[stage.shaft2]
+        C = np.hypot( stage.x2 + dx2 - stage.x1 - dx1, stage.y2 + dy2 - stage.y1 - dy1 )
+        pd1 = PD1 + rng.normal( 0.0, tolerances.pitchDiameterIN / 3, samples )
+        pd2 = PD2 + rng.normal( 0.0, tolerances.pitchDiameterIN / 3, samples )
+
+        if not stage.motion.wrapped:
+            sampled.append( ( C - ( pd1 + pd2 ) / 2, None ) )
+            continue
+
+        loop = length * ( 1 + rng.normal( 0.0, tolerances.loopLengthFraction / 3, samples ) )
+        diff = np.abs( pd1 - pd2 )
+        beta = np.arcsin( diff / ( 2 * C ) )
+        slack = loop - ( 2 * C * np.cos( beta ) + math.pi * ( pd1 + pd2 ) / 2 + diff * beta )
+        # The belt length grows 2 cos(beta) for each inch of C-C distance, the
+        # error of the straight line is second order in the slack
+        sampled.append( ( -slack / ( 2 * np.cos( beta ) ), slack ) )
+
+    return sampled
+
+def _samplePython( stages, tolerances, samples, seed ) :
+    rng = random.Random( seed )
+
+    def offset() :
+        play = tolerances.bearingPlayIN * math.sqrt( rng.random() )
+        angle = rng.random() * ( 2 * math.pi )
+        return ( rng.gauss( 0.0, tolerances.holePositionIN / 3 ) + play * math.cos( angle ),
+                 rng.gauss( 0.0, tolerances.holePositionIN / 3 ) + play * math.sin( angle ) )
+
+    offsets = {}
+    for stage in stages:
+        for shaft in ( stage.shaft1, stage.shaft2 ):
+            if shaft not in offsets:
+                offsets[shaft] = [ offset() for i in range( samples ) ]
+
+    sampled = []
+    for stage in stages:
+        PD1, PD2, length = _stageNominal( stage )
+        ccError = []
+        slack = [] if stage.motion.wrapped else None
+        for ( dx1, dy1 ), ( dx2, dy2 ) in zip( offsets[stage.shaft1], offsets[stage.shaft2] ):
+            C = math.hypot( stage.x2 + dx2 - stage.x1 - dx1, stage.y2 + dy2 - stage.y1 - dy1 )
+            pd1 = PD1 + rng.gauss( 0.0, tolerances.pitchDiameterIN / 3 )
+            pd2 = PD2 + rng.gauss( 0.0, tolerances.pitchDiameterIN / 3 )
+            if slack is None:
+                ccError.append( C - ( pd1 + pd2 ) / 2 )
+                continue
+            loop = length * ( 1 + rng.gauss( 0.0, tolerances.loopLengthFraction / 3 ) )
+            beta = math.asin( abs( pd1 - pd2 ) / ( 2 * C ) )
+            s = loop - wrapLengthIN( C, pd1, pd2 )
+            slack.append( s )
+            ccError.append( -s / ( 2 * math.cos( beta ) ) )
+        sampled.append( ( ccError, slack ) )
+
+    return sampled
+
+def _distribution( values, confidence: float ) -> Distribution :
+    tail = ( 1 - confidence ) / 2
+    if np is not None and isinstance( values, np.ndarray ):
+        low, median, high = np.quantile( values, ( tail, 0.5, 1 - tail ) )
+        return Distribution( float( values.mean() ), float( values.std() ), float( values.min() ),
+                             float( low ), float( median ), float( high ), float( values.max() ) )
+
+    ordered = sorted( values )
+    count = len( ordered )
+    mean = sum( ordered ) / count
+    std = math.sqrt( sum( ( v - mean ) ** 2 for v in ordered ) / count )
+    return Distribution( mean, std, ordered[0], _quantile( ordered, tail ), _quantile( ordered, 0.5 ),
+                         _quantile( ordered, 1 - tail ), ordered[-1] )
+
+# Linear interpolation between the closest ranks, the same as NumPy's default
+def _quantile( ordered: list, q: float ) -> float :
+    position = q * ( len( ordered ) - 1 )
+    i = int( position )
+    if i + 1 >= len( ordered ):
+        return ordered[-1]
+    return ordered[i] + ( ordered[i + 1] - ordered[i] ) * ( position - i )
+
+def _fraction( ccError ) -> float :
+    if np is not None and isinstance( ccError, np.ndarray ):
+        return float( np.count_nonzero( ccError < 0 ) ) / len( ccError )
+    return sum( 1 for e in ccError if e < 0 ) / len( ccError )
+
+
+# Time a three stage gearbox, a belt and two gear stages
+def _benchmark( samples: int = DEFAULT_SAMPLES ) :
+    import os
+    import time
+    try:
+        from .motionCatalog import getMotionCatalog
+    except ImportError:
+        from motionCatalog import getMotionCatalog
+
+    catalog = getMotionCatalog( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'data', 'motionTypes.json' ) )
+    belt = catalog.named( 'HTD 5mm Belt' )
+    gears = catalog.named( 'Gears 20DP' )
+
+    def stage( key, shaft1, shaft2, x1, motion, N1, N2, teeth, extra ) :
+        cc = motion.ccDistanceIN( N1, N2, teeth ) + extra
+        return ToleranceStage( key, shaft1, shaft2, x1, 0.0, x1 + cc, 0.0, motion, N1, N2, teeth, extra )
+
+    stages = [ stage( 'belt', 'motor', 'a', 0.0, belt, 18, 36, 80, 0.0 ) ]
+    stages.append( stage( 'gear1', 'a', 'b', stages[-1].x2, gears, 14, 50, 0, 0.003 ) )
+    stages.append( stage( 'gear2', 'b', 'out', stages[-1].x2, gears, 18, 60, 0, 0.003 ) )
+
+    startTime = time.perf_counter()
+    results = analyzeTolerances( stages, samples=samples, seed=254 )
+    elapsed = time.perf_counter() - startTime
+    startTime = time.perf_counter()
+    sensitivity = toleranceSensitivity( stages, samples=samples, seed=254 )
+    sensitivityTime = time.perf_counter() - startTime
+
+    print( f'{len(stages)} stages x {samples} samples, NumPy {"available" if np is not None else "not available"}' )
+    print( f'  analysis    {elapsed*1000:8.1f}ms' )
+    print( f'  sensitivity {sensitivityTime*1000:8.1f}ms' )
+    for result, parts in zip( results, sensitivity ):
+        e = result.ccError
+        worst = max( parts, key=parts.get )
+        print( f'  {result.stage.key:6} C-C error {e.mean:+.4f} +/- {e.std:.4f}  [{e.low:+.4f}, {e.high:+.4f}]'
+               f'  {result.tooClose*100:5.1f}% too close, extra center {result.suggestedExtraCenterIN:.4f}'
+               f'  mostly {TOLERANCE_NAMES[worst]}' )
+
+if __name__ == '__main__':
+    _benchmark()
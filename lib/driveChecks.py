@@ -0,0 +1,120 @@
+# Engineering checks of every C-C Distance of a design.
+#
+# The Drive Checks command and the save hook pass in CCLineData and the
+# motion catalog.  python lib/driveChecks.py times a design of random drives.
+#
+# The C-C Distances are grouped by motion type and each check of a group is
+# one batch of its motion type, so a design with hundreds of C-C Distances is checked
+# in about a millisecond and the checks can run on every save.  The limits
+# come from the motion catalog:
+#
+#   Min Teeth       every gear, pulley and sprocket has at least minTeeth
+#   Teeth in Mesh   belt teeth wrapped on the smaller pulley, belts with too
+#                   few skip under load
+#   Wrap Angle      how far the belt or chain wraps the smaller wheel
+#   Contact Ratio   gear teeth in mesh on average at the C-C distance plus
+#                   the extra center
+
+import math
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# One failed check.  index is the position of the C-C Distance in the list
+# that was checked.
+DriveIssue = collections.namedtuple( 'DriveIssue', ( 'index', 'check', 'value', 'limit', 'message' ) )
+
+# The checks in the order issues are listed
+DRIVE_CHECKS = ( 'Min Teeth', 'Teeth in Mesh', 'Wrap Angle', 'Contact Ratio' )
+
+
+# Check a list of CCLineData (or anything with N1, N2, Teeth, ExtraCenterIN
+# and motion).  Returns the issues sorted by C-C Distance and check.
+def checkDrives( lineData: list, catalog ) -> list[DriveIssue] :
+    groups = collections.defaultdict( list )
+    for i, ld in enumerate( lineData ):
+        groups[ld.motion].append( i )
+
+    issues = []
+    for motionId, rows in groups.items():
+        motion = catalog[motionId]
+        N1 = [ lineData[i].N1 for i in rows ]
+        N2 = [ lineData[i].N2 for i in rows ]
+        teeth = [ lineData[i].Teeth for i in rows ]
+        extra = [ lineData[i].ExtraCenterIN for i in rows ]
+
+        cc, PD1, PD2, OD1, OD2 = motion.batchIN( N1, N2, teeth )
+        ccIN = _rows( lambda c, e: c + e, cc, extra )
+        smallest = _rows( lambda a, b: ( a + b - abs( a - b ) ) / 2, N1, N2 )
+
+        checks = []
+        if motion.minTeeth:
+            checks.append( ( 'Min Teeth', smallest, motion.minTeeth, '{:.0f}T is below the {}T minimum' ) )
+        wrap = motion.wrapAngleBatch( PD1, PD2, ccIN ) if motion.minWrapDeg or motion.minTeethInMesh else None
+        if wrap is not None and motion.minTeethInMesh:
+            inMesh = _rows( lambda w, n: w / ( 2 * math.pi ) * n, wrap, smallest )
+            checks.append( ( 'Teeth in Mesh', inMesh, motion.minTeethInMesh, '{:.1f} teeth in mesh, needs {}' ) )
+        if wrap is not None and motion.minWrapDeg:
+            wrapDeg = _rows( math.degrees if np is None else np.degrees, wrap )
+            checks.append( ( 'Wrap Angle', wrapDeg, motion.minWrapDeg, '{:.0f} deg of wrap, needs {}' ) )
+        ratio = motion.contactRatioBatch( N1, N2, ccIN ) if motion.minContactRatio else None
+        if ratio is not None:
+            checks.append( ( 'Contact Ratio', ratio, motion.minContactRatio, 'contact ratio {:.2f}, needs {}' ) )
+
+        for check, values, limit, message in checks:
+            for j in _below( values, limit ):
+                value = float( values[j] )
+                issues.append( DriveIssue( rows[j], check, value, limit, message.format( value, limit ) ) )
+
+    issues.sort( key=lambda issue: ( issue.index, DRIVE_CHECKS.index( issue.check ) ) )
+    return issues
+
+# Apply fn to whole columns with NumPy or to each row without it.  fn only
+# uses arithmetic so it works on both.
+def _rows( fn, *columns ) :
+    if np is not None:
+        return fn( *( np.asarray( c, dtype=float ) for c in columns ) )
+    return [ fn( *row ) for row in zip( *columns ) ]
+
+# Positions of the values under the limit.  NaN is a drive that can not be
+# built and is under any limit.
+def _below( values, limit ) -> list[int] :
+    if np is not None:
+        return np.nonzero( ~( np.asarray( values ) >= limit ) )[0].tolist()
+    return [ i for i, v in enumerate( values ) if not v >= limit ]
+
+
+# Time the checks of a design with many C-C Distances of every type
+def _benchmark( count: int = 10000 ) :
+    import os
+    import random
+    import time
+    try:
+        from .motionCatalog import getMotionCatalog
+    except ImportError:
+        from motionCatalog import getMotionCatalog
+
+    catalog = getMotionCatalog( os.path.join( os.path.dirname( os.path.abspath( __file__ ) ), 'data', 'motionTypes.json' ) )
+    LineData = collections.namedtuple( 'LineData', ( 'N1', 'N2', 'Teeth', 'ExtraCenterIN', 'motion' ) )
+
+    rng = random.Random( 254 )
+    lineData = []
+    for i in range( count ):
+        motion = rng.choice( catalog.types )
+        teeth = rng.randint( 40, 200 ) if motion.wrapped else 0
+        lineData.append( LineData( rng.randint( 8, 72 ), rng.randint( 8, 72 ), teeth, motion.defaultExtraCenterIN, motion.id ) )
+
+    startTime = time.perf_counter()
+    issues = checkDrives( lineData, catalog )
+    elapsed = time.perf_counter() - startTime
+
+    counts = collections.Counter( issue.check for issue in issues )
+    print( f'{count} C-C Distances, NumPy {"available" if np is not None else "not available"}' )
+    print( f'  {elapsed*1000:8.1f}ms  ({elapsed / count * 1e6:.2f}us each)' )
+    print( '  ' + ', '.join( f'{counts[check]} {check}' for check in DRIVE_CHECKS ) )
+
+if __name__ == '__main__':
+    _benchmark()
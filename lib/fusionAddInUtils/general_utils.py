@@ -11,6 +11,7 @@
 
 import os
 import traceback
+import contextlib
 import adsk.core
 import adsk.fusion
 
@@ -205,4 +206,19 @@ def inchValue( inches: float ) -> adsk.core.ValueInput :
     return adsk.core.ValueInput.createByReal( inches * 2.54 )
 
 def Value( number: float ) -> adsk.core.ValueInput :
-    return adsk.core.ValueInput.createByReal( number )
\ No newline at end of file
+    return adsk.core.ValueInput.createByReal( number )
+
+# Defer the solving of the sketches while a batch of edits is made so they are
+# only computed once at the end.
+@contextlib.contextmanager
+def computeDeferred( *sketches: adsk.fusion.Sketch ) :
+    deferred = []
+    for sketch in sketches:
+        if not sketch.isComputeDeferred:
+            sketch.isComputeDeferred = True
+            deferred.append( sketch )
+    try:
+        yield
+    finally:
+        for sketch in deferred:
+            sketch.isComputeDeferred = False
@@ -85,7 +85,7 @@ def sketchLineNormal( line: adsk.fusion.SketchLine, towardPt: adsk.core.Point3D
     
     towardUnitVec = twoPointUnitVector( toPoint2D(line.startSketchPoint.geometry), toPoint2D(towardPt) )
     angle = towardUnitVec.angleTo( normal )
-    if abs(angle) > math.pi:
+    if abs(angle) > math.pi / 2:
         normal = multVector2D( normal, -1.0 )
     return normal
 
@@ -0,0 +1,189 @@
+# Gear trains made of C-C stages that share shafts.
+#
+# This module does not import adsk.  Shafts and stages are any hashable key.
+# The Gearbox Planner gives each shaft an id shared by the CCLine end points
+# that are the same sketch point or sit on the same spot, and each CCLine
+# line a stage key, so the keys do not change with the entity tokens.
+#
+# The ratio of a shaft is the reduction from a motor shaft: the motor turns
+# ratio times for every turn of the shaft.  Gear stages reverse the direction,
+# belt stages do not.
+
+import collections
+
+
+class Stage:
+    __slots__ = ( 'key', 'shaft1', 'shaft2', 'N1', 'N2', 'reverses' )
+
+    def __init__( self, key, shaft1, shaft2, N1: int, N2: int, reverses: bool ):
+        self.key = key
+        self.shaft1 = shaft1
+        self.shaft2 = shaft2
+        self.N1 = N1
+        self.N2 = N2
+        self.reverses = reverses
+
+    # The shaft at the other end of the stage and the ratio from shaft to it
+    def across( self, shaft ) -> tuple :
+        if shaft == self.shaft1:
+            return self.shaft2, self.N2 / self.N1
+        return self.shaft1, self.N1 / self.N2
+
+    def __repr__( self ):
+        return f'Stage({self.key!r}, {self.shaft1!r}:{self.N1}T -> {self.shaft2!r}:{self.N2}T)'
+
+
+# How a motor drives a shaft
+class Drive:
+    __slots__ = ( 'ratio', 'direction', 'stage', 'depth' )
+
+    def __init__( self, ratio: float, direction: int, stage, depth: int ):
+        self.ratio = ratio          # Motor turns per shaft turn
+        self.direction = direction  # 1 same as the motor, -1 reversed
+        self.stage = stage          # Key of the stage that drives the shaft, None for the motor
+        self.depth = depth          # Number of stages from the motor
+
+    def __eq__( self, other ):
+        return isinstance( other, Drive ) and ( self.ratio, self.direction, self.stage, self.depth ) == \
+            ( other.ratio, other.direction, other.stage, other.depth )
+
+    def __repr__( self ):
+        return f'Drive({self.ratio:.4g}:1, {"+" if self.direction > 0 else "-"}, depth {self.depth})'
+
+
+class GearTrain:
+
+    def __init__( self ):
+        self.stages: dict = {}
+        self.shaftStages = collections.defaultdict( set )
+        self.motors: list = []
+
+        # motor -> shaft -> Drive, a tree of the shafts each motor reaches
+        self.drives: dict = {}
+
+        # The shafts whose drives changed since the last takeChanges()
+        self.changed: set = set()
+
+    # Add or change a stage.  Only the shafts downstream of the stage are recomputed.
+    def setStage( self, stage: Stage ) :
+        old = self.stages.get( stage.key )
+        if old and ( old.shaft1, old.shaft2 ) != ( stage.shaft1, stage.shaft2 ):
+            # Moved to different shafts, that changes the shape of the train
+            self.removeStage( stage.key )
+            old = None
+
+        self.stages[stage.key] = stage
+        self.shaftStages[stage.shaft1].add( stage.key )
+        self.shaftStages[stage.shaft2].add( stage.key )
+
+        for motor, tree in self.drives.items():
+            # Only the shaft the stage drives and the ones after it can change
+            for shaft in ( stage.shaft1, stage.shaft2 ):
+                other = stage.across( shaft )[0]
+                drive = tree.get( other )
+                if shaft in tree and ( drive is None or drive.stage == stage.key ):
+                    self._propagate( tree, shaft, stage.key )
+                    break
+
+    def removeStage( self, key ) :
+        stage = self.stages.pop( key, None )
+        if not stage:
+            return
+        for shaft in ( stage.shaft1, stage.shaft2 ):
+            self.shaftStages[shaft].discard( key )
+            if not self.shaftStages[shaft]:
+                del self.shaftStages[shaft]
+
+        # The shafts it drove may still be reached some other way
+        for motor, tree in self.drives.items():
+            if any( drive.stage == key for drive in tree.values() ):
+                self._rebuild( motor )
+
+    def setMotors( self, motors: list ) :
+        self.motors = list( motors )
+        for motor in list( self.drives ):
+            if motor not in self.motors:
+                self.changed.update( self.drives.pop( motor ) )
+        for motor in self.motors:
+            if motor not in self.drives:
+                self._rebuild( motor )
+
+    def clear( self ) :
+        for tree in self.drives.values():
+            self.changed.update( tree )
+        self.stages = {}
+        self.shaftStages = collections.defaultdict( set )
+        self.drives = { motor: {} for motor in self.motors }
+        for motor in self.motors:
+            self._rebuild( motor )
+
+    # Shafts that are only at one end of a stage and are not motors
+    def outputs( self ) -> list :
+        return [ shaft for shaft, keys in self.shaftStages.items() if len( keys ) == 1 and shaft not in self.motors ]
+
+    # The shafts whose drives changed since the last call
+    def takeChanges( self ) -> set :
+        changed = self.changed
+        self.changed = set()
+        return changed
+
+    # Find every shaft a motor reaches from scratch
+    def _rebuild( self, motor ) :
+        old = self.drives.get( motor, {} )
+        tree = { motor: Drive( 1.0, 1, None, 0 ) }
+        self.drives[motor] = tree
+        self._propagate( tree, motor, track=False )
+        self.changed.update( shaft for shaft in set( old ) | set( tree ) if old.get( shaft ) != tree.get( shaft ) )
+
+    # Recompute the drives downstream of shaft, breadth first.  When onlyStage
+    # is given only that stage is followed out of shaft.  Shafts keep the stage
+    # that first reached them, and a shaft whose drive did not change ends
+    # the walk down that branch.
+    def _propagate( self, tree: dict, shaft, onlyStage=None, track: bool = True ) :
+        queue = collections.deque( [ ( shaft, onlyStage ) ] )
+        while queue:
+            shaft, onlyStage = queue.popleft()
+            drive = tree[shaft]
+            for key in ( onlyStage, ) if onlyStage is not None else self.shaftStages.get( shaft, () ):
+                if key == drive.stage:
+                    # The stage that drives shaft
+                    continue
+                stage = self.stages[key]
+                other, ratio = stage.across( shaft )
+                current = tree.get( other )
+                if current and current.stage != key:
+                    # Driven by another stage or the motor itself
+                    continue
+                newDrive = Drive( drive.ratio * ratio, -drive.direction if stage.reverses else drive.direction,
+                                  key, drive.depth + 1 )
+                if newDrive == current:
+                    continue
+                if track:
+                    self.changed.add( other )
+                tree[other] = newDrive
+                queue.append( ( other, None ) )
+
+
+# Time an update of one stage of a long train against a full rebuild
+def _benchmark( count: int = 200 ) :
+    import time
+
+    train = GearTrain()
+    for i in range( count ):
+        train.setStage( Stage( i, i, i + 1, 12 + i % 5, 36 + i % 7, i % 2 == 0 ) )
+    train.setMotors( [ 0 ] )
+    train.takeChanges()
+
+    startTime = time.perf_counter()
+    train.setStage( Stage( count - 5, count - 5, count - 4, 14, 40, False ) )
+    update = time.perf_counter() - startTime
+    changed = train.takeChanges()
+
+    startTime = time.perf_counter()
+    train._rebuild( 0 )
+    rebuild = time.perf_counter() - startTime
+
+    print( f'{count} stages: update {update*1e6:.0f}us ({len(changed)} shafts), rebuild {rebuild*1e6:.0f}us' )
+
+if __name__ == '__main__':
+    _benchmark()
@@ -0,0 +1,297 @@
+# Catalog of the motion types a C-C Distance can use.
+#
+# This module does not import adsk.  The motion types are read once from a
+# JSON file (lib/data/motionTypes.json) and each one becomes an object with
+# its constants worked out up front, so the tools look a type up by id and
+# call it instead of branching on the kind of motion.
+#
+# The id of a type is what is saved in a C-C Distance.  Ids are never reused,
+# so types can be added to or reordered in the file without changing the
+# designs that use them.  The order of the file is the order of the dialogs.
+
+import json
+import math
+
+try:
+    from . import motionMath
+    from . import ccSearch
+except ImportError:
+    import motionMath
+    import ccSearch
+
+
+# The defaults are those of a plain toothed wheel on a circular pitch, with
+# the wheels in contact.  Each kind replaces what differs.
+class MotionType:
+    kind = None
+    circularPitchIN = 0.0   # Along the pitch circle from one tooth to the next
+    wrapped = False         # Uses a belt or chain with a number of teeth or links
+    reverses = False        # The driven shaft turns the other way
+    teethSuffix = 'T'       # Suffix of the belt teeth or chain links in labels
+    defaultExtraCenterIN = 0.0
+    loopPart = None         # Bill of materials names of the belt or chain,
+    wheelPart = None        #  each pulley, sprocket or gear
+    pairPart = None         #  and the pair of gears
+
+    # Design limits of the drive checks, any of them can be given in the file
+    minTeeth = 0            # Smallest gear, pulley or sprocket
+    minTeethInMesh = 0      # Belt teeth on the smaller pulley
+    minWrapDeg = 0          # Belt or chain wrap of the smaller wheel
+    minContactRatio = 0     # Gear teeth in mesh on average
+
+    def __init__( self, spec: dict ):
+        self.id = int( spec['id'] )
+        self.name = str( spec['name'] )
+        self.label = str( spec.get( 'label', self.name ) )
+        for limit in ( 'minTeeth', 'minTeethInMesh', 'minWrapDeg', 'minContactRatio' ):
+            setattr( self, limit, spec.get( limit, getattr( self, limit ) ) )
+
+    def pitchDiameterIN( self, NT: int ) -> float :
+        return NT * self.circularPitchIN / math.pi
+
+    def outerDiameterIN( self, NT: int ) -> float :
+        return self.pitchDiameterIN( NT )
+
+    def ccDistanceIN( self, N1: int, N2: int, teeth: int ) -> float :
+        return ( self.pitchDiameterIN( N1 ) + self.pitchDiameterIN( N2 ) ) / 2
+
+    # The pitch length of a belt or chain, 0 for gears
+    def loopLengthIN( self, teeth: int ) -> float :
+        return 0.0
+
+    # motionMath batch of ( ccDist, PD1, PD2, OD1, OD2 ) for lists of cogs and
+    # teeth.  By default a row at a time, NaN where the C-C can not be solved.
+    def batchIN( self, N1, N2, teeth ) :
+        cc = []
+        for a, b, t in zip( N1, N2, teeth ):
+            try:
+                cc.append( self.ccDistanceIN( a, b, t ) )
+            except ValueError:
+                cc.append( math.nan )
+        return ( cc, [ self.pitchDiameterIN( a ) for a in N1 ], [ self.pitchDiameterIN( b ) for b in N2 ],
+                 [ self.outerDiameterIN( a ) for a in N1 ], [ self.outerDiameterIN( b ) for b in N2 ] )
+
+    # Belt or chain wrap angles of the smaller wheel in radians at C-C
+    # distances, None when nothing wraps around the wheels
+    def wrapAngleBatch( self, PD1, PD2, ccIN ) :
+        if not self.wrapped:
+            return None
+        return motionMath.WrapAngleBatch( PD1, PD2, ccIN )
+
+    # Gear contact ratios at C-C distances, None when the teeth don't mesh
+    def contactRatioBatch( self, N1, N2, ccIN ) :
+        return None
+
+    # Fill in the calculated values of a CCLineData
+    def calcLineData( self, ld ) :
+        if not self.wrapped:
+            ld.Teeth = 0
+        ld.ccDistIN = self.ccDistanceIN( ld.N1, ld.N2, ld.Teeth )
+        ld.PD1 = self.pitchDiameterIN( ld.N1 )
+        ld.PD2 = self.pitchDiameterIN( ld.N2 )
+        ld.OD1 = self.outerDiameterIN( ld.N1 )
+        ld.OD2 = self.outerDiameterIN( ld.N2 )
+
+    def labelString( self, N1: int, N2: int, teeth: int ) -> str :
+        return f'{teeth}{self.teethSuffix} {self.label} ({N1}Tx{N2}T)'
+
+    # The ccSearch search for this type, on a grid when gridIN is not 0.  A
+    # kind without a search finds nothing.
+    def search( self, ratioMin: float, ratioMax: float, ccMinIN: float, ccMaxIN: float,
+                cogRange: tuple, teethRange: tuple, gridIN: float = 0, extraMinIN: float = 0, extraMaxIN: float = 0 ) -> list :
+        return []
+
+    def __repr__( self ):
+        return f'{type(self).__name__}({self.id}, {self.name!r})'
+
+
+class GearType( MotionType ):
+    kind = 'gear'
+    reverses = True
+    teethSuffix = ''
+    defaultExtraCenterIN = 0.003   # A little backlash
+    wheelPart = 'Gear'
+    pairPart = 'Gear Pair'
+    minTeeth = 12
+    minContactRatio = 1.2
+
+    def __init__( self, spec: dict ):
+        super().__init__( spec )
+        if 'dp' in spec:
+            self.dp = spec['dp']
+        else:
+            self.dp = 25.4 / spec['moduleMM']
+        self.circularPitchIN = math.pi / self.dp
+
+    def pitchDiameterIN( self, NT: int ) -> float :
+        return motionMath.GearsPitchDiameterIN( NT, self.dp )
+
+    def outerDiameterIN( self, NT: int ) -> float :
+        return motionMath.GearsOuterDiameterIN( NT, self.dp )
+
+    def ccDistanceIN( self, N1: int, N2: int, teeth: int ) -> float :
+        return motionMath.GearsCCDistanceIN( N1, N2, self.dp )
+
+    def batchIN( self, N1, N2, teeth ) :
+        return motionMath.GearsBatchIN( N1, N2, self.dp )
+
+    def contactRatioBatch( self, N1, N2, ccIN ) :
+        return motionMath.GearsContactRatioBatch( N1, N2, self.dp, ccIN )
+
+    def labelString( self, N1: int, N2: int, teeth: int ) -> str :
+        return f'{self.label} ({N1}T+{N2}T)'
+
+    def search( self, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, gridIN=0, extraMinIN=0, extraMaxIN=0 ) :
+        if gridIN:
+            return ccSearch.searchGridGears( self.dp, gridIN, extraMinIN, extraMaxIN, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange )
+        return ccSearch.searchGears( self.dp, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange )
+
+
+class BeltType( MotionType ):
+    kind = 'belt'
+    wrapped = True
+    loopPart = 'Belt'
+    wheelPart = 'Pulley'
+    minTeeth = 12
+    minTeethInMesh = 6
+
+    def __init__( self, spec: dict ):
+        super().__init__( spec )
+        self.pitchMM = spec['pitchMM']
+        self.pitchCM = self.pitchMM / 10
+        self.circularPitchIN = self.pitchMM / 25.4
+        self.thicknessMM = spec['thicknessMM']
+        self.thicknessCM = self.thicknessMM / 10
+        self.partName = str( spec.get( 'partName', self.label.replace( ' ', '_' ) ) )
+        # Belts without a profile have C-C Distances but can't be drawn
+        self.hasProfile = 'profile' in spec
+        if self.hasProfile:
+            self.profile = str( spec['profile'] )
+            self.tooth = dict( spec['tooth'] )         # Belt tooth profile in cm
+            self.pulley = dict( spec['pulley'] )       # Pulley tooth profile in mm
+        else:
+            self.profile = self.tooth = self.pulley = None
+
+    def pitchDiameterIN( self, NT: int ) -> float :
+        return motionMath.BeltPitchDiameterIN( NT, self.pitchMM )
+
+    def outerDiameterIN( self, NT: int ) -> float :
+        return motionMath.BeltOuterDiameterIN( NT, self.pitchMM )
+
+    def ccDistanceIN( self, N1: int, N2: int, teeth: int ) -> float :
+        return motionMath.BeltCCDistanceIN( N1, N2, teeth, self.pitchMM )
+
+    def loopLengthIN( self, teeth: int ) -> float :
+        return teeth * self.pitchMM / 25.4
+
+    def batchIN( self, N1, N2, teeth ) :
+        return motionMath.BeltBatchIN( N1, N2, teeth, self.pitchMM )
+
+    def search( self, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, gridIN=0, extraMinIN=0, extraMaxIN=0 ) :
+        if gridIN:
+            return ccSearch.searchGridBelts( self.pitchMM, gridIN, extraMinIN, extraMaxIN,
+                                             ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange )
+        return ccSearch.searchBelts( self.pitchMM, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange )
+
+
+class ChainType( MotionType ):
+    kind = 'chain'
+    wrapped = True
+    teethSuffix = 'L'
+    loopPart = 'Chain'
+    wheelPart = 'Sprocket'
+    minTeeth = 9
+    minWrapDeg = 120
+
+    def __init__( self, spec: dict ):
+        super().__init__( spec )
+        self.pitchIN = spec['pitchIN']
+        self.circularPitchIN = self.pitchIN
+
+    def pitchDiameterIN( self, NT: int ) -> float :
+        return motionMath.ChainPitchDiameterIN( NT, self.pitchIN )
+
+    def outerDiameterIN( self, NT: int ) -> float :
+        return motionMath.ChainOuterDiameterIN( NT, self.pitchIN )
+
+    def ccDistanceIN( self, N1: int, N2: int, teeth: int ) -> float :
+        return motionMath.ChainCCDistanceIN( N1, N2, teeth, self.pitchIN )
+
+    def loopLengthIN( self, teeth: int ) -> float :
+        return teeth * self.pitchIN
+
+    def batchIN( self, N1, N2, teeth ) :
+        return motionMath.ChainBatchIN( N1, N2, teeth, self.pitchIN )
+
+    def search( self, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange, gridIN=0, extraMinIN=0, extraMaxIN=0 ) :
+        if gridIN:
+            return ccSearch.searchGridChains( self.pitchIN, gridIN, extraMinIN, extraMaxIN,
+                                              ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange )
+        return ccSearch.searchChains( self.pitchIN, ratioMin, ratioMax, ccMinIN, ccMaxIN, cogRange, teethRange )
+
+
+# The class of each kind in the catalog file
+MOTION_KINDS = { cls.kind: cls for cls in ( GearType, BeltType, ChainType ) }
+
+
+class MotionCatalog:
+
+    def __init__( self, specs: list ):
+        self.types = []     # In dialog order
+        self.byId = {}
+        self.byName = {}
+        for spec in specs:
+            try:
+                motionType = MOTION_KINDS[spec['kind']]( spec )
+            except KeyError as err:
+                raise ValueError( f'Motion type {spec.get( "name", spec )} is missing or has a bad {err}' ) from None
+            if motionType.id in self.byId:
+                raise ValueError( f'Motion type id {motionType.id} is used twice' )
+            if motionType.name.lower() in self.byName:
+                raise ValueError( f'Motion type "{motionType.name}" is listed twice' )
+            self.byId[motionType.id] = motionType
+            self.byName[motionType.name.lower()] = motionType
+            self.types.append( motionType )
+
+        self.names = tuple( t.name for t in self.types )
+        self._positions = { t.id: i for i, t in enumerate( self.types ) }
+
+    def __getitem__( self, id: int ) -> MotionType :
+        return self.byId[id]
+
+    def __contains__( self, id: int ) -> bool :
+        return id in self.byId
+
+    def __iter__( self ):
+        return iter( self.types )
+
+    def __len__( self ):
+        return len( self.types )
+
+    # Dialog list position of a type id and back
+    def position( self, id: int ) -> int :
+        return self._positions[id]
+
+    def atPosition( self, index: int ) -> MotionType :
+        return self.types[index]
+
+    # Look a type up by its name, not case sensitive
+    def named( self, name: str ) -> MotionType :
+        return self.byName[name.strip().lower()]
+
+    def ofKind( self, kind: str ) -> list :
+        return [ t for t in self.types if t.kind == kind ]
+
+
+# The loaded catalog files, by file name
+_catalogCache = {}
+
+# Load a catalog file once.  Unlike the belt stock this file is required, so a
+# missing or bad file raises.
+def getMotionCatalog( filename: str ) -> MotionCatalog :
+    catalog = _catalogCache.get( filename )
+    if catalog is None:
+        with open( filename ) as f:
+            catalog = MotionCatalog( json.load( f )['motionTypes'] )
+        _catalogCache[filename] = catalog
+    return catalog
@@ -0,0 +1,327 @@
+# Center-to-center math for gears, timing belts and roller chain.
+#
+# The C-C Distance dialog, the drive checks and the ratio search all share
+# these functions, so they live outside the adsk command code.  Running
+# python lib/motionMath.py compares the scalar and batch results and times
+# them.
+#
+# All distances are in inches.  The batch functions take lists or NumPy
+# arrays and return NumPy arrays when NumPy is available, lists otherwise.
+# They do the same floating point operations in the same order as the
+# scalar functions so both give exactly the same results, except the wrap
+# angle where NumPy's arcsin can differ from math.asin in the last bit.
+
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# A gear OD is its pitch diameter plus two addendums of one module (1 / dp)
+GEAR_ADDENDUMS = 2
+
+# Gear teeth are 20 degree pressure angle
+GEAR_PRESSURE_ANGLE = math.radians( 20 )
+
+# Approximation of the OD of the flanges on the pulleys over the pitch diameter
+BELT_OD_EXTRA_IN = 0.15
+
+# The chain C-C Newton solver stops when a step of the wrap angle is this
+# small (radians) or after this many steps.  It usually takes 3 to 5.
+CHAIN_PHI_TOLERANCE = 1e-14
+CHAIN_MAX_STEPS = 30
+
+
+def GearsCCDistanceIN( N1: int, N2: int, dp: int ) -> float:
+    pitch_diameter1 = N1 / (1.0 * dp)
+    pitch_diameter2 = N2 / (1.0 * dp)
+
+    return (pitch_diameter1 + pitch_diameter2) / 2
+
+def GearsPitchDiameterIN( NT: int, dp: int ) -> float:
+    return NT / (1.0 * dp)
+
+def GearsOuterDiameterIN( NT: int, dp: int ) -> float:
+    return NT / (1.0 * dp) + GEAR_ADDENDUMS / (1.0 * dp)
+
+def BeltCCDistanceIN( N1: int, N2: int, beltTeeth: int, pitchMM: int ) -> float:
+    PL = beltTeeth * pitchMM / 25.4 # in inches
+    if N1 > N2:
+        PD1 = BeltPitchDiameterIN( N1, pitchMM )
+        PD2 = BeltPitchDiameterIN( N2, pitchMM )
+    else:
+        PD1 = BeltPitchDiameterIN( N2, pitchMM )
+        PD2 = BeltPitchDiameterIN( N1, pitchMM )
+
+    b = 2 * PL - math.pi * ( PD1 + PD2 )
+    fourAC = 8 * (PD1 - PD2)*(PD1 - PD2)
+
+    return ( b + math.sqrt( b*b - fourAC) ) / 8
+
+def BeltPitchDiameterIN( NT: int, pitchMM: int ) -> float:
+    return NT * pitchMM / ( 25.4 * math.pi )
+
+def BeltOuterDiameterIN( NT: int, pitchMM: int ) -> float:
+    return BeltPitchDiameterIN(NT, pitchMM) + BELT_OD_EXTRA_IN
+
+
+def ChainPitchDiameterIN( NT: int, pitchIN: float ) -> float:
+    return pitchIN / math.sin( math.pi / NT )
+
+def ChainOuterDiameterIN( NT: int, pitchIN: float ) -> float:
+    return pitchIN * ( 0.6 + math.cos( math.pi / NT ) / math.sin( math.pi / NT ) )
+
+# Chain C-C distance for a number of links, from the exact length of the chain
+# wrapped around the pitch circles.  With phi the angle of the straight runs,
+# D1 the bigger sprocket and d = D1 - D2:
+#   C = d / (2 sin(phi))
+#   L = d cot(phi) + pi (D1 + D2) / 2 + d phi
+# L(phi) falls and curves up, so Newton's method started below the answer
+# climbs to it without overshooting.  The closed form start
+#   phi0 = d / sqrt(4H^2 + d^2),  H = (L - pi (D1 + D2) / 2) / 2
+# is always below the answer because C cos(phi) <= H.
+# Only sqrt, sin and cos are used so the batch version gives the same bits.
+def ChainCCDistanceIN( N1: int, N2: int, links: int, pitchIN: float ) -> float:
+    if N1 > N2:
+        PD1 = ChainPitchDiameterIN( N1, pitchIN )
+        PD2 = ChainPitchDiameterIN( N2, pitchIN )
+    else:
+        PD1 = ChainPitchDiameterIN( N2, pitchIN )
+        PD2 = ChainPitchDiameterIN( N1, pitchIN )
+    diff = PD1 - PD2
+    length = links * pitchIN
+
+    if length <= math.pi * PD1:
+        raise ValueError( f'{links} links is too short to go around {max( N1, N2 )}T' )
+
+    H = ( length - math.pi * ( PD1 + PD2 ) / 2 ) / 2
+    if diff == 0:
+        return H
+
+    phi = diff / math.sqrt( 4 * H*H + diff*diff )
+    for i in range( CHAIN_MAX_STEPS ):
+        sinPhi = math.sin( phi )
+        cosPhi = math.cos( phi )
+        cot = cosPhi / sinPhi
+        step = ( diff * cot + diff * phi - 2 * H ) / ( diff * cot * cot )
+        phi = phi + step
+        if abs( step ) <= CHAIN_PHI_TOLERANCE:
+            break
+
+    return diff / ( 2 * math.sin( phi ) )
+
+
+# The angle a belt or chain wraps the smaller of two pitch circles (radians)
+def WrapAngle( PD1: float, PD2: float, ccIN: float ) -> float:
+    return math.pi - 2 * math.asin( abs( PD1 - PD2 ) / ( 2 * ccIN ) )
+
+# Contact ratio of a gear pair, the teeth in mesh on average.  An extra
+# center opens the working pressure angle and shortens the line of action.
+def GearsContactRatio( N1: int, N2: int, dp: int, ccIN: float ) -> float:
+    rb1 = N1 / (2.0 * dp) * math.cos( GEAR_PRESSURE_ANGLE )
+    rb2 = N2 / (2.0 * dp) * math.cos( GEAR_PRESSURE_ANGLE )
+    ra1 = N1 / (2.0 * dp) + GEAR_ADDENDUMS / (2.0 * dp)
+    ra2 = N2 / (2.0 * dp) + GEAR_ADDENDUMS / (2.0 * dp)
+    cosWorking = ( rb1 + rb2 ) / ccIN
+    if cosWorking > 1:
+        raise ValueError( f'{N1}T and {N2}T gears can not be {ccIN:.4f}in apart' )
+    action = math.sqrt( ra1*ra1 - rb1*rb1 ) + math.sqrt( ra2*ra2 - rb2*rb2 ) - ccIN * math.sqrt( 1 - cosWorking*cosWorking )
+    return action / ( math.pi * math.cos( GEAR_PRESSURE_ANGLE ) / dp )
+
+
+# Batch versions.  Each returns (ccDist, PD1, PD2, OD1, OD2) for every row.
+# Arguments may be single values or sequences of the same length.
+
+def GearsBatchIN( N1, N2, dp ) :
+    if np is None:
+        N1, N2, dp = _broadcast( N1, N2, dp )
+        cc = [ GearsCCDistanceIN( a, b, p ) for a, b, p in zip( N1, N2, dp ) ]
+        pd1 = [ GearsPitchDiameterIN( a, p ) for a, p in zip( N1, dp ) ]
+        pd2 = [ GearsPitchDiameterIN( b, p ) for b, p in zip( N2, dp ) ]
+        od1 = [ GearsOuterDiameterIN( a, p ) for a, p in zip( N1, dp ) ]
+        od2 = [ GearsOuterDiameterIN( b, p ) for b, p in zip( N2, dp ) ]
+        return cc, pd1, pd2, od1, od2
+
+    N1, N2, dp = np.broadcast_arrays( *( np.asarray( x, dtype=float ) for x in ( N1, N2, dp ) ) )
+    pd1 = N1 / (1.0 * dp)
+    pd2 = N2 / (1.0 * dp)
+    cc = (pd1 + pd2) / 2
+
+    return cc, pd1, pd2, pd1 + GEAR_ADDENDUMS / (1.0 * dp), pd2 + GEAR_ADDENDUMS / (1.0 * dp)
+
+def BeltBatchIN( N1, N2, beltTeeth, pitchMM ) :
+    if np is None:
+        N1, N2, beltTeeth, pitchMM = _broadcast( N1, N2, beltTeeth, pitchMM )
+        cc = [ _beltOrNaN( a, b, t, p ) for a, b, t, p in zip( N1, N2, beltTeeth, pitchMM ) ]
+        pd1 = [ BeltPitchDiameterIN( a, p ) for a, p in zip( N1, pitchMM ) ]
+        pd2 = [ BeltPitchDiameterIN( b, p ) for b, p in zip( N2, pitchMM ) ]
+        od1 = [ BeltOuterDiameterIN( a, p ) for a, p in zip( N1, pitchMM ) ]
+        od2 = [ BeltOuterDiameterIN( b, p ) for b, p in zip( N2, pitchMM ) ]
+        return cc, pd1, pd2, od1, od2
+
+    N1, N2, beltTeeth, pitchMM = np.broadcast_arrays(
+        *( np.asarray( x, dtype=float ) for x in ( N1, N2, beltTeeth, pitchMM ) ) )
+    PL = beltTeeth * pitchMM / 25.4
+    pd1 = N1 * pitchMM / ( 25.4 * math.pi )
+    pd2 = N2 * pitchMM / ( 25.4 * math.pi )
+    big = np.where( N1 > N2, pd1, pd2 )
+    small = np.where( N1 > N2, pd2, pd1 )
+
+    b = 2 * PL - math.pi * ( big + small )
+    fourAC = 8 * (big - small)*(big - small)
+    with np.errstate( invalid='ignore' ):
+        cc = ( b + np.sqrt( b*b - fourAC ) ) / 8
+
+    return cc, pd1, pd2, pd1 + BELT_OD_EXTRA_IN, pd2 + BELT_OD_EXTRA_IN
+
+def ChainBatchIN( N1, N2, links, pitchIN ) :
+    if np is None:
+        N1, N2, links, pitchIN = _broadcast( N1, N2, links, pitchIN )
+        cc = [ _chainOrNaN( a, b, l, p ) for a, b, l, p in zip( N1, N2, links, pitchIN ) ]
+        pd1 = [ ChainPitchDiameterIN( a, p ) for a, p in zip( N1, pitchIN ) ]
+        pd2 = [ ChainPitchDiameterIN( b, p ) for b, p in zip( N2, pitchIN ) ]
+        od1 = [ ChainOuterDiameterIN( a, p ) for a, p in zip( N1, pitchIN ) ]
+        od2 = [ ChainOuterDiameterIN( b, p ) for b, p in zip( N2, pitchIN ) ]
+        return cc, pd1, pd2, od1, od2
+
+    N1, N2, links, pitchIN = np.broadcast_arrays(
+        *( np.asarray( x, dtype=float ) for x in ( N1, N2, links, pitchIN ) ) )
+    pd1 = pitchIN / np.sin( math.pi / N1 )
+    pd2 = pitchIN / np.sin( math.pi / N2 )
+    od1 = pitchIN * ( 0.6 + np.cos( math.pi / N1 ) / np.sin( math.pi / N1 ) )
+    od2 = pitchIN * ( 0.6 + np.cos( math.pi / N2 ) / np.sin( math.pi / N2 ) )
+    big = np.where( N1 > N2, pd1, pd2 )
+    small = np.where( N1 > N2, pd2, pd1 )
+    diff = big - small
+    length = links * pitchIN
+
+    H = ( length - math.pi * ( big + small ) / 2 ) / 2
+    phi = diff / np.sqrt( 4 * H*H + diff*diff )
+
+    # Newton steps on the rows that have not converged yet, the same steps
+    # the scalar solver takes for each row
+    active = ( diff != 0 ) & ( length > math.pi * big )
+    for i in range( CHAIN_MAX_STEPS ):
+        if not active.any():
+            break
+        pa = phi[active]
+        da = diff[active]
+        cot = np.cos( pa ) / np.sin( pa )
+        step = ( da * cot + da * pa - 2 * H[active] ) / ( da * cot * cot )
+        phi[active] = pa + step
+        active[active] = np.abs( step ) > CHAIN_PHI_TOLERANCE
+
+    with np.errstate( invalid='ignore', divide='ignore' ):
+        cc = np.where( diff == 0, H, diff / ( 2 * np.sin( phi ) ) )
+    cc[ length <= math.pi * big ] = np.nan
+
+    return cc, pd1, pd2, od1, od2
+
+# The wrap angle of the smaller wheel of every row
+def WrapAngleBatch( PD1, PD2, ccIN ) :
+    if np is None:
+        PD1, PD2, ccIN = _broadcast( PD1, PD2, ccIN )
+        return [ _wrapOrNaN( a, b, c ) for a, b, c in zip( PD1, PD2, ccIN ) ]
+
+    PD1, PD2, ccIN = ( np.asarray( x, dtype=float ) for x in ( PD1, PD2, ccIN ) )
+    with np.errstate( invalid='ignore' ):
+        return math.pi - 2 * np.arcsin( np.abs( PD1 - PD2 ) / ( 2 * ccIN ) )
+
+# The contact ratio of every row, NaN where the gears can not mesh
+def GearsContactRatioBatch( N1, N2, dp, ccIN ) :
+    if np is None:
+        N1, N2, dp, ccIN = _broadcast( N1, N2, dp, ccIN )
+        return [ _contactRatioOrNaN( a, b, p, c ) for a, b, p, c in zip( N1, N2, dp, ccIN ) ]
+
+    N1, N2, dp, ccIN = np.broadcast_arrays( *( np.asarray( x, dtype=float ) for x in ( N1, N2, dp, ccIN ) ) )
+    rb1 = N1 / (2.0 * dp) * math.cos( GEAR_PRESSURE_ANGLE )
+    rb2 = N2 / (2.0 * dp) * math.cos( GEAR_PRESSURE_ANGLE )
+    ra1 = N1 / (2.0 * dp) + GEAR_ADDENDUMS / (2.0 * dp)
+    ra2 = N2 / (2.0 * dp) + GEAR_ADDENDUMS / (2.0 * dp)
+    cosWorking = ( rb1 + rb2 ) / ccIN
+    with np.errstate( invalid='ignore' ):
+        action = np.sqrt( ra1*ra1 - rb1*rb1 ) + np.sqrt( ra2*ra2 - rb2*rb2 ) - ccIN * np.sqrt( 1 - cosWorking*cosWorking )
+    return action / ( math.pi * math.cos( GEAR_PRESSURE_ANGLE ) / dp )
+
+# Repeat single values so every argument is a list of the same length
+def _broadcast( *args ) :
+    lists = [ list( a ) if isinstance( a, (list, tuple, range) ) else None for a in args ]
+    count = max( ( len( a ) for a in lists if a is not None ), default=1 )
+    return [ a if a is not None else [ args[i] ] * count for i, a in enumerate( lists ) ]
+
+
+# The batch versions give NaN where the scalar ones raise, like NumPy does
+def _beltOrNaN( N1, N2, beltTeeth, pitchMM ) :
+    try:
+        return BeltCCDistanceIN( N1, N2, beltTeeth, pitchMM )
+    except ValueError:
+        return math.nan
+
+def _wrapOrNaN( PD1, PD2, ccIN ) :
+    try:
+        return WrapAngle( PD1, PD2, ccIN )
+    except ( ValueError, ZeroDivisionError ):
+        return math.nan
+
+def _chainOrNaN( N1, N2, links, pitchIN ) :
+    try:
+        return ChainCCDistanceIN( N1, N2, links, pitchIN )
+    except ValueError:
+        return math.nan
+
+def _contactRatioOrNaN( N1, N2, dp, ccIN ) :
+    try:
+        return GearsContactRatio( N1, N2, dp, ccIN )
+    except ValueError:
+        return math.nan
+
+# Compare the scalar and batch functions and time them
+def _benchmark( count: int = 100000 ) :
+    import random
+    import time
+
+    rng = random.Random( 254 )
+    N1 = [ rng.randint( 12, 60 ) for i in range( count ) ]
+    N2 = [ rng.randint( 12, 60 ) for i in range( count ) ]
+    teeth = [ rng.randint( 80, 300 ) for i in range( count ) ]
+    pitch = [ rng.choice( (3, 5) ) for i in range( count ) ]
+
+    startTime = time.perf_counter()
+    scalar = [ ( BeltCCDistanceIN( a, b, t, p ), BeltPitchDiameterIN( a, p ), BeltPitchDiameterIN( b, p ),
+                 BeltOuterDiameterIN( a, p ), BeltOuterDiameterIN( b, p ) )
+               for a, b, t, p in zip( N1, N2, teeth, pitch ) ]
+    scalarTime = time.perf_counter() - startTime
+
+    startTime = time.perf_counter()
+    batch = BeltBatchIN( N1, N2, teeth, pitch )
+    batchTime = time.perf_counter() - startTime
+
+    mismatches = sum( 1 for i, row in enumerate( scalar ) for j in range( 5 ) if row[j] != batch[j][i] )
+
+    links = [ rng.randint( 60, 200 ) for i in range( count ) ]
+    startTime = time.perf_counter()
+    scalarChain = [ _chainOrNaN( a, b, l, 0.25 ) for a, b, l in zip( N1, N2, links ) ]
+    scalarChainTime = time.perf_counter() - startTime
+    startTime = time.perf_counter()
+    chain = ChainBatchIN( N1, N2, links, 0.25 )
+    chainTime = time.perf_counter() - startTime
+    chainMismatches = sum( 1 for i, cc in enumerate( scalarChain ) if cc != chain[0][i] and not ( cc != cc and chain[0][i] != chain[0][i] ) )
+    mismatches += chainMismatches
+
+    gears = GearsBatchIN( N1, N2, 20 )
+    mismatches += sum( 1 for i, ( a, b ) in enumerate( zip( N1, N2 ) ) if GearsCCDistanceIN( a, b, 20 ) != gears[0][i] )
+
+    print( f'{count} belts, NumPy {"available" if np is not None else "not available"}' )
+    print( f'  scalar {scalarTime*1000:8.1f}ms' )
+    print( f'  batch  {batchTime*1000:8.1f}ms  ({scalarTime / batchTime:.1f}x)' )
+    print( f'{count} #25 chains' )
+    print( f'  scalar {scalarChainTime*1000:8.1f}ms' )
+    print( f'  batch  {chainTime*1000:8.1f}ms  ({scalarChainTime / chainTime:.1f}x)' )
+    print( f'  {mismatches} mismatches between scalar and batch ({chainMismatches} chain)' )
+    return mismatches
+
+if __name__ == '__main__':
+    import sys
+    sys.exit( 1 if _benchmark() else 0 )
@@ -0,0 +1,8 @@
+# The lib modules do not import adsk, so the tests run them without Fusion.
+# lib is not a package, so it goes on the path and the modules are imported
+# by name like the benchmarks do.
+
+import os
+import sys
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ), 'lib' ) )
@@ -0,0 +1,104 @@
+# The belt path solver against the closed form for two pulleys, the length
+# gradient against finite differences and the idler solver against its
+# target length.
+
+import math
+import random
+
+import pytest
+
+import beltPath
+
+
+# Open belt around two circles C apart
+def _twoCircleLength( r1, r2, C ):
+    beta = math.asin( ( r1 - r2 ) / C )
+    return 2 * math.sqrt( C*C - ( r1 - r2 )**2 ) + r1 * ( math.pi + 2 * beta ) + r2 * ( math.pi - 2 * beta )
+
+@pytest.mark.parametrize( 'seed', range( 5 ) )
+def test_two_pulleys_match_closed_form( seed ):
+    rng = random.Random( seed )
+    for i in range( 50 ):
+        r1 = rng.uniform( 0.3, 3 )
+        r2 = rng.uniform( 0.3, 3 )
+        C = rng.uniform( abs( r1 - r2 ) + 0.1, 20 )
+        angle = rng.uniform( -math.pi, math.pi )
+        x = rng.uniform( -5, 5 )
+        y = rng.uniform( -5, 5 )
+        loop = [ ( x, y, r1 ), ( x + C * math.cos( angle ), y + C * math.sin( angle ), r2 ) ]
+        path = beltPath.beltPath( loop )
+        assert path.length == pytest.approx( _twoCircleLength( r1, r2, C ), rel=1e-12 )
+        assert sum( path.wraps ) == pytest.approx( 2 * math.pi, rel=1e-12 )
+
+def test_equal_pulleys():
+    assert beltPath.beltLength( [ ( 0, 0, 1 ), ( 10, 0, 1 ) ] ) == pytest.approx( 20 + 2 * math.pi, rel=1e-15 )
+
+def test_span_lengths_add_up():
+    loop = [ ( 0, 0, 2 ), ( 6, -1, 0.5 ), ( 9, 4, 1 ) ]
+    path = beltPath.beltPath( loop )
+    spans = sum( math.hypot( span.x2 - span.x1, span.y2 - span.y1 ) for span in path.spans )
+    wraps = sum( abs( r ) * w for ( x, y, r ), w in zip( loop, path.wraps ) )
+    assert path.length == pytest.approx( spans + wraps, rel=1e-12 )
+
+@pytest.mark.parametrize( 'loop', [
+    [ ( 0, 0, 2 ), ( 6, -1, 0.5 ), ( 9, 4, 1 ) ],
+    [ ( 0, 0, 1 ), ( 4, -2, -0.5 ), ( 8, 0, 1 ), ( 4, 6, 1.5 ) ],
+] )
+def test_length_gradient_matches_finite_difference( loop ):
+    path = beltPath.beltPath( loop )
+    h = 1e-6
+    for i in range( len( loop ) ):
+        gx, gy = beltPath.lengthGradient( path, i )
+        for axis, g in ( ( 0, gx ), ( 1, gy ) ):
+            plus = [ list( c ) for c in loop ]
+            minus = [ list( c ) for c in loop ]
+            plus[i][axis] += h
+            minus[i][axis] -= h
+            difference = ( beltPath.beltLength( plus ) - beltPath.beltLength( minus ) ) / ( 2 * h )
+            assert g == pytest.approx( difference, abs=1e-6 )
+
+def test_back_idler_lengthens_belt():
+    pulleys = [ ( 0, 0, 1 ), ( 10, 0, 1 ) ]
+    plain = beltPath.beltLength( pulleys )
+    # An idler behind the lower span pushes the belt in and lengthens it
+    loop = beltPath.pulleyLoop( pulleys, [ ( 5, -0.8, 0.5 ) ] )
+    assert any( r < 0 for x, y, r in loop )
+    assert beltPath.beltLength( loop ) > plain
+
+
+@pytest.mark.parametrize( 'seed', range( 5 ) )
+def test_idler_solution_has_target_length( seed ):
+    rng = random.Random( seed )
+    for i in range( 40 ):
+        r1 = rng.uniform( 0.5, 2 )
+        r2 = rng.uniform( 0.5, 2 )
+        cc = rng.uniform( r1 + r2 + 1, 12 )
+        p1 = ( 0.0, 0.0, r1 )
+        p2 = ( cc, 0.0, r2 )
+        x = rng.uniform( r1, cc - r2 )
+        curve = beltPath.LineCurve( x, 0.5, x, -max( r1, r2 ) - 3 )
+        target = beltPath.beltLength( [ p1, p2 ] ) + rng.uniform( 0.05, 1.5 )
+        solution = beltPath.solveIdler( p1, p2, curve, 0.4, target, behind=True )
+        if solution is None:
+            continue
+        assert 0 <= solution.u <= 1
+        assert ( solution.x, solution.y ) == pytest.approx( curve.point( solution.u ) )
+        assert solution.path.length == pytest.approx( target, rel=1e-9 )
+
+def test_idler_on_arc():
+    p1 = ( 0.0, 0.0, 1.0 )
+    p2 = ( 8.0, 0.0, 1.0 )
+    # The top of the arc presses the lower span in by 0.5
+    curve = beltPath.ArcCurve( 4.0, -4.0, 3.0, math.pi / 2 - 0.5, 1.0 )
+    target = beltPath.beltLength( [ p1, p2 ] ) + 0.03
+    solution = beltPath.solveIdler( p1, p2, curve, 0.5, target, behind=True )
+    # Two answers on the symmetric arc, the one nearest the start comes back
+    assert solution is not None and solution.u < 0.5
+    assert solution.path.length == pytest.approx( target, rel=1e-9 )
+
+def test_idler_target_out_of_reach():
+    p1 = ( 0.0, 0.0, 1.0 )
+    p2 = ( 8.0, 0.0, 1.0 )
+    curve = beltPath.LineCurve( 4.0, -1.5, 4.0, -2.0 )
+    target = beltPath.beltLength( [ p1, p2 ] ) + 10
+    assert beltPath.solveIdler( p1, p2, curve, 0.5, target, behind=True ) is None
@@ -0,0 +1,112 @@
+# The ratio searches with and without NumPy, against a brute force sweep of
+# every combination.
+
+import math
+
+import pytest
+
+import ccSearch
+import motionMath
+
+
+# Run a search with NumPy and again without it
+def _bothWays( monkeypatch, search, *args, **kwargs ):
+    if ccSearch.np is None:
+        pytest.skip( 'NumPy is not installed' )
+    withNumPy = search( *args, **kwargs )
+    monkeypatch.setattr( ccSearch, 'np', None )
+    monkeypatch.setattr( motionMath, 'np', None )
+    withoutNumPy = search( *args, **kwargs )
+    monkeypatch.undo()
+    return withNumPy, withoutNumPy
+
+def _keys( matches ):
+    return [ ( m.N1, m.N2, m.teeth ) + ( ( m.holes, ) if isinstance( m, ccSearch.GridMatch ) else () ) for m in matches ]
+
+
+WRAPPED_CASES = [
+    ( 1.0, 1.0, 4.0, 8.0, (12, 60), (35, 400) ),
+    ( 2.5, 3.2, 3.0, 12.0, (8, 100), (35, 400) ),
+    ( 0.3, 0.5, 6.0, 6.5, (10, 80), (60, 250) ),
+    ( 4.0, 5.0, 1.0, 30.0, (8, 30), (150, 160) ),
+]
+
+@pytest.mark.parametrize( 'ratioMin, ratioMax, ccMin, ccMax, cogRange, teethRange', WRAPPED_CASES )
+def test_belts_same_with_and_without_numpy( monkeypatch, ratioMin, ratioMax, ccMin, ccMax, cogRange, teethRange ):
+    for limit in ( 50, None ):
+        a, b = _bothWays( monkeypatch, ccSearch.searchBelts, 5, ratioMin, ratioMax, ccMin, ccMax, cogRange, teethRange, limit )
+        assert _keys( a ) == _keys( b )
+
+@pytest.mark.parametrize( 'ratioMin, ratioMax, ccMin, ccMax, cogRange, linksRange', WRAPPED_CASES )
+def test_chains_same_with_and_without_numpy( monkeypatch, ratioMin, ratioMax, ccMin, ccMax, cogRange, linksRange ):
+    for limit in ( 50, None ):
+        a, b = _bothWays( monkeypatch, ccSearch.searchChains, 0.25, ratioMin, ratioMax, ccMin, ccMax, cogRange, linksRange, limit )
+        assert _keys( a ) == _keys( b )
+
+@pytest.mark.parametrize( 'ratioMin, ratioMax, ccMin, ccMax', [ ( 1.0, 3.0, 1.0, 4.0 ), ( 0.2, 0.9, 2.0, 2.5 ) ] )
+def test_gears_same_with_and_without_numpy( monkeypatch, ratioMin, ratioMax, ccMin, ccMax ):
+    a, b = _bothWays( monkeypatch, ccSearch.searchGears, 20, ratioMin, ratioMax, ccMin, ccMax, (8, 100), None )
+    assert _keys( a ) == _keys( b )
+
+@pytest.mark.parametrize( 'search, pitch, grid', [
+    ( ccSearch.searchGridBelts, 5, 0.5 ),
+    ( ccSearch.searchGridBelts, 3, 16 / 25.4 ),
+    ( ccSearch.searchGridChains, 0.375, 0.5 ),
+] )
+def test_grid_same_with_and_without_numpy( monkeypatch, search, pitch, grid ):
+    a, b = _bothWays( monkeypatch, search, pitch, grid, 0.0, 0.02, 1.0, 3.0, 2.0, 10.0, (12, 60), (35, 400), None )
+    assert sorted( _keys( a ) ) == sorted( _keys( b ) )
+    assert len( a ) > 0
+
+
+# Every combination in the windows, the slow way
+def _bruteForce( ccFn, ratioMin, ratioMax, ccMin, ccMax, cogRange, teethRange ):
+    found = set()
+    for N1 in range( cogRange[0], cogRange[1] + 1 ):
+        for N2 in range( cogRange[0], cogRange[1] + 1 ):
+            if not ratioMin <= N2 / N1 <= ratioMax:
+                continue
+            for teeth in range( teethRange[0], teethRange[1] + 1 ):
+                try:
+                    cc = ccFn( N1, N2, teeth )
+                except ValueError:
+                    continue
+                if ccMin <= cc <= ccMax:
+                    found.add( ( N1, N2, teeth ) )
+    return found
+
+@pytest.mark.parametrize( 'withNumPy', [ True, False ] )
+def test_belts_find_every_combination( monkeypatch, withNumPy ):
+    if not withNumPy:
+        monkeypatch.setattr( ccSearch, 'np', None )
+        monkeypatch.setattr( motionMath, 'np', None )
+    windows = ( 1.5, 2.5, 3.0, 5.0, (10, 40), (40, 160) )
+    matches = ccSearch.searchBelts( 5, *windows, limit=None )
+    assert set( _keys( matches ) ) == _bruteForce( lambda a, b, t: motionMath.BeltCCDistanceIN( a, b, t, 5 ), *windows )
+
+@pytest.mark.parametrize( 'withNumPy', [ True, False ] )
+def test_chains_find_every_combination( monkeypatch, withNumPy ):
+    if not withNumPy:
+        monkeypatch.setattr( ccSearch, 'np', None )
+        monkeypatch.setattr( motionMath, 'np', None )
+    windows = ( 0.4, 1.0, 4.0, 7.0, (9, 36), (40, 120) )
+    matches = ccSearch.searchChains( 0.25, *windows, limit=None )
+    assert set( _keys( matches ) ) == _bruteForce( lambda a, b, l: motionMath.ChainCCDistanceIN( a, b, l, 0.25 ), *windows )
+
+def test_matches_are_ranked_and_in_the_windows():
+    matches = ccSearch.searchBelts( 5, 2.0, 2.2, 4.0, 6.0 )
+    assert 0 < len( matches ) <= 50
+    for m in matches:
+        assert 2.0 <= m.ratio <= 2.2
+        assert 4.0 <= m.ccIN <= 6.0
+        assert m.ccIN == motionMath.BeltCCDistanceIN( m.N1, m.N2, m.teeth, 5 )
+    assert matches == ccSearch.rankMatches( matches, 2.0, 2.2, 4.0, 6.0 )
+
+def test_grid_matches_land_on_the_grid():
+    grid = 0.5
+    matches = ccSearch.searchGridChains( 0.25, grid, 0.0, 0.02, 1.0, 3.0, 2.0, 10.0 )
+    assert len( matches ) > 0
+    for m in matches:
+        assert 0.0 <= m.extraCenterIN <= 0.02
+        assert m.ccIN + m.extraCenterIN == pytest.approx( m.holes * grid, abs=1e-12 )
+        assert m.ccIN == motionMath.ChainCCDistanceIN( m.N1, m.N2, m.teeth, 0.25 )
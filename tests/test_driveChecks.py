@@ -0,0 +1,67 @@
+# The drive checks of known good and bad drives, and the same issues with and
+# without NumPy on random drives.
+
+import collections
+import os
+import random
+
+import pytest
+
+import driveChecks
+import motionCatalog
+import motionMath
+
+
+LineData = collections.namedtuple( 'LineData', ( 'N1', 'N2', 'Teeth', 'ExtraCenterIN', 'motion' ) )
+
+@pytest.fixture( scope='module' )
+def catalog():
+    return motionCatalog.getMotionCatalog( os.path.join( os.path.dirname( os.path.dirname( os.path.abspath( __file__ ) ) ),
+                                                         'lib', 'data', 'motionTypes.json' ) )
+
+def _checks( issues, index ):
+    return [ issue.check for issue in issues if issue.index == index ]
+
+
+def test_good_drives_pass( catalog ):
+    lineData = [
+        LineData( 20, 40, 0, 0.003, 0 ),
+        LineData( 18, 36, 90, 0.0, 1 ),
+        LineData( 16, 22, 60, 0.0, 3 ),
+    ]
+    assert driveChecks.checkDrives( lineData, catalog ) == []
+
+def test_bad_drives_fail( catalog ):
+    lineData = [
+        LineData( 10, 40, 0, 0.003, 0 ),    # too few gear teeth
+        LineData( 20, 40, 0, 0.2, 0 ),      # pulled apart, no contact
+        LineData( 12, 60, 70, 0.0, 1 ),     # small pulley barely wrapped
+        LineData( 9, 72, 80, 0.0, 3 ),      # chain wraps the small sprocket under 120 deg
+        LineData( 60, 60, 40, 0.0, 3 ),     # chain too short to build
+    ]
+    issues = driveChecks.checkDrives( lineData, catalog )
+    assert 'Min Teeth' in _checks( issues, 0 )
+    assert _checks( issues, 1 ) == [ 'Contact Ratio' ]
+    assert 'Teeth in Mesh' in _checks( issues, 2 )
+    assert _checks( issues, 3 ) == [ 'Wrap Angle' ]
+    assert _checks( issues, 4 ) == [ 'Wrap Angle' ]
+    assert issues == sorted( issues, key=lambda issue: ( issue.index, driveChecks.DRIVE_CHECKS.index( issue.check ) ) )
+
+def test_same_issues_with_and_without_numpy( catalog, monkeypatch ):
+    if driveChecks.np is None:
+        pytest.skip( 'NumPy is not installed' )
+    rng = random.Random( 254 )
+    lineData = []
+    for i in range( 2000 ):
+        motion = rng.choice( catalog.types )
+        teeth = rng.randint( 40, 200 ) if motion.wrapped else 0
+        lineData.append( LineData( rng.randint( 8, 72 ), rng.randint( 8, 72 ), teeth, motion.defaultExtraCenterIN, motion.id ) )
+
+    withNumPy = driveChecks.checkDrives( lineData, catalog )
+    monkeypatch.setattr( driveChecks, 'np', None )
+    monkeypatch.setattr( motionMath, 'np', None )
+    withoutNumPy = driveChecks.checkDrives( lineData, catalog )
+
+    assert [ ( i.index, i.check ) for i in withNumPy ] == [ ( i.index, i.check ) for i in withoutNumPy ]
+    for a, b in zip( withNumPy, withoutNumPy ):
+        assert a.value == pytest.approx( b.value, rel=1e-12, nan_ok=True )
@@ -0,0 +1,108 @@
+# The batch functions against the scalar ones, with and without NumPy, and
+# the C-C distance solvers against the belt and chain lengths they invert.
+
+import math
+import random
+
+import pytest
+
+import motionMath
+
+
+@pytest.fixture( params=[ 'numpy', 'python' ] )
+def batch( request, monkeypatch ):
+    if request.param == 'python':
+        monkeypatch.setattr( motionMath, 'np', None )
+    elif motionMath.np is None:
+        pytest.skip( 'NumPy is not installed' )
+    return request.param
+
+# Random drives, some too short to build
+def _rows( count, teethRange, seed=254 ):
+    rng = random.Random( seed )
+    N1 = [ rng.randint( 8, 72 ) for i in range( count ) ]
+    N2 = [ rng.randint( 8, 72 ) for i in range( count ) ]
+    teeth = [ rng.randint( *teethRange ) for i in range( count ) ]
+    return N1, N2, teeth
+
+# Same bits, or within ulps, with NaN where the scalar function raises
+def _assertSame( batchValues, scalarValues, ulps=0 ):
+    batchValues = [ float( v ) for v in batchValues ]
+    assert len( batchValues ) == len( scalarValues )
+    for b, s in zip( batchValues, scalarValues ):
+        if math.isnan( s ):
+            assert math.isnan( b )
+        else:
+            assert abs( b - s ) <= ulps * math.ulp( s )
+
+
+def test_gears_batch_matches_scalar( batch ):
+    N1, N2, _ = _rows( 500, ( 0, 0 ) )
+    cc, PD1, PD2, OD1, OD2 = motionMath.GearsBatchIN( N1, N2, 20 )
+    _assertSame( cc, [ motionMath.GearsCCDistanceIN( a, b, 20 ) for a, b in zip( N1, N2 ) ] )
+    _assertSame( PD1, [ motionMath.GearsPitchDiameterIN( a, 20 ) for a in N1 ] )
+    _assertSame( OD2, [ motionMath.GearsOuterDiameterIN( b, 20 ) for b in N2 ] )
+
+def test_belt_batch_matches_scalar( batch ):
+    N1, N2, teeth = _rows( 500, ( 20, 200 ) )
+    cc, PD1, PD2, OD1, OD2 = motionMath.BeltBatchIN( N1, N2, teeth, 5 )
+    _assertSame( cc, [ motionMath._beltOrNaN( a, b, t, 5 ) for a, b, t in zip( N1, N2, teeth ) ] )
+    _assertSame( PD2, [ motionMath.BeltPitchDiameterIN( b, 5 ) for b in N2 ] )
+    _assertSame( OD1, [ motionMath.BeltOuterDiameterIN( a, 5 ) for a in N1 ] )
+
+def test_chain_batch_matches_scalar( batch ):
+    N1, N2, links = _rows( 500, ( 20, 200 ) )
+    cc, PD1, PD2, OD1, OD2 = motionMath.ChainBatchIN( N1, N2, links, 0.25 )
+    expected = [ motionMath._chainOrNaN( a, b, l, 0.25 ) for a, b, l in zip( N1, N2, links ) ]
+    assert any( math.isnan( c ) for c in expected )
+    _assertSame( cc, expected )
+    _assertSame( PD1, [ motionMath.ChainPitchDiameterIN( a, 0.25 ) for a in N1 ] )
+    _assertSame( OD2, [ motionMath.ChainOuterDiameterIN( b, 0.25 ) for b in N2 ] )
+
+def test_wrap_and_contact_ratio_batch_match_scalar( batch ):
+    N1, N2, _ = _rows( 500, ( 0, 0 ) )
+    cc = [ motionMath.GearsCCDistanceIN( a, b, 20 ) + 0.003 for a, b in zip( N1, N2 ) ]
+    PD1 = [ motionMath.GearsPitchDiameterIN( a, 20 ) for a in N1 ]
+    PD2 = [ motionMath.GearsPitchDiameterIN( b, 20 ) for b in N2 ]
+    _assertSame( motionMath.WrapAngleBatch( PD1, PD2, cc ), [ motionMath._wrapOrNaN( *row ) for row in zip( PD1, PD2, cc ) ], ulps=1 )
+    _assertSame( motionMath.GearsContactRatioBatch( N1, N2, 20, cc ),
+                 [ motionMath._contactRatioOrNaN( a, b, 20, c ) for a, b, c in zip( N1, N2, cc ) ] )
+
+
+# Belt length around two pitch circles C apart
+def _beltLengthIN( PD1, PD2, C ):
+    return 2 * C + math.pi * ( PD1 + PD2 ) / 2 + ( PD1 - PD2 )**2 / ( 4 * C )
+
+@pytest.mark.parametrize( 'N1, N2, teeth', [ ( 18, 18, 60 ), ( 12, 36, 90 ), ( 60, 15, 120 ), ( 24, 72, 200 ) ] )
+def test_belt_cc_gives_belt_length( N1, N2, teeth ):
+    cc = motionMath.BeltCCDistanceIN( N1, N2, teeth, 5 )
+    PD1 = motionMath.BeltPitchDiameterIN( N1, 5 )
+    PD2 = motionMath.BeltPitchDiameterIN( N2, 5 )
+    assert _beltLengthIN( PD1, PD2, cc ) == pytest.approx( teeth * 5 / 25.4, rel=1e-12 )
+
+
+# Exact chain length around two pitch circles C apart
+def _chainLengthIN( PD1, PD2, C ):
+    diff = abs( PD1 - PD2 )
+    phi = math.asin( diff / ( 2 * C ) )
+    return diff / math.tan( phi ) + math.pi * ( PD1 + PD2 ) / 2 + diff * phi
+
+@pytest.mark.parametrize( 'N1, N2, links', [ ( 10, 60, 100 ), ( 16, 22, 60 ), ( 72, 9, 90 ), ( 15, 44, 200 ), ( 35, 36, 80 ) ] )
+def test_chain_cc_gives_chain_length( N1, N2, links ):
+    cc = motionMath.ChainCCDistanceIN( N1, N2, links, 0.25 )
+    PD1 = motionMath.ChainPitchDiameterIN( N1, 0.25 )
+    PD2 = motionMath.ChainPitchDiameterIN( N2, 0.25 )
+    assert _chainLengthIN( PD1, PD2, cc ) == pytest.approx( links * 0.25, rel=1e-12 )
+    assert cc > ( PD1 + PD2 ) / 2
+
+def test_chain_cc_same_sprockets():
+    PD = motionMath.ChainPitchDiameterIN( 22, 0.25 )
+    assert motionMath.ChainCCDistanceIN( 22, 22, 80, 0.25 ) == pytest.approx( ( 80 * 0.25 - math.pi * PD ) / 2, rel=1e-15 )
+
+def test_chain_too_short():
+    with pytest.raises( ValueError ):
+        motionMath.ChainCCDistanceIN( 60, 10, 40, 0.25 )
+
+def test_gears_too_close_for_contact_ratio():
+    with pytest.raises( ValueError ):
+        motionMath.GearsContactRatio( 20, 40, 20, 1.0 )